@@ -1,29 +1,46 @@
 # TelegramChaseBot.py 
 from config import conf_checkconfig
 from game import game_Scheduler
-from telegram_bot import TelegramBot
-from database import db_init
+from telegram_bot import TelegramBot, close_http_session
+from database import db_init, db_close_connections
+from database_async import db_shutdown_executors
+from map_render import map_render_shutdown
+from tile_fetcher import close_tile_fetch_session
 from logger import logger_newLog
 import asyncio
 import sys
 
-# Prüfe Konfiguration beim Start
-if not conf_checkconfig():
-    logger_newLog("error", "on startup", "Fehler: Konfiguration ungültig oder unvollständig")
-    sys.exit(1)
+def startup():
+    """Prüft die Konfiguration und initialisiert die Datenbank
 
-# Initialisiere Datenbank
-if not db_init():
-    logger_newLog("error", "on startup", "Fehler: Datenbankinitialisierung fehlgeschlagen")
-    sys.exit(1)
+    Nur beim Start des Bots, nicht wenn ein Render-Prozess dieses Modul importiert.
+    """
+    # Prüfe Konfiguration beim Start
+    if not conf_checkconfig():
+        logger_newLog("error", "on startup", "Fehler: Konfiguration ungültig oder unvollständig")
+        sys.exit(1)
+
+    # Initialisiere Datenbank
+    if not db_init():
+        logger_newLog("error", "on startup", "Fehler: Datenbankinitialisierung fehlgeschlagen")
+        sys.exit(1)
 
 # Starte den asynchronen Scheduler und Bot
 async def main():
     bot = TelegramBot()
-    await asyncio.gather(
-        game_Scheduler(),
-        bot.run()
-    )
+    try:
+        await asyncio.gather(
+            game_Scheduler(),
+            bot.run()
+        )
+    finally:
+        # Gemeinsame HTTP-Session, Render-Prozesse und Datenbankverbindungen sauber schließen
+        await close_http_session()
+        await close_tile_fetch_session()
+        map_render_shutdown(kill=True)
+        db_shutdown_executors()
+        db_close_connections()
 
 if __name__ == "__main__":
+    startup()
     asyncio.run(main()) 
\ No newline at end of file
@@ -8,6 +8,7 @@ import json
 from Map_SendMap_LokalMapServer import Map_SendMap_LokalMapServer
 from Map_SendMap_LeafletHTML import Map_SendMap_LeafletHTML
 from Map_SendMap_pyStaticmapPNG import Map_SendMap_pyStaticmapPNG
+from database_async import db_async
 
 def Map_GenerateGeoJSON(game_data, user_id=None):
     """Erstellt ein erweitertes GeoJSON für das Spielfeld, die Ziellinie und die Spielerpositionen"""
@@ -268,17 +269,18 @@ async def Map_SendMap(bot, chat_id, user_id, username, game_id):
     """Sendet eine Karte für das angegebene Spiel, je nach MapProvider"""
     logger_newLog("info", "Map_SendMap", f"Map-Sendung für User {username} ({user_id}) für Spiel {game_id}")
     try:
-        game_data = db_Game_getField(game_id)
+        game_data = await db_async(db_Game_getField, game_id)
         if not game_data:
             await bot.send_message(chat_id, "❌ Spiel nicht gefunden oder Spielfeld nicht konfiguriert.")
             return False
-        geojson = Map_GenerateGeoJSON(game_data, user_id)
+        # Erzeugt das GeoJSON mit mehreren Datenbankabfragen - daher im Lese-Thread
+        geojson = await db_async(Map_GenerateGeoJSON, game_data, user_id, write=False)
         map_provider = conf_getMapProvider()
         
         # Erstelle user_info für Leaflet-HTML
         user_info = None
         if user_id:
-            user = db_getUserPosition(user_id)
+            user = await db_async(db_getUserPosition, user_id)
             if user:
                 user_info = {
                     'role': user[6],
@@ -0,0 +1,52 @@
+# Micro-Benchmark für den Datenbank-Verbindungspool
+# Aufruf: python benchmark_database.py [Anzahl Aufrufe]
+#
+# Vergleicht den Overhead pro db_*-Aufruf mit einer neuen Verbindung pro Aufruf
+# (altes Verhalten) und mit wiederverwendeten Verbindungen aus dem Pool.
+import os
+import sys
+import sqlite3
+import tempfile
+import time
+
+# Eigene Datenbankdatei, damit die echte Datenbank nicht angefasst wird
+tmp_dir = tempfile.mkdtemp()
+os.environ['DATABASE_FILE'] = os.path.join(tmp_dir, 'benchmark.db')
+
+import database
+from database import db_init, db_User_new, db_User_get, db_Game_new, db_Game_getStatus, db_close_connections
+
+calls = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+def connection_per_call():
+    """Altes Verhalten: neue Verbindung und PRAGMA bei jedem Aufruf"""
+    conn = sqlite3.connect(os.environ['DATABASE_FILE'], timeout=30.0)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+def measure(label):
+    start = time.perf_counter()
+    for _ in range(calls):
+        db_User_get(1)
+        db_Game_getStatus(1)
+    elapsed = time.perf_counter() - start
+    per_call = elapsed / (calls * 2) * 1_000_000
+    print(f"{label:<28} {elapsed:8.3f}s gesamt  {per_call:8.1f} µs pro Aufruf")
+    return per_call
+
+db_init()
+db_User_new(1, "benchmark", "Benchmark")
+db_Game_new("Benchmark", 1)
+
+print(f"{calls * 2} Aufrufe (db_User_get + db_Game_getStatus)\n")
+
+pooled_get_connection = database.db_get_connection
+database.db_get_connection = connection_per_call
+before = measure("Neue Verbindung pro Aufruf")
+
+database.db_get_connection = pooled_get_connection
+after = measure("Verbindungspool")
+
+print(f"\nFaktor: {before / after:.1f}x schneller")
+
+db_close_connections()
@@ -0,0 +1,46 @@
+# Micro-Benchmark für die Entfernungsberechnung
+# Aufruf: python benchmark_geo.py [Wiederholungen]
+#
+# Vergleicht calculate_distance in einer Python-Schleife mit der
+# NumPy-Variante aus geo_batch.py bei 10, 100 und 1000 Spielern:
+#   - Einer zu allen (z.B. Radar Ping zu allen Huntern)
+#   - Alle Runner × alle Hunter (Entfernungsmatrix, halbe/halbe Aufteilung)
+import random
+import sys
+import time
+
+from geo_batch import geo_has_numpy, geo_distances_from_point, geo_distance_matrix
+
+repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+if not geo_has_numpy():
+    print("NumPy ist nicht installiert - es gibt nichts zu vergleichen")
+    sys.exit(1)
+
+def random_points(count):
+    return [(52.52 + random.uniform(-0.02, 0.02), 13.40 + random.uniform(-0.03, 0.03)) for _ in range(count)]
+
+def measure(func):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) / repeats * 1000
+
+random.seed(42)
+print(f"Mittelwert aus {repeats} Durchläufen\n")
+print(f"{'Spieler':>8}  {'Berechnung':<22} {'Python':>10} {'NumPy':>10} {'Faktor':>8}")
+
+for players in (10, 100, 1000):
+    points = random_points(players)
+    runners = points[:players // 2]
+    hunters = points[players // 2:]
+    lat, lon = points[0]
+
+    cases = [
+        ("Einer zu allen", lambda use_numpy: geo_distances_from_point(lat, lon, points, use_numpy=use_numpy)),
+        ("Runner × Hunter", lambda use_numpy: geo_distance_matrix(runners, hunters, use_numpy=use_numpy)),
+    ]
+    for label, func in cases:
+        python_ms = measure(lambda: func(False))
+        numpy_ms = measure(lambda: func(True))
+        print(f"{players:>8}  {label:<22} {python_ms:>8.3f}ms {numpy_ms:>8.3f}ms {python_ms / numpy_ms:>7.1f}x")
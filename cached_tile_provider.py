@@ -18,8 +18,7 @@ class CachedTileProvider(staticmaps.TileProvider):
         
         if cache_enabled:
             # Starte Tile-Server
-            cache_dir = get_tile_cache().cache_dir
-            if not start_tile_server(cache_dir):
+            if not start_tile_server():
                 logger_newLog("warning", "CachedTileProvider", "Tile-Server konnte nicht gestartet werden, verwende Original-Provider")
                 self.cache_enabled = False
             else:
@@ -42,8 +41,7 @@ class CachedTileProvider(staticmaps.TileProvider):
             if original_url:
                 # Lade Tile in Cache (falls noch nicht vorhanden)
                 cache = get_tile_cache()
-                cached_path = cache.get_tile(self.provider_name, z, x, y, original_url)
-                if cached_path:
+                if cache.get_tile(self.provider_name, z, x, y, original_url):
                     # Verwende lokalen HTTP-Server
                     return get_cached_tile_url(self.provider_name, z, x, y)
         
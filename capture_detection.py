@@ -0,0 +1,190 @@
+import math
+import time
+from logger import logger_newLog
+from config import conf_getCaptureRadiusMeters, conf_getCaptureConsecutiveFixes
+from geo_batch import geo_distances_from_point
+from telegram_outbound import PRIORITY_CRITICAL
+from database_async import db_async
+
+METERS_PER_DEGREE_LAT = 111320.0
+
+# Positionen, deren letztes Update älter ist, zählen nicht (Live-Standort beendet)
+CAPTURE_MAX_FIX_AGE_SECONDS = 120
+
+# Ein Positions-Gitter pro Spiel: {game_id: PlayerGrid}
+capture_grids = {}
+# Aufeinanderfolgende Updates in Fangreichweite: {game_id: {(runner_id, hunter_id): Anzahl}}
+capture_counters = {}
+# Bereits gemeldete Paare (erneute Meldung erst nachdem sie sich getrennt haben): {game_id: set((runner_id, hunter_id))}
+capture_reported = {}
+# Spiel, in dessen Gitter ein Spieler zuletzt eingetragen wurde: {user_id: game_id}
+capture_player_games = {}
+
+class PlayerGrid:
+    """Gitter mit den letzten Live-Positionen der Runner und Hunter eines Spiels
+
+    Die Zellgröße entspricht dem Fangradius, für eine Position müssen daher nur
+    die direkt benachbarten Zellen durchsucht werden statt aller Spieler.
+    """
+
+    def __init__(self, cell_size):
+        self.cell_size = max(1.0, float(cell_size))
+        self.lat_step = self.cell_size / METERS_PER_DEGREE_LAT
+        self.positions = {}  # {user_id: (role, name, lat, lon, zeit, zelle)}
+        self.cells = {}      # {zelle: set(user_id)}
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.lat_step), math.floor(lon / self.lat_step))
+
+    def update(self, user_id, role, name, lat, lon, now):
+        """Speichert die neue Position eines Spielers"""
+        self.remove(user_id)
+        cell = self._cell(lat, lon)
+        self.positions[user_id] = (role, name, lat, lon, now, cell)
+        self.cells.setdefault(cell, set()).add(user_id)
+
+    def remove(self, user_id):
+        """Entfernt einen Spieler aus dem Gitter"""
+        position = self.positions.pop(user_id, None)
+        if position is None:
+            return
+        cell_players = self.cells.get(position[5])
+        if cell_players is not None:
+            cell_players.discard(user_id)
+            if not cell_players:
+                del self.cells[position[5]]
+
+    def nearby(self, lat, lon, radius, role, now):
+        """Gibt aktuelle Positionen einer Rolle aus den Zellen im Umkreis zurück
+
+        Returns:
+            Liste von (user_id, name, lat, lon)
+        """
+        row, col = self._cell(lat, lon)
+        rows = math.ceil(radius / self.cell_size)
+        cols = math.ceil(radius / (self.cell_size * max(0.01, math.cos(math.radians(lat)))))
+
+        players = []
+        for r in range(row - rows, row + rows + 1):
+            for c in range(col - cols, col + cols + 1):
+                for other_id in self.cells.get((r, c), ()):
+                    other_role, other_name, other_lat, other_lon, other_time, _ = self.positions[other_id]
+                    if other_role == role and now - other_time <= CAPTURE_MAX_FIX_AGE_SECONDS:
+                        players.append((other_id, other_name, other_lat, other_lon))
+        return players
+
+def capture_update(game_id, user_id, role, name, lat, lon, now=None):
+    """Verarbeitet ein Standort-Update und zählt aufeinanderfolgende Annäherungen
+
+    Args:
+        game_id: ID des Spiels
+        user_id: ID des bewegten Spielers
+        role: 'runner' oder 'hunter' (andere Rollen werden ignoriert)
+        name: Anzeigename des Spielers
+        lat, lon: Neue Position
+        now: Zeitpunkt des Updates (Standard: jetzt)
+
+    Returns:
+        Liste neuer Fang-Kandidaten als Dict mit runner_id, runner_name, hunter_id, hunter_name, distance
+    """
+    if now is None:
+        now = time.time()
+
+    # Spieler hat das Spiel oder die Rolle gewechselt: alte Einträge entfernen
+    previous_game = capture_player_games.get(user_id)
+    if previous_game is not None and previous_game != game_id:
+        capture_remove_player(previous_game, user_id)
+    if role not in ('runner', 'hunter'):
+        if previous_game == game_id:
+            capture_remove_player(game_id, user_id)
+        return []
+
+    radius = conf_getCaptureRadiusMeters()
+    grid = capture_grids.get(game_id)
+    if grid is None:
+        grid = capture_grids[game_id] = PlayerGrid(radius)
+    grid.update(user_id, role, name, lat, lon, now)
+    capture_player_games[user_id] = game_id
+
+    opponent_role = 'hunter' if role == 'runner' else 'runner'
+    opponents = grid.nearby(lat, lon, radius, opponent_role, now)
+    distances = geo_distances_from_point(lat, lon, [(opponent[2], opponent[3]) for opponent in opponents])
+
+    in_range = {}
+    for opponent, distance in zip(opponents, distances):
+        if distance <= radius:
+            pair = (user_id, opponent[0]) if role == 'runner' else (opponent[0], user_id)
+            in_range[pair] = (opponent[1], distance)
+
+    counters = capture_counters.setdefault(game_id, {})
+    reported = capture_reported.setdefault(game_id, set())
+
+    # Paare des Spielers, die nicht mehr in Reichweite sind, beginnen wieder bei 0
+    for pair in [pair for pair in counters if user_id in pair and pair not in in_range]:
+        del counters[pair]
+        reported.discard(pair)
+
+    candidates = []
+    required_fixes = conf_getCaptureConsecutiveFixes()
+    for pair, (opponent_name, distance) in in_range.items():
+        counters[pair] = counters.get(pair, 0) + 1
+        if counters[pair] >= required_fixes and pair not in reported:
+            reported.add(pair)
+            runner_name, hunter_name = (name, opponent_name) if role == 'runner' else (opponent_name, name)
+            candidates.append({
+                'runner_id': pair[0],
+                'runner_name': runner_name,
+                'hunter_id': pair[1],
+                'hunter_name': hunter_name,
+                'distance': distance,
+            })
+    return candidates
+
+def capture_remove_player(game_id, user_id):
+    """Entfernt einen Spieler samt seiner Zähler aus der Fangerkennung eines Spiels"""
+    grid = capture_grids.get(game_id)
+    if grid is not None:
+        grid.remove(user_id)
+    counters = capture_counters.get(game_id, {})
+    reported = capture_reported.get(game_id, set())
+    for pair in [pair for pair in counters if user_id in pair]:
+        del counters[pair]
+        reported.discard(pair)
+    if capture_player_games.get(user_id) == game_id:
+        del capture_player_games[user_id]
+
+def capture_drop_game(game_id):
+    """Verwirft alle Positionen und Zähler eines Spiels (z.B. nach Spielende)"""
+    grid = capture_grids.pop(game_id, None)
+    capture_counters.pop(game_id, None)
+    capture_reported.pop(game_id, None)
+    if grid is not None:
+        for user_id in grid.positions:
+            if capture_player_games.get(user_id) == game_id:
+                del capture_player_games[user_id]
+
+async def capture_check_location(bot, game_id, user_id, role, name, lat, lon):
+    """Prüft nach einem Live-Standort-Update auf einen möglichen Fang und informiert den Gamemaster
+
+    Returns:
+        Liste der neu erkannten Fang-Kandidaten
+    """
+    candidates = capture_update(game_id, user_id, role, name, lat, lon)
+    if not candidates:
+        return candidates
+
+    from database import db_Game_getField
+    game = await db_async(db_Game_getField, game_id)
+    gamemaster_id = game[2] if game else None
+
+    for candidate in candidates:
+        logger_newLog("info", "capture_check_location", f"Möglicher Fang in Spiel {game_id}: Hunter {candidate['hunter_name']} ({candidate['hunter_id']}) bei Runner {candidate['runner_name']} ({candidate['runner_id']}), {candidate['distance']:.1f}m")
+        if not gamemaster_id:
+            continue
+        message = f"🎯 **Möglicher Fang!**\n\n"
+        message += f"🏃 **Runner:** {candidate['runner_name']}\n"
+        message += f"🕵️ **Hunter:** {candidate['hunter_name']}\n"
+        message += f"📏 **Entfernung:** {candidate['distance']:.1f}m\n\n"
+        message += f"Der Hunter war in {conf_getCaptureConsecutiveFixes()} Standort-Updates nacheinander höchstens {conf_getCaptureRadiusMeters():.0f}m entfernt. Bitte prüfe den Fang."
+        await bot.send_message(gamemaster_id, message, priority=PRIORITY_CRITICAL)
+    return candidates
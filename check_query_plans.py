@@ -0,0 +1,30 @@
+# Prüft, ob die häufigen Datenbankabfragen Indizes verwenden
+# Aufruf: python check_query_plans.py
+#
+# Legt eine leere Datenbank mit allen Indizes an und führt EXPLAIN QUERY PLAN
+# für die Abfragen aus DB_HOT_QUERIES aus. Beendet sich mit Exit-Code 1, wenn
+# eine Abfrage die ganze Tabelle liest oder ohne Index sortiert.
+import os
+import sys
+import tempfile
+
+# Eigene Datenbankdatei, damit die echte Datenbank nicht angefasst wird
+tmp_dir = tempfile.mkdtemp()
+os.environ['DATABASE_FILE'] = os.path.join(tmp_dir, 'query_plans.db')
+
+from database import db_init, db_checkQueryPlans, db_close_connections, DB_HOT_QUERIES
+
+if not db_init():
+    print("Datenbank konnte nicht initialisiert werden")
+    sys.exit(1)
+
+problems = db_checkQueryPlans()
+db_close_connections()
+
+if problems:
+    print("Abfragen ohne passenden Index:")
+    for problem in problems:
+        print(f"  {problem}")
+    sys.exit(1)
+
+print(f"Alle {len(DB_HOT_QUERIES)} Abfragen verwenden Indizes")
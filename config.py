@@ -178,4 +178,295 @@ def conf_getTileCacheMaxSize():
     try:
         return int(value)
     except ValueError:
-        return 1000 
\ No newline at end of file
+        return 1000 
+
+def conf_getTileCacheMaxMB():
+    """Gibt die maximale Größe des Tile-Caches je Provider in MB zurück (0 = unbegrenzt)"""
+    value = os.getenv('TILE_CACHE_MAX_MB', '0')
+    try:
+        return max(0, int(value))
+    except ValueError:
+        return 0
+# Telegram HTTP-Verbindungspool
+def conf_getTelegramConnectionLimit():
+    """Gibt die maximale Anzahl gleichzeitiger HTTP-Verbindungen zur Telegram API zurück (0 = unbegrenzt)"""
+    value = os.getenv('TELEGRAM_CONNECTION_LIMIT', '100')
+    try:
+        return int(value)
+    except ValueError:
+        return 100
+
+def conf_getTelegramConnectionLimitPerHost():
+    """Gibt die maximale Anzahl gleichzeitiger Verbindungen pro Host zurück (0 = unbegrenzt)"""
+    value = os.getenv('TELEGRAM_CONNECTION_LIMIT_PER_HOST', '30')
+    try:
+        return int(value)
+    except ValueError:
+        return 30
+
+def conf_getTelegramDnsCacheSeconds():
+    """Gibt zurück wie lange DNS-Auflösungen gecacht werden (Sekunden)"""
+    value = os.getenv('TELEGRAM_DNS_CACHE_SECONDS', '300')
+    try:
+        return int(value)
+    except ValueError:
+        return 300
+
+def conf_getTelegramKeepaliveSeconds():
+    """Gibt zurück wie lange ungenutzte Verbindungen offen gehalten werden (Sekunden)"""
+    value = os.getenv('TELEGRAM_KEEPALIVE_SECONDS', '60')
+    try:
+        return int(value)
+    except ValueError:
+        return 60
+
+# Update-Verarbeitung
+def conf_getDispatcherWorkers():
+    """Gibt die Anzahl paralleler Worker für eingehende Updates zurück"""
+    value = os.getenv('DISPATCHER_WORKERS', '8')
+    try:
+        return int(value)
+    except ValueError:
+        return 8
+
+def conf_getDispatcherMaxPending():
+    """Gibt die maximale Anzahl wartender Updates zurück"""
+    value = os.getenv('DISPATCHER_MAX_PENDING', '1000')
+    try:
+        return int(value)
+    except ValueError:
+        return 1000
+
+# Update-Empfang (Polling oder Webhook)
+def conf_getUpdateMode():
+    """Gibt zurück wie Updates empfangen werden: 'polling' (getUpdates) oder 'webhook'"""
+    return os.getenv('TELEGRAM_UPDATE_MODE', 'polling').lower()
+
+def conf_getWebhookURL():
+    """Gibt die öffentliche HTTPS-URL zurück, unter der Telegram den Webhook erreicht"""
+    return os.getenv('WEBHOOK_URL', '')
+
+def conf_getWebhookListenHost():
+    """Gibt die Adresse zurück, auf der der Webhook-Server lauscht"""
+    return os.getenv('WEBHOOK_LISTEN_HOST', '0.0.0.0')
+
+def conf_getWebhookListenPort():
+    """Gibt den Port zurück, auf dem der Webhook-Server lauscht"""
+    value = os.getenv('WEBHOOK_LISTEN_PORT', '8080')
+    try:
+        return int(value)
+    except ValueError:
+        return 8080
+
+def conf_getWebhookPath():
+    """Gibt den Pfad des Webhook-Endpunkts zurück"""
+    path = os.getenv('WEBHOOK_PATH', '/telegram/webhook')
+    if not path.startswith('/'):
+        path = '/' + path
+    return path
+
+def conf_getWebhookSecret():
+    """Gibt das Secret-Token zurück, das Telegram bei jedem Webhook-Aufruf mitsendet"""
+    return os.getenv('WEBHOOK_SECRET', '')
+
+# Ausgehende Nachrichten (Rate-Limits der Telegram API)
+def conf_getOutboundGlobalRate():
+    """Gibt die maximale Anzahl ausgehender Anfragen pro Sekunde insgesamt zurück"""
+    value = os.getenv('OUTBOUND_GLOBAL_RATE', '25')
+    try:
+        return float(value)
+    except ValueError:
+        return 25.0
+
+def conf_getOutboundChatRate():
+    """Gibt die maximale Anzahl Nachrichten pro Sekunde und Chat zurück"""
+    value = os.getenv('OUTBOUND_CHAT_RATE', '1')
+    try:
+        return float(value)
+    except ValueError:
+        return 1.0
+
+def conf_getOutboundChatBurst():
+    """Gibt zurück wie viele Nachrichten kurzzeitig schneller an einen Chat gehen dürfen"""
+    value = os.getenv('OUTBOUND_CHAT_BURST', '3')
+    try:
+        return int(value)
+    except ValueError:
+        return 3
+
+def conf_getOutboundMaxRetries():
+    """Gibt die maximale Anzahl Wiederholungen pro Nachricht zurück"""
+    value = os.getenv('OUTBOUND_MAX_RETRIES', '5')
+    try:
+        return int(value)
+    except ValueError:
+        return 5
+
+def conf_getOutboundMaxQueue():
+    """Gibt die maximale Anzahl wartender Nachrichten zurück (kritische werden immer angenommen)"""
+    value = os.getenv('OUTBOUND_MAX_QUEUE', '2000')
+    try:
+        return int(value)
+    except ValueError:
+        return 2000
+
+def conf_getOutboundWorkers():
+    """Gibt die Anzahl gleichzeitig sendender Worker zurück"""
+    value = os.getenv('OUTBOUND_WORKERS', '4')
+    try:
+        return int(value)
+    except ValueError:
+        return 4
+
+# Datenbank-Tuning
+def conf_getDatabaseCacheSizeKB():
+    """Gibt die Größe des SQLite-Seitencaches pro Verbindung in KiB zurück"""
+    value = os.getenv('DATABASE_CACHE_SIZE_KB', '16384')
+    try:
+        return int(value)
+    except ValueError:
+        return 16384
+
+def conf_getDatabaseMmapSizeMB():
+    """Gibt zurück wie viel der Datenbankdatei per mmap eingeblendet wird (MB, 0 = aus)"""
+    value = os.getenv('DATABASE_MMAP_SIZE_MB', '64')
+    try:
+        return int(value)
+    except ValueError:
+        return 64
+
+def conf_getDatabaseReadThreads():
+    """Gibt die Anzahl Threads für parallele Lesezugriffe zurück (Schreibzugriffe laufen in einem eigenen Thread)"""
+    value = os.getenv('DATABASE_READ_THREADS', '4')
+    try:
+        return int(value)
+    except ValueError:
+        return 4
+
+# Standortverlauf
+def conf_getLocationHistoryMinDistanceMeters():
+    """Gibt zurück ab welcher Bewegung (Meter) ein neuer Punkt im Standortverlauf gespeichert wird"""
+    value = os.getenv('LOCATION_HISTORY_MIN_DISTANCE_METERS', '5')
+    try:
+        return float(value)
+    except ValueError:
+        return 5.0
+
+def conf_getLocationHistoryMaxIntervalSeconds():
+    """Gibt zurück nach wie vielen Sekunden auch ohne Bewegung ein Punkt gespeichert wird"""
+    value = os.getenv('LOCATION_HISTORY_MAX_INTERVAL_SECONDS', '60')
+    try:
+        return int(value)
+    except ValueError:
+        return 60
+
+def conf_getCaptureRadiusMeters():
+    """Gibt zurück ab welcher Entfernung (Meter) zwischen Hunter und Runner ein möglicher Fang vorliegt"""
+    value = os.getenv('CAPTURE_RADIUS_METERS', '15')
+    try:
+        return float(value)
+    except ValueError:
+        return 15.0
+
+def conf_getCaptureConsecutiveFixes():
+    """Gibt zurück in wie vielen aufeinanderfolgenden Standort-Updates ein Hunter nah am Runner sein muss"""
+    value = os.getenv('CAPTURE_CONSECUTIVE_FIXES', '3')
+    try:
+        return max(1, int(value))
+    except ValueError:
+        return 3
+
+def conf_getGeofenceHysteresisMeters():
+    """Gibt zurück wie weit (Meter) ein Spieler die Spielfeldgrenze überschreiten muss, bevor Verlassen/Rückkehr gemeldet wird"""
+    value = os.getenv('GEOFENCE_HYSTERESIS_METERS', '10')
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return 10.0
+
+# Render-Cache für /map
+def conf_getRenderCacheTTLSeconds():
+    """Gibt zurück wie lange (Sekunden) eine gerenderte Karte wiederverwendet wird"""
+    value = os.getenv('RENDER_CACHE_TTL_SECONDS', '60')
+    try:
+        return max(0, int(value))
+    except ValueError:
+        return 60
+
+def conf_getRenderCacheMaxMemoryMB():
+    """Gibt zurück wie viel Speicher (MB) gerenderte Karten höchstens belegen (0 = kein Cache)"""
+    value = os.getenv('RENDER_CACHE_MAX_MEMORY_MB', '64')
+    try:
+        return max(0, int(value))
+    except ValueError:
+        return 64
+
+def conf_getRenderCacheDir():
+    """Gibt das Verzeichnis für gerenderte Karten zurück"""
+    return os.getenv('RENDER_CACHE_DIR', 'render_cache')
+
+def conf_getRenderCacheMaxDiskMB():
+    """Gibt zurück wie viel Festplattenplatz (MB) gerenderte Karten höchstens belegen (0 = nur Speicher)"""
+    value = os.getenv('RENDER_CACHE_MAX_DISK_MB', '0')
+    try:
+        return max(0, int(value))
+    except ValueError:
+        return 0
+
+# Render-Prozesse für /map
+def conf_getMapRenderWorkers():
+    """Gibt die Anzahl der Prozesse zurück, die Karten parallel rendern"""
+    value = os.getenv('MAP_RENDER_WORKERS', '2')
+    try:
+        return max(1, int(value))
+    except ValueError:
+        return 2
+
+def conf_getMapRenderTimeoutSeconds():
+    """Gibt zurück nach wie vielen Sekunden ein Render-Auftrag (inkl. Wartezeit) abgebrochen wird"""
+    value = os.getenv('MAP_RENDER_TIMEOUT_SECONDS', '60')
+    try:
+        return max(1.0, float(value))
+    except ValueError:
+        return 60.0
+
+def conf_getMapRenderMaxPending():
+    """Gibt zurück wie viele Render-Aufträge höchstens gleichzeitig offen sein dürfen (wartend + laufend)"""
+    value = os.getenv('MAP_RENDER_MAX_PENDING', '8')
+    try:
+        return max(1, int(value))
+    except ValueError:
+        return 8
+
+# Paralleles Laden von Tiles
+def conf_getTileFetchConcurrencyPerHost():
+    """Gibt zurück wie viele Tiles gleichzeitig von einem Tile-Server geladen werden"""
+    value = os.getenv('TILE_FETCH_CONCURRENCY_PER_HOST', '2')
+    try:
+        return max(1, int(value))
+    except ValueError:
+        return 2
+
+def conf_getTileFetchTimeoutSeconds():
+    """Gibt die maximale Dauer (Sekunden) für den Download eines Tiles zurück"""
+    value = os.getenv('TILE_FETCH_TIMEOUT_SECONDS', '10')
+    try:
+        return float(value)
+    except ValueError:
+        return 10.0
+
+def conf_getTilePrefetchPaddingMeters():
+    """Gibt zurück wie weit (Meter) um das Spielfeld herum Tiles vorab geladen werden"""
+    value = os.getenv('TILE_PREFETCH_PADDING_METERS', '100')
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return 100.0
+
+def conf_getTilePrefetchExtraZoomLevels():
+    """Gibt zurück für wie viele feinere Zoomstufen als die der Karte Tiles vorab geladen werden"""
+    value = os.getenv('TILE_PREFETCH_EXTRA_ZOOM_LEVELS', '0')
+    try:
+        return max(0, int(value))
+    except ValueError:
+        return 0
@@ -1,13 +1,24 @@
 import sqlite3
+import threading
 from logger import logger_newLog
-from config import conf_getDatabaseFile
-from datetime import datetime
+from config import conf_getDatabaseFile, conf_getDatabaseCacheSizeKB, conf_getDatabaseMmapSizeMB
+from datetime import datetime, timedelta
+from game_config import game_config_invalidate, GAME_CONFIG_COLUMNS
+from user_session import (user_session_invalidate, user_session_update, USER_COLUMN_LAST_SEEN,
+                          USER_COLUMN_LOCATION_LAT, USER_COLUMN_LOCATION_LON, USER_COLUMN_LOCATION_TIMESTAMP)
+
+# Verbindungspool: Verbindungen werden einmal geöffnet und konfiguriert und danach wiederverwendet.
+# Jeder Thread hat seine eigenen freien Verbindungen, da sqlite3-Verbindungen nicht threadsicher sind.
+db_pool = threading.local()
+db_pool_lock = threading.Lock()
+db_pool_connections = []  # Alle offenen Verbindungen (zum Schließen beim Beenden)
+db_pool_generation = 0    # Wird beim Schließen erhöht, damit Threads ihre alten Verbindungen verwerfen
+DB_POOL_MAX_IDLE = 4      # Maximale Anzahl freier Verbindungen pro Thread
 
 def db_init():
     """Initialisiert die SQLite Datenbank"""
     try:
-        db_file = conf_getDatabaseFile()
-        conn = sqlite3.connect(db_file)
+        conn = db_get_connection()
         cursor = conn.cursor()
         
         # Erstelle users Tabelle
@@ -132,21 +143,226 @@ def db_init():
             )
         ''')
         
+        # Erstelle finish_crossings Tabelle (erste Zielüberquerung pro Runner und Spiel)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS finish_crossings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                game_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                lat REAL NOT NULL,
+                lon REAL NOT NULL,
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(game_id, user_id),
+                FOREIGN KEY (game_id) REFERENCES games(game_id),
+                FOREIGN KEY (user_id) REFERENCES users(user_id)
+            )
+        ''')
+        
         conn.commit()
+        
+        # Indizes für die häufigen Abfragen anlegen bzw. aktualisieren
+        db_migrate_indexes(conn)
         conn.close()
+        
+        # Prüfe ob die häufigen Abfragen die Indizes verwenden
+        for problem in db_checkQueryPlans():
+            logger_newLog("warning", "db_init", f"Abfrage ohne passenden Index: {problem}")
+        
         logger_newLog("info", "db_init", "Datenbank erfolgreich initialisiert")
         return True
     except Exception as e:
         logger_newLog("error", "db_init", f"Datenbankfehler: {str(e)}")
         return False
 
-def db_get_connection():
-    """Gibt eine Datenbankverbindung zurück"""
-    db_file = conf_getDatabaseFile()
-    conn = sqlite3.connect(db_file, timeout=30.0)  # 30 Sekunden Timeout
+# Versionierte Indizes: {Version: [SQL, ...]}
+# Neue Indizes immer als neue Version anhängen, bestehende Versionen nicht mehr ändern.
+# Die aktuelle Version steht in PRAGMA user_version.
+DB_INDEX_MIGRATIONS = {
+    1: [
+        # db_getRunners, db_getHunters, db_getTeamMembers
+        "CREATE INDEX IF NOT EXISTS idx_users_game_role_team ON users(game_id, role, team)",
+        # db_POI_get_by_type (sortiert nach timestamp)
+        "CREATE INDEX IF NOT EXISTS idx_poi_game_type_timestamp ON poi(game_id, type, timestamp)",
+        # db_Locations_get_position (neueste Position bzw. Zeitfenster)
+        "CREATE INDEX IF NOT EXISTS idx_locations_game_user_timestamp ON locations(game_id, user_id, timestamp)",
+        # db_getGamesWithStatus (Scheduler)
+        "CREATE INDEX IF NOT EXISTS idx_games_status ON games(status)",
+    ],
+}
+
+def db_migrate_indexes(conn):
+    """Legt alle Indizes an, die neuer sind als die Version in der Datenbank"""
+    current_version = conn.execute("PRAGMA user_version").fetchone()[0]
+    target_version = max(DB_INDEX_MIGRATIONS)
+    if current_version >= target_version:
+        return
+    
+    for version in sorted(DB_INDEX_MIGRATIONS):
+        if version <= current_version:
+            continue
+        for statement in DB_INDEX_MIGRATIONS[version]:
+            conn.execute(statement)
+        conn.execute(f"PRAGMA user_version = {version}")
+        conn.commit()
+        logger_newLog("info", "db_migrate_indexes", f"Datenbank-Indizes auf Version {version} aktualisiert")
+    
+    # Statistiken für den Query-Planer aktualisieren
+    conn.execute("ANALYZE")
+    conn.commit()
+
+# Häufige Abfragen - dieselben Strings verwenden die db_*-Funktionen und die Prüfung in db_checkQueryPlans
+DB_SQL_GET_RUNNERS = "SELECT user_id, username, team, location_lat, location_lon, location_timestamp FROM users WHERE game_id = ? AND role = 'runner' AND is_banned = 0"
+DB_SQL_GET_HUNTERS = "SELECT user_id, username, team, location_lat, location_lon, location_timestamp FROM users WHERE game_id = ? AND role = 'hunter' AND is_banned = 0"
+DB_SQL_GET_TEAM_HUNTERS = "SELECT user_id, username, team, location_lat, location_lon, location_timestamp FROM users WHERE game_id = ? AND role = 'hunter' AND team = ? AND is_banned = 0"
+DB_SQL_GET_USER_POSITION = "SELECT user_id, username, team, location_lat, location_lon, location_timestamp, role, game_id FROM users WHERE user_id = ? AND is_banned = 0"
+DB_SQL_GET_GAMES_WITH_STATUS = "SELECT * FROM games WHERE status = ?"
+DB_SQL_GET_POI_BY_TYPE = "SELECT id, game_id, type, lat, lon, range_meters, team, creator_id, timestamp FROM poi WHERE game_id = ? AND type = ? ORDER BY timestamp DESC"
+DB_SQL_GET_LATEST_POSITION = "SELECT lat, lon, timestamp FROM locations WHERE game_id = ? AND user_id = ? ORDER BY timestamp DESC LIMIT 1"
+DB_SQL_GET_POSITION_WINDOW = "SELECT lat, lon, timestamp FROM locations WHERE game_id = ? AND user_id = ? AND timestamp <= datetime('now', ?) AND timestamp >= datetime('now', ?) ORDER BY timestamp DESC LIMIT 1"
+DB_SQL_GET_WALLET = "SELECT * FROM wallet WHERE game_id = ? AND type = ? AND name = ?"
+
+# Häufige Abfragen, die immer einen Index verwenden müssen: (Name, SQL, Parameter)
+DB_HOT_QUERIES = [
+    ("db_getRunners", DB_SQL_GET_RUNNERS, (1,)),
+    ("db_getHunters", DB_SQL_GET_HUNTERS, (1,)),
+    ("db_getTeamMembers", DB_SQL_GET_TEAM_HUNTERS, (1, 'red')),
+    ("db_getUserPosition", DB_SQL_GET_USER_POSITION, (1,)),
+    ("db_getGamesWithStatus", DB_SQL_GET_GAMES_WITH_STATUS, ('running',)),
+    ("db_POI_get_by_type", DB_SQL_GET_POI_BY_TYPE, (1, 'TRAP')),
+    ("db_Locations_get_position", DB_SQL_GET_LATEST_POSITION, (1, 1)),
+    ("db_Locations_get_position (Zeitfenster)", DB_SQL_GET_POSITION_WINDOW, (1, 1, '-4 minutes', '-6 minutes')),
+    ("db_Wallet_get", DB_SQL_GET_WALLET, (1, 'hunter', 'red')),
+]
+
+def db_checkQueryPlans():
+    """Prüft mit EXPLAIN QUERY PLAN, ob die häufigen Abfragen einen Index verwenden
+    
+    Returns:
+        Liste der Probleme (leer wenn alle Abfragen Indizes verwenden)
+    """
+    problems = []
+    conn = db_get_connection()
+    try:
+        for name, sql, params in DB_HOT_QUERIES:
+            plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+            for row in plan:
+                detail = row[-1]
+                # "SCAN" = ganze Tabelle bzw. ganzer Index wird gelesen, "TEMP B-TREE" = Sortierung ohne Index
+                if detail.startswith("SCAN") or "TEMP B-TREE" in detail:
+                    problems.append(f"{name}: {detail}")
+    finally:
+        conn.close()
+    return problems
+
+class PooledConnection:
+    """Hülle um eine Verbindung aus dem Pool
+
+    Verhält sich wie eine sqlite3-Verbindung, close() gibt die Verbindung aber
+    nur an den Pool zurück. Nicht abgeschlossene Transaktionen werden dabei verworfen.
+    """
+
+    def __init__(self, conn, db_file):
+        self._conn = conn
+        self._db_file = db_file
+
+    def __getattr__(self, name):
+        conn = self.__dict__.get('_conn')
+        if conn is None:
+            raise sqlite3.ProgrammingError("Verbindung wurde bereits an den Pool zurückgegeben")
+        return getattr(conn, name)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self._conn.__exit__(exc_type, exc_value, traceback)
+
+    def close(self):
+        conn = self.__dict__.get('_conn')
+        if conn is None:
+            return
+        self._conn = None
+        db_release_connection(conn, self._db_file)
+
+    def __del__(self):
+        # Funktionen, die bei einem Fehler close() überspringen, geben die Verbindung so trotzdem zurück
+        try:
+            self.close()
+        except Exception:
+            pass
+
+def db_open_connection(db_file):
+    """Öffnet eine neue Datenbankverbindung und setzt die PRAGMAs (nur einmal pro Verbindung)"""
+    conn = sqlite3.connect(db_file, timeout=30.0, check_same_thread=False)  # 30 Sekunden Timeout
     conn.execute("PRAGMA journal_mode=WAL")  # Write-Ahead Logging für bessere Performance
+    conn.execute("PRAGMA synchronous=NORMAL")  # Im WAL-Modus sicher, spart fsync bei jedem Commit
+    conn.execute(f"PRAGMA cache_size=-{conf_getDatabaseCacheSizeKB()}")  # Negativ = Größe in KiB
+    conn.execute(f"PRAGMA mmap_size={conf_getDatabaseMmapSizeMB() * 1024 * 1024}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    with db_pool_lock:
+        db_pool_connections.append(conn)
+    logger_newLog("debug", "db_open_connection", f"Neue Datenbankverbindung geöffnet ({threading.current_thread().name})")
     return conn
 
+def db_discard_connection(conn):
+    """Schließt eine Verbindung endgültig und entfernt sie aus dem Pool"""
+    with db_pool_lock:
+        if conn in db_pool_connections:
+            db_pool_connections.remove(conn)
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+def db_get_idle_connections(db_file):
+    """Gibt die Liste freier Verbindungen des aktuellen Threads für eine Datenbankdatei zurück"""
+    if getattr(db_pool, 'generation', None) != db_pool_generation:
+        db_pool.idle = {}
+        db_pool.generation = db_pool_generation
+    return db_pool.idle.setdefault(db_file, [])
+
+def db_get_connection():
+    """Gibt eine Datenbankverbindung aus dem Pool zurück
+
+    Die Verbindung wird nur beim ersten Mal geöffnet, danach wiederverwendet.
+    conn.close() gibt sie an den Pool zurück.
+    """
+    db_file = conf_getDatabaseFile()
+    idle = db_get_idle_connections(db_file)
+    conn = idle.pop() if idle else db_open_connection(db_file)
+    return PooledConnection(conn, db_file)
+
+def db_release_connection(conn, db_file):
+    """Gibt eine Verbindung an den Pool des aktuellen Threads zurück"""
+    try:
+        if conn.in_transaction:
+            # Nicht committete Änderungen verwerfen - wie beim Schließen einer Verbindung
+            conn.rollback()
+    except sqlite3.Error:
+        db_discard_connection(conn)
+        return
+
+    idle = db_get_idle_connections(db_file)
+    if len(idle) < DB_POOL_MAX_IDLE:
+        idle.append(conn)
+    else:
+        db_discard_connection(conn)
+
+def db_close_connections():
+    """Schließt alle Verbindungen des Pools (beim Beenden des Bots)"""
+    global db_pool_generation
+    with db_pool_lock:
+        connections = list(db_pool_connections)
+        db_pool_connections.clear()
+        db_pool_generation += 1
+    for conn in connections:
+        try:
+            conn.close()
+        except Exception:
+            pass
+    logger_newLog("info", "db_close_connections", f"{len(connections)} Datenbankverbindungen geschlossen")
+
 def db_User_setGameID(user_id, game_id):
     """Setzt die Game ID eines Users"""
     try:
@@ -159,6 +375,7 @@ def db_User_setGameID(user_id, game_id):
         ''', (game_id, user_id))
         
         conn.commit()
+        user_session_invalidate(user_id)
         conn.close()
         
         logger_newLog("info", "db_User_setGameID", f"Game ID für User {user_id} auf {game_id} gesetzt")
@@ -186,6 +403,7 @@ def db_User_setTeam(user_id, team):
         ''', (team, user_id))
         
         conn.commit()
+        user_session_invalidate(user_id)
         conn.close()
         
         if team is None:
@@ -209,6 +427,7 @@ def db_User_setRole(user_id, role):
         ''', (role, user_id))
         
         conn.commit()
+        user_session_invalidate(user_id)
         conn.close()
         db_User_setTeam(user_id, "red")
         logger_newLog("info", "db_User_setRole", f"Rolle für User {user_id} auf '{role}' gesetzt")
@@ -300,6 +519,7 @@ def db_User_update_location(user_id, lat, lon):
         ''', (lat, lon, now, user_id))
         
         conn.commit()
+        user_session_update(user_id, {USER_COLUMN_LOCATION_LAT: lat, USER_COLUMN_LOCATION_LON: lon, USER_COLUMN_LOCATION_TIMESTAMP: now})
         conn.close()
         
         logger_newLog("debug", "db_User_update_location", f"Standort aktualisiert für User {user_id}: {lat}, {lon}")
@@ -337,6 +557,7 @@ def db_User_update_lastseen(user_id):
         ''', (now, user_id))
         
         conn.commit()
+        user_session_update(user_id, {USER_COLUMN_LAST_SEEN: now})
         conn.close()
         
         logger_newLog("debug", "db_User_update_lastseen", f"Last seen aktualisiert für User {user_id}")
@@ -359,6 +580,7 @@ def db_User_new(user_id, username, first_name):
         ''', (user_id, username, first_name, now, now))
         
         conn.commit()
+        user_session_invalidate(user_id)
         conn.close()
         
         logger_newLog("info", "db_User_new", f"Neuer User hinzugefügt: {username} ({user_id})")
@@ -402,6 +624,7 @@ def db_Game_setField(game_id, field_coords, finish_coords):
               game_id))
         
         conn.commit()
+        game_config_invalidate(game_id)
         conn.close()
         
         logger_newLog("info", "db_Game_setField", f"Spielfeld für Spiel {game_id} gespeichert")
@@ -410,6 +633,25 @@ def db_Game_setField(game_id, field_coords, finish_coords):
         logger_newLog("error", "db_Game_setField", f"Fehler beim Speichern des Spielfelds: {str(e)}")
         return False
 
+def db_Game_getConfig(game_id):
+    """Holt alle Einstellungen eines Spiels mit einer Abfrage (Spalten siehe GAME_CONFIG_COLUMNS)
+    
+    Returns:
+        Tuple in der Reihenfolge von GAME_CONFIG_COLUMNS oder None
+    """
+    conn = None
+    try:
+        conn = db_get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT {", ".join(GAME_CONFIG_COLUMNS)} FROM games WHERE game_id = ?', (game_id,))
+        return cursor.fetchone()
+    except Exception as e:
+        logger_newLog("error", "db_Game_getConfig", f"Fehler beim Holen der Spielkonfiguration: {str(e)}")
+        return None
+    finally:
+        if conn:
+            conn.close()
+
 def db_Game_isGamemaster(user_id, game_id):
     """Prüft ob ein User der Gamemaster eines Spiels ist"""
     try:
@@ -467,11 +709,7 @@ def db_getRunners(game_id):
     try:
         conn = db_get_connection()
         cursor = conn.cursor()
-        cursor.execute('''
-            SELECT user_id, username, team, location_lat, location_lon, location_timestamp
-            FROM users
-            WHERE game_id = ? AND role = 'runner' AND is_banned = 0
-        ''', (game_id,))
+        cursor.execute(DB_SQL_GET_RUNNERS, (game_id,))
         runners = cursor.fetchall()
         conn.close()
         return runners
@@ -485,17 +723,9 @@ def db_getHunters(game_id, team=None):
         conn = db_get_connection()
         cursor = conn.cursor()
         if team:
-            cursor.execute('''
-                SELECT user_id, username, team, location_lat, location_lon, location_timestamp
-                FROM users
-                WHERE game_id = ? AND role = 'hunter' AND team = ? AND is_banned = 0
-            ''', (game_id, team))
+            cursor.execute(DB_SQL_GET_TEAM_HUNTERS, (game_id, team))
         else:
-            cursor.execute('''
-                SELECT user_id, username, team, location_lat, location_lon, location_timestamp
-                FROM users
-                WHERE game_id = ? AND role = 'hunter' AND is_banned = 0
-            ''', (game_id,))
+            cursor.execute(DB_SQL_GET_HUNTERS, (game_id,))
         hunters = cursor.fetchall()
         conn.close()
         return hunters
@@ -508,11 +738,7 @@ def db_getUserPosition(user_id):
     try:
         conn = db_get_connection()
         cursor = conn.cursor()
-        cursor.execute('''
-            SELECT user_id, username, team, location_lat, location_lon, location_timestamp, role, game_id
-            FROM users
-            WHERE user_id = ? AND is_banned = 0
-        ''', (user_id,))
+        cursor.execute(DB_SQL_GET_USER_POSITION, (user_id,))
         user = cursor.fetchone()
         conn.close()
         return user
@@ -525,11 +751,7 @@ def db_getTeamMembers(game_id, team):
     try:
         conn = db_get_connection()
         cursor = conn.cursor()
-        cursor.execute('''
-            SELECT user_id, username, team, location_lat, location_lon, location_timestamp
-            FROM users
-            WHERE game_id = ? AND role = 'hunter' AND team = ? AND is_banned = 0
-        ''', (game_id, team))
+        cursor.execute(DB_SQL_GET_TEAM_HUNTERS, (game_id, team))
         members = cursor.fetchall()
         conn.close()
         return members
@@ -549,6 +771,7 @@ def db_Game_setStartTime(game_id, start_time):
         ''', (start_time, game_id))
         
         conn.commit()
+        game_config_invalidate(game_id)
         conn.close()
         
         logger_newLog("info", "db_Game_setStartTime", f"Startzeit für Spiel {game_id} auf {start_time} gesetzt")
@@ -590,6 +813,7 @@ def db_Game_setDuration(game_id, duration_minutes):
         ''', (duration_minutes, game_id))
         
         conn.commit()
+        game_config_invalidate(game_id)
         conn.close()
         
         logger_newLog("info", "db_Game_setDuration", f"Spieldauer für Spiel {game_id} auf {duration_minutes} Minuten gesetzt")
@@ -631,6 +855,7 @@ def db_Game_setRunnerHeadstart(game_id, headstart_minutes):
         ''', (headstart_minutes, game_id))
         
         conn.commit()
+        game_config_invalidate(game_id)
         conn.close()
         
         logger_newLog("info", "db_Game_setRunnerHeadstart", f"Runner-Vorsprung für Spiel {game_id} auf {headstart_minutes} Minuten gesetzt")
@@ -672,6 +897,7 @@ def db_Game_setStatus(game_id, status):
         ''', (status, game_id))
         
         conn.commit()
+        game_config_invalidate(game_id)
         conn.close()
         
         logger_newLog("info", "db_Game_setStatus", f"Status für Spiel {game_id} auf '{status}' gesetzt")
@@ -706,7 +932,7 @@ def db_getGamesWithStatus(status):
     try:
         conn = db_get_connection()
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM games WHERE status = ?', (status,))
+        cursor.execute(DB_SQL_GET_GAMES_WITH_STATUS, (status,))
         games = cursor.fetchall()
         conn.close()
         return games
@@ -1020,6 +1246,7 @@ def db_Game_setStartBudgetRunner(game_id, budget):
         cursor = conn.cursor()
         cursor.execute('UPDATE games SET StartBudgetRunner = ?, updated_at = CURRENT_TIMESTAMP WHERE game_id = ?', (budget, game_id))
         conn.commit()
+        game_config_invalidate(game_id)
         conn.close()
         logger_newLog("info", "db_Game_setStartBudgetRunner", f"Runner-Startbudget für Spiel {game_id} auf {budget} gesetzt")
         return True
@@ -1034,6 +1261,7 @@ def db_Game_setStartBudgetHunter(game_id, budget):
         cursor = conn.cursor()
         cursor.execute('UPDATE games SET StartBudgetHunter = ?, updated_at = CURRENT_TIMESTAMP WHERE game_id = ?', (budget, game_id))
         conn.commit()
+        game_config_invalidate(game_id)
         conn.close()
         logger_newLog("info", "db_Game_setStartBudgetHunter", f"Hunter-Startbudget für Spiel {game_id} auf {budget} gesetzt")
         return True
@@ -1048,6 +1276,7 @@ def db_Game_setShopCooldown(game_id, cooldown):
         cursor = conn.cursor()
         cursor.execute('UPDATE games SET ShopCooldown = ?, updated_at = CURRENT_TIMESTAMP WHERE game_id = ?', (cooldown, game_id))
         conn.commit()
+        game_config_invalidate(game_id)
         conn.close()
         logger_newLog("info", "db_Game_setShopCooldown", f"Shop-Cooldown für Spiel {game_id} auf {cooldown} Minuten gesetzt")
         return True
@@ -1062,6 +1291,7 @@ def db_Game_setHunterShop1price(game_id, price):
         cursor = conn.cursor()
         cursor.execute('UPDATE games SET HunterShop1price = ?, updated_at = CURRENT_TIMESTAMP WHERE game_id = ?', (price, game_id))
         conn.commit()
+        game_config_invalidate(game_id)
         conn.close()
         logger_newLog("info", "db_Game_setHunterShop1price", f"Hunter Shop 1 Preis für Spiel {game_id} auf {price} gesetzt")
         return True
@@ -1075,6 +1305,7 @@ def db_Game_setHunterShop1amount(game_id, amount):
         cursor = conn.cursor()
         cursor.execute('UPDATE games SET HunterShop1amount = ?, updated_at = CURRENT_TIMESTAMP WHERE game_id = ?', (amount, game_id))
         conn.commit()
+        game_config_invalidate(game_id)
         conn.close()
         logger_newLog("info", "db_Game_setHunterShop1amount", f"Hunter Shop 1 Menge für Spiel {game_id} auf {amount} gesetzt")
         return True
@@ -1088,6 +1319,7 @@ def db_Game_setHunterShop2price(game_id, price):
         cursor = conn.cursor()
         cursor.execute('UPDATE games SET HunterShop2price = ?, updated_at = CURRENT_TIMESTAMP WHERE game_id = ?', (price, game_id))
         conn.commit()
+        game_config_invalidate(game_id)
         conn.close()
         logger_newLog("info", "db_Game_setHunterShop2price", f"Hunter Shop 2 Preis für Spiel {game_id} auf {price} gesetzt")
         return True
@@ -1101,6 +1333,7 @@ def db_Game_setHunterShop2amount(game_id, amount):
         cursor = conn.cursor()
         cursor.execute('UPDATE games SET HunterShop2amount = ?, updated_at = CURRENT_TIMESTAMP WHERE game_id = ?', (amount, game_id))
         conn.commit()
+        game_config_invalidate(game_id)
         conn.close()
         logger_newLog("info", "db_Game_setHunterShop2amount", f"Hunter Shop 2 Menge für Spiel {game_id} auf {amount} gesetzt")
         return True
@@ -1114,6 +1347,7 @@ def db_Game_setHunterShop3price(game_id, price):
         cursor = conn.cursor()
         cursor.execute('UPDATE games SET HunterShop3price = ?, updated_at = CURRENT_TIMESTAMP WHERE game_id = ?', (price, game_id))
         conn.commit()
+        game_config_invalidate(game_id)
         conn.close()
         logger_newLog("info", "db_Game_setHunterShop3price", f"Hunter Shop 3 Preis für Spiel {game_id} auf {price} gesetzt")
         return True
@@ -1127,6 +1361,7 @@ def db_Game_setHunterShop3amount(game_id, amount):
         cursor = conn.cursor()
         cursor.execute('UPDATE games SET HunterShop3amount = ?, updated_at = CURRENT_TIMESTAMP WHERE game_id = ?', (amount, game_id))
         conn.commit()
+        game_config_invalidate(game_id)
         conn.close()
         logger_newLog("info", "db_Game_setHunterShop3amount", f"Hunter Shop 3 Menge für Spiel {game_id} auf {amount} gesetzt")
         return True
@@ -1140,6 +1375,7 @@ def db_Game_setHunterShop4price(game_id, price):
         cursor = conn.cursor()
         cursor.execute('UPDATE games SET HunterShop4price = ?, updated_at = CURRENT_TIMESTAMP WHERE game_id = ?', (price, game_id))
         conn.commit()
+        game_config_invalidate(game_id)
         conn.close()
         logger_newLog("info", "db_Game_setHunterShop4price", f"Hunter Shop 4 Preis für Spiel {game_id} auf {price} gesetzt")
         return True
@@ -1153,6 +1389,7 @@ def db_Game_setHunterShop4amount(game_id, amount):
         cursor = conn.cursor()
         cursor.execute('UPDATE games SET HunterShop4amount = ?, updated_at = CURRENT_TIMESTAMP WHERE game_id = ?', (amount, game_id))
         conn.commit()
+        game_config_invalidate(game_id)
         conn.close()
         logger_newLog("info", "db_Game_setHunterShop4amount", f"Hunter Shop 4 Menge für Spiel {game_id} auf {amount} gesetzt")
         return True
@@ -1167,6 +1404,7 @@ def db_Game_setRunnerShop1price(game_id, price):
         cursor = conn.cursor()
         cursor.execute('UPDATE games SET RunnerShop1price = ?, updated_at = CURRENT_TIMESTAMP WHERE game_id = ?', (price, game_id))
         conn.commit()
+        game_config_invalidate(game_id)
         conn.close()
         logger_newLog("info", "db_Game_setRunnerShop1price", f"Runner Shop 1 Preis für Spiel {game_id} auf {price} gesetzt")
         return True
@@ -1180,6 +1418,7 @@ def db_Game_setRunnerShop1amount(game_id, amount):
         cursor = conn.cursor()
         cursor.execute('UPDATE games SET RunnerShop1amount = ?, updated_at = CURRENT_TIMESTAMP WHERE game_id = ?', (amount, game_id))
         conn.commit()
+        game_config_invalidate(game_id)
         conn.close()
         logger_newLog("info", "db_Game_setRunnerShop1amount", f"Runner Shop 1 Menge für Spiel {game_id} auf {amount} gesetzt")
         return True
@@ -1193,6 +1432,7 @@ def db_Game_setRunnerShop2price(game_id, price):
         cursor = conn.cursor()
         cursor.execute('UPDATE games SET RunnerShop2price = ?, updated_at = CURRENT_TIMESTAMP WHERE game_id = ?', (price, game_id))
         conn.commit()
+        game_config_invalidate(game_id)
         conn.close()
         logger_newLog("info", "db_Game_setRunnerShop2price", f"Runner Shop 2 Preis für Spiel {game_id} auf {price} gesetzt")
         return True
@@ -1206,6 +1446,7 @@ def db_Game_setRunnerShop2amount(game_id, amount):
         cursor = conn.cursor()
         cursor.execute('UPDATE games SET RunnerShop2amount = ?, updated_at = CURRENT_TIMESTAMP WHERE game_id = ?', (amount, game_id))
         conn.commit()
+        game_config_invalidate(game_id)
         conn.close()
         logger_newLog("info", "db_Game_setRunnerShop2amount", f"Runner Shop 2 Menge für Spiel {game_id} auf {amount} gesetzt")
         return True
@@ -1219,6 +1460,7 @@ def db_Game_setRunnerShop3price(game_id, price):
         cursor = conn.cursor()
         cursor.execute('UPDATE games SET RunnerShop3price = ?, updated_at = CURRENT_TIMESTAMP WHERE game_id = ?', (price, game_id))
         conn.commit()
+        game_config_invalidate(game_id)
         conn.close()
         logger_newLog("info", "db_Game_setRunnerShop3price", f"Runner Shop 3 Preis für Spiel {game_id} auf {price} gesetzt")
         return True
@@ -1232,6 +1474,7 @@ def db_Game_setRunnerShop3amount(game_id, amount):
         cursor = conn.cursor()
         cursor.execute('UPDATE games SET RunnerShop3amount = ?, updated_at = CURRENT_TIMESTAMP WHERE game_id = ?', (amount, game_id))
         conn.commit()
+        game_config_invalidate(game_id)
         conn.close()
         logger_newLog("info", "db_Game_setRunnerShop3amount", f"Runner Shop 3 Menge für Spiel {game_id} auf {amount} gesetzt")
         return True
@@ -1245,6 +1488,7 @@ def db_Game_setRunnerShop4price(game_id, price):
         cursor = conn.cursor()
         cursor.execute('UPDATE games SET RunnerShop4price = ?, updated_at = CURRENT_TIMESTAMP WHERE game_id = ?', (price, game_id))
         conn.commit()
+        game_config_invalidate(game_id)
         conn.close()
         logger_newLog("info", "db_Game_setRunnerShop4price", f"Runner Shop 4 Preis für Spiel {game_id} auf {price} gesetzt")
         return True
@@ -1258,6 +1502,7 @@ def db_Game_setRunnerShop4amount(game_id, amount):
         cursor = conn.cursor()
         cursor.execute('UPDATE games SET RunnerShop4amount = ?, updated_at = CURRENT_TIMESTAMP WHERE game_id = ?', (amount, game_id))
         conn.commit()
+        game_config_invalidate(game_id)
         conn.close()
         logger_newLog("info", "db_Game_setRunnerShop4amount", f"Runner Shop 4 Menge für Spiel {game_id} auf {amount} gesetzt")
         return True
@@ -1272,7 +1517,7 @@ def db_Wallet_get(game_id, wallet_type, name):
     try:
         conn = db_get_connection()
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM wallet WHERE game_id = ? AND type = ? AND name = ?', (game_id, wallet_type, name))
+        cursor.execute(DB_SQL_GET_WALLET, (game_id, wallet_type, name))
         wallet = cursor.fetchone()
         return wallet
     except Exception as e:
@@ -1357,6 +1602,40 @@ def db_Wallet_update_last_purchase(game_id, wallet_type, name):
         if conn:
             conn.close()
 
+def db_Wallet_purchase(game_id, wallet_type, name, item_id, price, cooldown_minutes):
+    """Bucht einen Kauf atomar ab: Budget, Bestand und Cooldown werden in einem
+    einzigen UPDATE geprüft und abgezogen. Gibt (neues Budget, verbleibende Anzahl)
+    zurück oder None, wenn eine der Bedingungen nicht mehr erfüllt ist."""
+    conn = None
+    try:
+        conn = db_get_connection()
+        cursor = conn.cursor()
+        now = datetime.now()
+        cutoff = (now - timedelta(minutes=cooldown_minutes)).isoformat()
+        cursor.execute(f'''
+            UPDATE wallet
+            SET budget = budget - ?, Item{item_id}available = Item{item_id}available - 1, last_purchase = ?
+            WHERE game_id = ? AND type = ? AND name = ?
+              AND budget >= ? AND Item{item_id}available > 0
+              AND (last_purchase IS NULL OR last_purchase <= ?)
+        ''', (price, now.isoformat(), game_id, wallet_type, name, price, cutoff))
+        if cursor.rowcount != 1:
+            conn.rollback()
+            logger_newLog("warning", "db_Wallet_purchase", f"Kauf von Item {item_id} für {wallet_type} {name} in Spiel {game_id} abgelehnt")
+            return None
+        cursor.execute(f'SELECT budget, Item{item_id}available FROM wallet WHERE game_id = ? AND type = ? AND name = ?',
+                      (game_id, wallet_type, name))
+        result = cursor.fetchone()
+        conn.commit()
+        logger_newLog("info", "db_Wallet_purchase", f"Item {item_id} für {wallet_type} {name} in Spiel {game_id} für {price} abgebucht")
+        return result[0], result[1]
+    except Exception as e:
+        logger_newLog("error", "db_Wallet_purchase", f"Fehler: {str(e)}")
+        return None
+    finally:
+        if conn:
+            conn.close()
+
 def db_Wallet_get_all_for_game(game_id):
     """Holt alle Wallets für ein Spiel"""
     conn = None
@@ -1478,24 +1757,10 @@ def db_Locations_get_position(game_id, user_id, age_minutes=0):
         
         if age_minutes == 0:
             # Neueste Position
-            cursor.execute('''
-                SELECT lat, lon, timestamp 
-                FROM locations 
-                WHERE game_id = ? AND user_id = ? 
-                ORDER BY timestamp DESC 
-                LIMIT 1
-            ''', (game_id, user_id))
+            cursor.execute(DB_SQL_GET_LATEST_POSITION, (game_id, user_id))
         else:
             # Position von vor X Minuten (±1 Minute Toleranz)
-            cursor.execute('''
-                SELECT lat, lon, timestamp 
-                FROM locations 
-                WHERE game_id = ? AND user_id = ? 
-                AND timestamp <= datetime('now', '-{} minutes')
-                AND timestamp >= datetime('now', '-{} minutes')
-                ORDER BY timestamp DESC 
-                LIMIT 1
-            '''.format(age_minutes - 1, age_minutes + 1), (game_id, user_id))
+            cursor.execute(DB_SQL_GET_POSITION_WINDOW, (game_id, user_id, f'-{age_minutes - 1} minutes', f'-{age_minutes + 1} minutes'))
         
         result = cursor.fetchone()
         
@@ -1558,9 +1823,18 @@ def db_POI_add(game_id, poi_type, lat, lon, range_meters=None, team=None, creato
             INSERT INTO poi (game_id, type, lat, lon, range_meters, team, creator_id)
             VALUES (?, ?, ?, ?, ?, ?, ?)
         ''', (game_id, poi_type, lat, lon, range_meters, team, creator_id))
-        
+        poi_id = cursor.lastrowid
+
         conn.commit()
         logger_newLog("info", "db_POI_add", f"POI {poi_type} für Spiel {game_id} hinzugefügt: {lat}, {lon} (Range: {range_meters}m, Team: {team}, Erstellt von {creator_id})")
+
+        # Räumlichen Index aktuell halten (Check_location liest nur noch aus dem Index)
+        from poi_index import INDEXED_POI_TYPES, poi_index_add
+        if poi_type in INDEXED_POI_TYPES:
+            cursor.execute('SELECT * FROM poi WHERE id = ?', (poi_id,))
+            poi = cursor.fetchone()
+            if poi:
+                poi_index_add(poi)
         return True
     except Exception as e:
         logger_newLog("error", "db_POI_add", f"Fehler beim Hinzufügen des POI: {str(e)}")
@@ -1589,12 +1863,7 @@ def db_POI_get_by_type(game_id, poi_type):
         conn = db_get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT id, game_id, type, lat, lon, range_meters, team, creator_id, timestamp
-            FROM poi 
-            WHERE game_id = ? AND type = ?
-            ORDER BY timestamp DESC
-        ''', (game_id, poi_type))
+        cursor.execute(DB_SQL_GET_POI_BY_TYPE, (game_id, poi_type))
         
         pois = cursor.fetchall()
         logger_newLog("debug", "db_POI_get_by_type", f"{len(pois)} POIs vom Typ {poi_type} für Spiel {game_id} gefunden")
@@ -1604,4 +1873,64 @@ def db_POI_get_by_type(game_id, poi_type):
         return []
     finally:
         if conn:
-            conn.close() 
\ No newline at end of file
+            conn.close() 
+
+def db_FinishCrossings_add(game_id, user_id, lat, lon):
+    """Speichert die Zielüberquerung eines Runners (nur die erste pro Spiel)
+    
+    Args:
+        game_id: ID des Spiels
+        user_id: ID des Runners
+        lat: Breitengrad der Position nach der Überquerung
+        lon: Längengrad der Position nach der Überquerung
+    
+    Returns:
+        True wenn die Überquerung neu gespeichert wurde, False wenn sie schon existierte, None bei Fehler
+    """
+    conn = None
+    try:
+        conn = db_get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            INSERT OR IGNORE INTO finish_crossings (game_id, user_id, lat, lon)
+            VALUES (?, ?, ?, ?)
+        ''', (game_id, user_id, lat, lon))
+        inserted = cursor.rowcount > 0
+        
+        conn.commit()
+        if inserted:
+            logger_newLog("info", "db_FinishCrossings_add", f"Zielüberquerung von User {user_id} in Spiel {game_id} gespeichert: {lat}, {lon}")
+        return inserted
+    except Exception as e:
+        logger_newLog("error", "db_FinishCrossings_add", f"Fehler beim Speichern der Zielüberquerung: {str(e)}")
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+def db_FinishCrossings_get(game_id):
+    """Holt alle Zielüberquerungen eines Spiels
+    
+    Returns:
+        Liste von Tuples (user_id, lat, lon, timestamp) sortiert nach Zeit oder leere Liste
+    """
+    conn = None
+    try:
+        conn = db_get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT user_id, lat, lon, timestamp
+            FROM finish_crossings
+            WHERE game_id = ?
+            ORDER BY timestamp
+        ''', (game_id,))
+        
+        return cursor.fetchall()
+    except Exception as e:
+        logger_newLog("error", "db_FinishCrossings_get", f"Fehler beim Holen der Zielüberquerungen: {str(e)}")
+        return []
+    finally:
+        if conn:
+            conn.close()
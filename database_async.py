@@ -0,0 +1,58 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from logger import logger_newLog
+from config import conf_getDatabaseReadThreads
+
+# Schreibzugriffe laufen nacheinander in einem eigenen Thread, damit sie sich nicht
+# gegenseitig um die SQLite-Schreibsperre streiten. Lesezugriffe laufen parallel
+# in einem kleinen Pool (im WAL-Modus blockieren Leser den Schreiber nicht).
+db_write_executor = None
+db_read_executor = None
+
+# Bestandteile von Funktionsnamen, die auf einen Schreibzugriff hinweisen (z.B. db_User_setRole, db_POI_add)
+DB_WRITE_MARKERS = ('set', 'new', 'add', 'update', 'create', 'decrement', 'init', 'migrate', 'delete', 'remove')
+
+def db_get_executors():
+    """Gibt die Executor für Schreib- und Lesezugriffe zurück und erstellt sie bei Bedarf"""
+    global db_write_executor, db_read_executor
+    if db_write_executor is None:
+        db_write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+        db_read_executor = ThreadPoolExecutor(max_workers=max(1, conf_getDatabaseReadThreads()), thread_name_prefix="db-read")
+        logger_newLog("info", "db_get_executors", f"Datenbank-Threads gestartet (1 Schreiber, {conf_getDatabaseReadThreads()} Leser)")
+    return db_write_executor, db_read_executor
+
+def db_is_write(func):
+    """Erkennt anhand des Funktionsnamens, ob eine db_*-Funktion schreibt"""
+    name = getattr(func, '__name__', '').lower()
+    if name.startswith('db_'):
+        name = name[3:]
+    return any(marker in name for marker in DB_WRITE_MARKERS)
+
+async def db_async(func, *args, write=None, **kwargs):
+    """Führt eine blockierende Datenbankfunktion außerhalb der Event-Loop aus
+
+    Args:
+        func: Synchrone Funktion (z.B. db_User_get)
+        *args, **kwargs: Argumente für func
+        write: True = Schreib-Thread, False = Lese-Pool, None = anhand des Namens entscheiden
+
+    Returns:
+        Rückgabewert von func
+    """
+    write_executor, read_executor = db_get_executors()
+    if write is None:
+        write = db_is_write(func)
+    executor = write_executor if write else read_executor
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+def db_shutdown_executors():
+    """Beendet die Datenbank-Threads (beim Beenden des Bots)"""
+    global db_write_executor, db_read_executor
+    for executor in (db_write_executor, db_read_executor):
+        if executor is not None:
+            executor.shutdown(wait=True)
+    db_write_executor = None
+    db_read_executor = None
@@ -0,0 +1,129 @@
+import math
+from datetime import datetime
+from logger import logger_newLog
+from telegram_outbound import PRIORITY_CRITICAL
+from database_async import db_async
+
+EARTH_RADIUS_METERS = 6371000
+
+# Ziellinie pro Spiel: {game_id: ((lat1, lon1), (lat2, lon2)) oder None wenn nicht gesetzt}
+finish_lines = {}
+# Runner, deren Überquerung bereits gespeichert ist: {game_id: set(user_id)}
+finish_crossed = {}
+# Letzter Live-Standort pro Runner: {user_id: (game_id, lat, lon)}
+finish_last_fixes = {}
+
+def finish_project(lat, lon, ref_lat, ref_lon):
+    """Projiziert eine Koordinate in ein lokales ebenes System (Meter) um den Bezugspunkt"""
+    x = math.radians(lon - ref_lon) * math.cos(math.radians(ref_lat)) * EARTH_RADIUS_METERS
+    y = math.radians(lat - ref_lat) * EARTH_RADIUS_METERS
+    return x, y
+
+def finish_segments_intersect(p1, p2, q1, q2):
+    """Prüft ob sich die Strecken p1-p2 und q1-q2 schneiden (Berührung zählt als Schnitt)"""
+    def orientation(a, b, c):
+        value = (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+        return (value > 0) - (value < 0)
+
+    def on_segment(a, b, c):
+        # c liegt auf der Geraden a-b, prüfe ob auch innerhalb der Strecke
+        return min(a[0], b[0]) <= c[0] <= max(a[0], b[0]) and min(a[1], b[1]) <= c[1] <= max(a[1], b[1])
+
+    o1 = orientation(p1, p2, q1)
+    o2 = orientation(p1, p2, q2)
+    o3 = orientation(q1, q2, p1)
+    o4 = orientation(q1, q2, p2)
+
+    if o1 != o2 and o3 != o4:
+        return True
+    return ((o1 == 0 and on_segment(p1, p2, q1)) or (o2 == 0 and on_segment(p1, p2, q2)) or
+            (o3 == 0 and on_segment(q1, q2, p1)) or (o4 == 0 and on_segment(q1, q2, p2)))
+
+def finish_line_crossed(previous, current, line):
+    """Prüft ob die Bewegung von previous nach current die Ziellinie schneidet
+
+    Args:
+        previous, current: (lat, lon)
+        line: ((lat1, lon1), (lat2, lon2))
+    """
+    (lat1, lon1), (lat2, lon2) = line
+    ref_lat = (lat1 + lat2) / 2
+    ref_lon = (lon1 + lon2) / 2
+    return finish_segments_intersect(
+        finish_project(previous[0], previous[1], ref_lat, ref_lon),
+        finish_project(current[0], current[1], ref_lat, ref_lon),
+        finish_project(lat1, lon1, ref_lat, ref_lon),
+        finish_project(lat2, lon2, ref_lat, ref_lon),
+    )
+
+def finish_load_game(game_id):
+    """Liest Ziellinie und bereits gespeicherte Überquerungen eines Spiels aus der Datenbank"""
+    from database import db_Game_getField, db_FinishCrossings_get
+    game = db_Game_getField(game_id)
+    line = None
+    if game and not any(value is None for value in game[12:16]):
+        line = ((game[12], game[13]), (game[14], game[15]))
+    crossed = {crossing[0] for crossing in db_FinishCrossings_get(game_id)}
+    return line, crossed
+
+def finish_line_invalidate(game_id):
+    """Verwirft die zwischengespeicherte Ziellinie (nach Änderung des Spielfelds)"""
+    finish_lines.pop(game_id, None)
+
+def finish_drop_game(game_id):
+    """Verwirft alle Daten eines Spiels (z.B. nach Spielende)"""
+    finish_lines.pop(game_id, None)
+    finish_crossed.pop(game_id, None)
+    for user_id in [user_id for user_id, fix in finish_last_fixes.items() if fix[0] == game_id]:
+        del finish_last_fixes[user_id]
+
+async def finish_line_check_location(bot, game_id, user_id, name, lat, lon):
+    """Prüft ob ein Runner seit seinem letzten Live-Standort die Ziellinie überquert hat
+
+    Die erste Überquerung wird gespeichert und dem Gamemaster gemeldet.
+
+    Returns:
+        True wenn die Ziellinie gerade zum ersten Mal überquert wurde, sonst False
+    """
+    previous = finish_last_fixes.get(user_id)
+    finish_last_fixes[user_id] = (game_id, lat, lon)
+    if previous is None or previous[0] != game_id:
+        return False
+
+    if game_id not in finish_lines:
+        line, crossed = await db_async(finish_load_game, game_id, write=False)
+        finish_lines[game_id] = line
+        finish_crossed.setdefault(game_id, set()).update(crossed)
+    line = finish_lines[game_id]
+    crossed = finish_crossed.setdefault(game_id, set())
+    if line is None or user_id in crossed:
+        return False
+
+    if not finish_line_crossed((previous[1], previous[2]), (lat, lon), line):
+        return False
+
+    # Schon vor dem Speichern vormerken, damit ein gleichzeitiges Standort-Update nicht doppelt meldet
+    crossed.add(user_id)
+    from database import db_FinishCrossings_add
+    inserted = await db_async(db_FinishCrossings_add, game_id, user_id, lat, lon)
+    if inserted is None:
+        # Speichern fehlgeschlagen: beim nächsten Standort-Update erneut versuchen,
+        # dafür die Strecke ab dem Punkt vor der Linie weiter prüfen
+        crossed.discard(user_id)
+        finish_last_fixes[user_id] = previous
+        return False
+    if not inserted:
+        return False
+
+    crossing_time = datetime.now().strftime('%H:%M:%S')
+    logger_newLog("info", "finish_line_check_location", f"Runner {name} ({user_id}) hat in Spiel {game_id} um {crossing_time} die Ziellinie überquert")
+
+    from database import db_Game_getField
+    game = await db_async(db_Game_getField, game_id)
+    if game:
+        message = f"🏁 **Ziellinie überquert!**\n\n"
+        message += f"🏃 **Runner:** {name}\n"
+        message += f"🕐 **Zeit:** {crossing_time}\n"
+        message += f"📍 **Position:** {lat:.6f}, {lon:.6f}"
+        await bot.send_message(game[2], message, priority=PRIORITY_CRITICAL)
+    return True
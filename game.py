@@ -1,38 +1,13 @@
 import asyncio
+import heapq
+import itertools
 from logger import logger_newLog
-from database import db_getUsers, db_getGamesWithStatus, db_Game_getStartTime, db_Game_getDuration, db_Game_setStatus, db_getHunters, db_getRunners, db_Game_getField
-from datetime import datetime, timedelta
+from database import db_getGamesWithStatus, db_Game_setStatus, db_getHunters, db_getRunners, db_Game_getField
+from datetime import datetime
 from config import conf_getMaxLocationAgeMinutes
 from time import time
-
-async def game_updateLocations():
-    """Prüft die Standorte aller Spieler in der Datenbank"""
-    logger_newLog("debug", "game_updateLocations", "Standort-Update gestartet")
-    
-    # Hole alle aktiven User aus der Datenbank
-    users = db_getUsers()
-    
-    for user in users:
-        user_id, username, first_name, lat, lon, timestamp, role, team, game_id = user
-        
-        if lat is not None and lon is not None:
-            logger_newLog("debug", "game_updateLocations", f"User {username} ({user_id}) hat Standort: {lat}, {lon} (Timestamp: {timestamp})")
-            
-            # Speichere Standort in locations Tabelle, wenn das Spiel läuft
-            if game_id is not None:
-                from database import db_Game_getStatus, db_Locations_add
-                game_status = db_Game_getStatus(game_id)
-                
-                # Nur speichern wenn das Spiel läuft (headstart oder running)
-                if game_status in ['headstart', 'running']:
-                    if db_Locations_add(user_id, game_id, lat, lon):
-                        logger_newLog("debug", "game_updateLocations", f"Standort für User {username} ({user_id}) in Spiel {game_id} gespeichert")
-                    else:
-                        logger_newLog("error", "game_updateLocations", f"Fehler beim Speichern des Standorts für User {username} ({user_id})")
-            
-            # TODO: Spiellogik basierend auf Standorten
-        else:
-            logger_newLog("debug", "game_updateLocations", f"User {username} ({user_id}) hat keinen Standort freigegeben")
+from telegram_outbound import PRIORITY_CRITICAL
+from database_async import db_async
 
 async def check_player_locations(game_id):
     from database import db_getRunners, db_getHunters, db_Game_getField
@@ -41,9 +16,9 @@ async def check_player_locations(game_id):
     bot = TelegramBot()
     max_age_min = conf_getMaxLocationAgeMinutes()
     now = datetime.now()
-    runners = db_getRunners(game_id)
-    hunters = db_getHunters(game_id)
-    game = db_Game_getField(game_id)
+    runners = await db_async(db_getRunners, game_id)
+    hunters = await db_async(db_getHunters, game_id)
+    game = await db_async(db_Game_getField, game_id)
     gamemaster_id = game[2] if game else None
     outdated_players = []
     for player in list(runners) + list(hunters):
@@ -69,93 +44,165 @@ async def check_player_locations(game_id):
         except Exception as e:
             logger_newLog("error", "check_player_locations", f"Fehler beim Senden an Gamemaster: {str(e)}")
 
+# Zeitgesteuerte Spielereignisse statt regelmäßigem Abfragen aller Spiele.
+# Heap-Einträge: (Fälligkeit als Unix-Zeit, Sequenz, game_id, Ereignis, Version)
+EVENT_HEADSTART_END = "headstart_end"
+EVENT_GAME_END = "game_end"
+EVENT_LOCATION_CHECK = "location_check"
+LOCATION_CHECK_INTERVAL = 60  # Sekunden zwischen zwei Standort-Prüfungen pro Spiel
+
+scheduled_events = []
+scheduled_versions = {}  # {game_id: Version} - Einträge mit älterer Version werden übersprungen
+event_sequence = itertools.count()
+scheduler_wakeup = None  # asyncio.Event, weckt den Scheduler wenn sich Zeiten ändern
+scheduler_tasks = set()  # Laufende Ereignis-Tasks (Referenzen, damit sie nicht eingesammelt werden)
+
+def game_schedule_event(due, game_id, event, version=None):
+    """Plant ein Ereignis für eine Version eines Spiels ein (Standard: die aktuelle)"""
+    if version is None:
+        version = scheduled_versions.get(game_id, 0)
+    heapq.heappush(scheduled_events, (due, next(event_sequence), game_id, event, version))
+
+async def game_reschedule(game_id):
+    """Plant die Ereignisse eines Spiels (neu) anhand der Datenbank ein
+    
+    Muss aufgerufen werden, wenn sich Status, Startzeit, Dauer oder Vorsprung
+    eines Spiels ändern. Bereits eingeplante Ereignisse des Spiels werden verworfen.
+    """
+    from game_config import game_config_load
+    version = scheduled_versions.get(game_id, 0) + 1
+    scheduled_versions[game_id] = version
+    
+    game_config = await game_config_load(game_id)
+    if scheduled_versions.get(game_id) != version:
+        return  # Während des Ladens neu eingeplant oder beendet - der neuere Aufruf plant ein
+    status = game_config.status if game_config else None
+    if status in ['headstart', 'running']:
+        start_time_str = game_config.start_time
+        duration_minutes = game_config.duration_minutes
+        headstart_minutes = game_config.runner_headstart_minutes
+        
+        if start_time_str:
+            start_ts = datetime.fromisoformat(start_time_str).timestamp()
+            # Wie bisher: Headstart endet nur mit gesetztem Vorsprung, das Spielende
+            # zählt erst im Status 'running' (game_end_headstart plant dann neu ein)
+            if status == 'headstart' and headstart_minutes is not None:
+                game_schedule_event(start_ts + headstart_minutes * 60, game_id, EVENT_HEADSTART_END, version)
+            if status == 'running' and duration_minutes:
+                game_schedule_event(start_ts + duration_minutes * 60, game_id, EVENT_GAME_END, version)
+        game_schedule_event(time() + LOCATION_CHECK_INTERVAL, game_id, EVENT_LOCATION_CHECK, version)
+        logger_newLog("debug", "game_reschedule", f"Spiel {game_id} ({status}): Ereignisse eingeplant")
+    
+    if scheduler_wakeup is not None:
+        scheduler_wakeup.set()
+
+async def game_status(game_id):
+    """Gibt den Status eines Spiels aus der zwischengespeicherten Spielkonfiguration zurück"""
+    from game_config import game_config_load
+    game_config = await game_config_load(game_id)
+    return game_config.status if game_config else None
+
+async def game_end_headstart(game_id):
+    """Headstart vorbei: Status auf 'running' setzen und die Jagd starten"""
+    if await game_status(game_id) != 'headstart':
+        return
+    await db_async(db_Game_setStatus, game_id, "running")
+    logger_newLog("info", "game_Scheduler", f"Spiel {game_id}: Headstart vorbei, Status auf 'running' gesetzt.")
+    await game_reschedule(game_id)  # Spielende einplanen
+    # Sende Startsignal an Hunter und Runner
+    from telegram_bot import TelegramBot
+    bot = TelegramBot()
+    hunters = await db_async(db_getHunters, game_id)
+    runners = await db_async(db_getRunners, game_id)
+    messages = {runner[0]: "⚠️ Die Hunter sind jetzt unterwegs! Die Jagd beginnt!" for runner in runners}
+    messages.update({hunter[0]: "🦊 Du darfst jetzt loslegen! Die Jagd beginnt!" for hunter in hunters})
+    await bot.broadcast(list(messages), messages, priority=PRIORITY_CRITICAL)
+
+async def game_end(game_id):
+    """Spielzeit abgelaufen: Status auf 'ended' setzen und alle benachrichtigen"""
+    if await game_status(game_id) != 'running':
+        return
+    await db_async(db_Game_setStatus, game_id, "ended")
+    logger_newLog("info", "game_Scheduler", f"Spiel {game_id} ist abgelaufen und wurde auf 'ended' gesetzt.")
+    # Sende Endnachricht an alle Runner, Hunter und Gamemaster
+    from telegram_bot import TelegramBot
+    bot = TelegramBot()
+    game = await db_async(db_Game_getField, game_id)
+    gamemaster_id = game[2] if game else None
+    runners = await db_async(db_getRunners, game_id)
+    hunters = await db_async(db_getHunters, game_id)
+    end_msg = "🏁 Das Spiel ist beendet! Die Zeit ist abgelaufen."
+    messages = {player[0]: end_msg for player in runners + hunters}
+    if gamemaster_id:
+        messages[gamemaster_id] = "🏁 Das Spiel ist beendet! Die Zeit ist abgelaufen.\nBitte führe jetzt die Auswertung und ggf. Siegerehrung durch."
+    await bot.broadcast(list(messages), messages, priority=PRIORITY_CRITICAL)
+    # Keine weiteren Ereignisse für dieses Spiel
+    scheduled_versions[game_id] = scheduled_versions.get(game_id, 0) + 1
+    # In-Memory-Daten des Spiels (POI-Index, Fangerkennung, Ziellinie, Spielfeld, Grundkarte) werden nicht mehr gebraucht
+    from poi_index import poi_index_drop
+    from capture_detection import capture_drop_game
+    from finish_line import finish_drop_game
+    from geofence import geofence_drop_game
+    from map_base_layer import map_base_drop
+    poi_index_drop(game_id)
+    capture_drop_game(game_id)
+    finish_drop_game(game_id)
+    geofence_drop_game(game_id)
+    map_base_drop(game_id)
+    # TODO: Endbehandlung (z.B. Auswertung, Siegerehrung, etc.)
+
+async def game_handle_event(game_id, event, version):
+    """Führt ein fälliges Spielereignis aus (version: Version, für die das Ereignis eingeplant war)"""
+    if event == EVENT_HEADSTART_END:
+        await game_end_headstart(game_id)
+    elif event == EVENT_GAME_END:
+        await game_end(game_id)
+    elif event == EVENT_LOCATION_CHECK:
+        if await game_status(game_id) in ['headstart', 'running']:
+            await check_player_locations(game_id)
+            # Nur weiterführen, wenn das Spiel währenddessen nicht neu eingeplant wurde (das plant eine eigene Prüfung)
+            if scheduled_versions.get(game_id) == version:
+                game_schedule_event(time() + LOCATION_CHECK_INTERVAL, game_id, EVENT_LOCATION_CHECK, version)
+
+def game_event_done(task):
+    """Entfernt einen beendeten Ereignis-Task und protokolliert seinen Fehler"""
+    scheduler_tasks.discard(task)
+    if task.cancelled():
+        return
+    e = task.exception()
+    if e is not None:
+        logger_newLog("error", "game_Scheduler", f"Fehler bei {task.get_name()}: {str(e)}")
+
 async def game_Scheduler():
-    last_location_check = 0
+    """Führt Spielereignisse (Headstart-Ende, Spielende, Standort-Prüfung) genau zu ihrer Fälligkeit aus"""
+    global scheduler_wakeup
+    scheduler_wakeup = asyncio.Event()
+    
+    # Beim Start alle laufenden Spiele aus der Datenbank einplanen
+    for status in ['headstart', 'running']:
+        for game in await db_async(db_getGamesWithStatus, status):
+            await game_reschedule(game[0])
+    logger_newLog("info", "game_Scheduler", f"Scheduler gestartet mit {len(scheduled_events)} geplanten Ereignissen")
+    
     while True:
-        logger_newLog("debug", "game_Scheduler", "Scheduler läuft")
+        # Alle fälligen Ereignisse als eigene Tasks starten, damit ein langsames Spiel
+        # (Broadcasts, Standort-Warnungen) die Ereignisse anderer Spiele nicht aufhält
+        while scheduled_events and scheduled_events[0][0] <= time():
+            due, _, game_id, event, version = heapq.heappop(scheduled_events)
+            if scheduled_versions.get(game_id) != version:
+                continue  # Veraltet (Spiel wurde neu eingeplant)
+            logger_newLog("debug", "game_Scheduler", f"Ereignis {event} für Spiel {game_id} ({time() - due:.2f}s Verzögerung)")
+            task = asyncio.create_task(game_handle_event(game_id, event, version), name=f"Ereignis {event} für Spiel {game_id}")
+            scheduler_tasks.add(task)
+            task.add_done_callback(game_event_done)
         
-        # Führe Standort-Updates aus
-        await game_updateLocations()
-
-        # --- NEU: Laufende Spiele prüfen ---
-        # Prüfe Spiele mit Status 'headstart' oder 'running'
-        now_ts = time()
-        do_location_check = False
-        if now_ts - last_location_check > 60:
-            do_location_check = True
-            last_location_check = now_ts
-        headstart_games = db_getGamesWithStatus("headstart")
-        running_games = db_getGamesWithStatus("running")
-        # Headstart-Logik
-        for game in headstart_games:
-            game_id = game[0]
-            if do_location_check:
-                await check_player_locations(game_id)
-            start_time_str = db_Game_getStartTime(game_id)
-            headstart_minutes = game[6]  # runner_headstart_minutes
-            if start_time_str and headstart_minutes is not None:
-                try:
-                    start_time = datetime.fromisoformat(start_time_str)
-                    now = datetime.now()
-                    if (now - start_time).total_seconds() >= headstart_minutes * 60:
-                        db_Game_setStatus(game_id, "running")
-                        logger_newLog("info", "game_Scheduler", f"Spiel {game_id}: Headstart vorbei, Status auf 'running' gesetzt.")
-                        # Sende Startsignal an Hunter und Runner
-                        from database import db_getHunters, db_getRunners
-                        from telegram_bot import TelegramBot
-                        bot = TelegramBot()
-                        hunters = db_getHunters(game_id)
-                        runners = db_getRunners(game_id)
-                        for hunter in hunters:
-                            try:
-                                await bot.send_message(hunter[0], "🦊 Du darfst jetzt loslegen! Die Jagd beginnt!")
-                            except Exception as e:
-                                logger_newLog("error", "game_Scheduler", f"Fehler beim Senden des Hunter-Startsignals an {hunter[0]}: {str(e)}")
-                        for runner in runners:
-                            try:
-                                await bot.send_message(runner[0], "⚠️ Die Hunter sind jetzt unterwegs! Die Jagd beginnt!")
-                            except Exception as e:
-                                logger_newLog("error", "game_Scheduler", f"Fehler beim Senden des Runner-Startsignals an {runner[0]}: {str(e)}")
-                except Exception as e:
-                    logger_newLog("error", "game_Scheduler", f"Fehler beim Headstart-Check für Spiel {game_id}: {str(e)}")
-        # Running-Logik
-        for game in running_games:
-            game_id = game[0]
-            if do_location_check:
-                await check_player_locations(game_id)
-            start_time_str = db_Game_getStartTime(game_id)
-            duration_minutes = db_Game_getDuration(game_id)
-            gamemaster_id = game[2]
-            if start_time_str and duration_minutes:
-                try:
-                    start_time = datetime.fromisoformat(start_time_str)
-                    end_time = start_time + timedelta(minutes=duration_minutes)
-                    if datetime.now() > end_time:
-                        db_Game_setStatus(game_id, "ended")
-                        logger_newLog("info", "game_Scheduler", f"Spiel {game_id} ist abgelaufen und wurde auf 'ended' gesetzt.")
-                        # Sende Endnachricht an alle Runner, Hunter und Gamemaster
-                        from database import db_getHunters, db_getRunners
-                        from telegram_bot import TelegramBot
-                        bot = TelegramBot()
-                        runners = db_getRunners(game_id)
-                        hunters = db_getHunters(game_id)
-                        end_msg = "🏁 Das Spiel ist beendet! Die Zeit ist abgelaufen."
-                        for runner in runners:
-                            try:
-                                await bot.send_message(runner[0], end_msg)
-                            except Exception as e:
-                                logger_newLog("error", "game_Scheduler", f"Fehler beim Senden der Endnachricht an Runner {runner[0]}: {str(e)}")
-                        for hunter in hunters:
-                            try:
-                                await bot.send_message(hunter[0], end_msg)
-                            except Exception as e:
-                                logger_newLog("error", "game_Scheduler", f"Fehler beim Senden der Endnachricht an Hunter {hunter[0]}: {str(e)}")
-                        try:
-                            await bot.send_message(gamemaster_id, "🏁 Das Spiel ist beendet! Die Zeit ist abgelaufen.\nBitte führe jetzt die Auswertung und ggf. Siegerehrung durch.")
-                        except Exception as e:
-                            logger_newLog("error", "game_Scheduler", f"Fehler beim Senden der Endnachricht an Gamemaster {gamemaster_id}: {str(e)}")
-                        # TODO: Endbehandlung (z.B. Auswertung, Siegerehrung, etc.)
-                except Exception as e:
-                    logger_newLog("error", "game_Scheduler", f"Fehler beim Zeitvergleich für Spiel {game_id}: {str(e)}")
-        # ---
-        await asyncio.sleep(5) 
\ No newline at end of file
+        # Bis zum nächsten Ereignis schlafen oder bis ein Spiel neu eingeplant wird.
+        # Höchstens 60 Sekunden am Stück, damit Sprünge der Systemuhr aufgefangen werden.
+        timeout = 60
+        if scheduled_events:
+            timeout = min(timeout, max(0, scheduled_events[0][0] - time()))
+        scheduler_wakeup.clear()
+        try:
+            await asyncio.wait_for(scheduler_wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
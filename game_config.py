@@ -0,0 +1,98 @@
+import threading
+from logger import logger_newLog
+
+# Spalten der games-Tabelle, die GameConfig mit einer einzigen Abfrage lädt
+GAME_CONFIG_COLUMNS = (
+    'game_id', 'name', 'gamemaster_id', 'status', 'start_time', 'duration_minutes', 'runner_headstart_minutes',
+    'StartBudgetRunner', 'StartBudgetHunter', 'ShopCooldown',
+    'RunnerShop1price', 'RunnerShop1amount', 'RunnerShop2price', 'RunnerShop2amount',
+    'RunnerShop3price', 'RunnerShop3amount', 'RunnerShop4price', 'RunnerShop4amount',
+    'HunterShop1price', 'HunterShop1amount', 'HunterShop2price', 'HunterShop2amount',
+    'HunterShop3price', 'HunterShop3amount', 'HunterShop4price', 'HunterShop4amount',
+)
+
+# Zwischengespeicherte Konfiguration pro Spiel: {game_id: GameConfig}
+game_configs = {}
+# Wird bei jeder Änderung eines Spiels erhöht, damit ein parallel laufendes Laden
+# keinen veralteten Stand in den Cache schreibt: {game_id: Version}
+game_config_versions = {}
+game_config_lock = threading.Lock()
+
+class GameConfig:
+    """Einstellungen und Status eines Spiels aus der games-Tabelle
+
+    Attribute:
+        game_id, name, gamemaster_id, status
+        start_time: ISO-String oder None
+        duration_minutes, runner_headstart_minutes: int oder None
+        start_budget_runner, start_budget_hunter: int
+        shop_cooldown: Minuten (Config-Wert wenn im Spiel nicht gesetzt)
+        runner_shop_prices, runner_shop_amounts: Liste für Item 1-4
+        hunter_shop_prices, hunter_shop_amounts: Liste für Item 1-4
+    """
+
+    def __init__(self, row):
+        values = dict(zip(GAME_CONFIG_COLUMNS, row))
+        self.game_id = values['game_id']
+        self.name = values['name']
+        self.gamemaster_id = values['gamemaster_id']
+        self.status = values['status']
+        self.start_time = values['start_time']
+        self.duration_minutes = values['duration_minutes']
+        self.runner_headstart_minutes = values['runner_headstart_minutes']
+        self.start_budget_runner = values['StartBudgetRunner']
+        self.start_budget_hunter = values['StartBudgetHunter']
+        self.shop_cooldown = values['ShopCooldown']
+        if self.shop_cooldown is None:
+            from config import conf_getShopCooldown
+            self.shop_cooldown = conf_getShopCooldown()
+        self.runner_shop_prices = [values[f'RunnerShop{item}price'] for item in range(1, 5)]
+        self.runner_shop_amounts = [values[f'RunnerShop{item}amount'] for item in range(1, 5)]
+        self.hunter_shop_prices = [values[f'HunterShop{item}price'] for item in range(1, 5)]
+        self.hunter_shop_amounts = [values[f'HunterShop{item}amount'] for item in range(1, 5)]
+
+    def shop_prices(self, role):
+        """Preise der Items 1-4 für 'runner' oder 'hunter'"""
+        return self.runner_shop_prices if role == 'runner' else self.hunter_shop_prices
+
+    def shop_amounts(self, role):
+        """Maximale Anzahl der Items 1-4 für 'runner' oder 'hunter'"""
+        return self.runner_shop_amounts if role == 'runner' else self.hunter_shop_amounts
+
+def game_config_get(game_id):
+    """Gibt die Konfiguration eines Spiels zurück und lädt sie bei Bedarf (blockierend)
+
+    Returns:
+        GameConfig oder None wenn das Spiel nicht existiert
+    """
+    with game_config_lock:
+        config = game_configs.get(game_id)
+        version = game_config_versions.get(game_id, 0)
+    if config is not None:
+        return config
+
+    from database import db_Game_getConfig
+    row = db_Game_getConfig(game_id)
+    if not row:
+        return None
+    config = GameConfig(row)
+    with game_config_lock:
+        # Nur übernehmen wenn das Spiel während des Ladens nicht geändert wurde
+        if game_config_versions.get(game_id, 0) == version:
+            game_configs[game_id] = config
+    logger_newLog("debug", "game_config_get", f"Konfiguration für Spiel {game_id} geladen")
+    return config
+
+async def game_config_load(game_id):
+    """Wie game_config_get, lädt aber außerhalb der Event-Loop (aus dem Cache ohne Thread-Wechsel)"""
+    config = game_configs.get(game_id)
+    if config is not None:
+        return config
+    from database_async import db_async
+    return await db_async(game_config_get, game_id, write=False)
+
+def game_config_invalidate(game_id):
+    """Verwirft die Konfiguration eines Spiels (von den db_Game_set*-Funktionen aufgerufen)"""
+    with game_config_lock:
+        game_configs.pop(game_id, None)
+        game_config_versions[game_id] = game_config_versions.get(game_id, 0) + 1
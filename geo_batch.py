@@ -0,0 +1,89 @@
+import math
+from geofunctions import calculate_distance
+
+# NumPy ist optional: ohne NumPy wird auf die reine Python-Berechnung zurückgegriffen
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+EARTH_RADIUS_METERS = 6371000  # Wie in calculate_distance
+
+# Unterhalb dieser Punktanzahl ist die Python-Schleife schneller als der Umweg über NumPy-Arrays
+GEO_NUMPY_MIN_POINTS = 32
+
+def geo_has_numpy():
+    """Prüft ob die NumPy-Berechnung verfügbar ist"""
+    return np is not None
+
+def geo_distances_from_point(lat, lon, points, use_numpy=None):
+    """Berechnet die Entfernungen von einem Punkt zu vielen Punkten (Haversine)
+
+    Args:
+        lat, lon: Ausgangspunkt
+        points: Liste von (lat, lon)
+        use_numpy: True/False erzwingt die Variante, None = automatisch
+
+    Returns:
+        Liste der Entfernungen in Metern (gleiche Reihenfolge wie points)
+    """
+    if not points:
+        return []
+    if use_numpy is None:
+        use_numpy = np is not None and len(points) >= GEO_NUMPY_MIN_POINTS
+    if not use_numpy or np is None:
+        return [calculate_distance(lat, lon, point_lat, point_lon) for point_lat, point_lon in points]
+
+    coords = np.radians(np.asarray(points, dtype=float))
+    return _haversine(math.radians(lat), math.radians(lon), coords[:, 0], coords[:, 1]).tolist()
+
+def geo_distance_matrix(points_a, points_b, use_numpy=None):
+    """Berechnet alle Entfernungen zwischen zwei Punktlisten (z.B. alle Runner × alle Hunter)
+
+    Args:
+        points_a: Liste von (lat, lon), ergibt die Zeilen
+        points_b: Liste von (lat, lon), ergibt die Spalten
+        use_numpy: True/False erzwingt die Variante, None = automatisch
+
+    Returns:
+        Matrix der Entfernungen in Metern, Zugriff über matrix[i][j]
+        (NumPy-Array wenn NumPy verwendet wird, sonst Liste von Listen)
+    """
+    if use_numpy is None:
+        use_numpy = np is not None and len(points_a) * len(points_b) >= GEO_NUMPY_MIN_POINTS
+    if not use_numpy or np is None:
+        return [[calculate_distance(lat_a, lon_a, lat_b, lon_b) for lat_b, lon_b in points_b]
+                for lat_a, lon_a in points_a]
+
+    if not points_a or not points_b:
+        return np.zeros((len(points_a), len(points_b)))
+    coords_a = np.radians(np.asarray(points_a, dtype=float))
+    coords_b = np.radians(np.asarray(points_b, dtype=float))
+    # Broadcasting: Spaltenvektor (Zeilen) gegen Zeilenvektor (Spalten)
+    return _haversine(coords_a[:, 0:1], coords_a[:, 1:2], coords_b[:, 0], coords_b[:, 1])
+
+def geo_nearest(points_a, points_b):
+    """Findet für jeden Punkt aus points_a den nächsten Punkt aus points_b
+
+    Returns:
+        Liste von (Index in points_b, Entfernung in Metern) pro Punkt aus points_a,
+        leere Liste wenn points_b leer ist
+    """
+    if not points_a or not points_b:
+        return []
+    matrix = geo_distance_matrix(points_a, points_b)
+    if np is not None and isinstance(matrix, np.ndarray):
+        indexes = matrix.argmin(axis=1)
+        return [(int(index), float(matrix[row, index])) for row, index in enumerate(indexes)]
+    nearest = []
+    for row in matrix:
+        index = min(range(len(row)), key=row.__getitem__)
+        nearest.append((index, row[index]))
+    return nearest
+
+def _haversine(lat1, lon1, lat2, lon2):
+    """Haversine-Formel auf NumPy-Arrays (Werte in Radiant)"""
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return EARTH_RADIUS_METERS * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
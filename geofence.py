@@ -0,0 +1,171 @@
+import math
+from logger import logger_newLog
+from config import conf_getGeofenceHysteresisMeters
+from database_async import db_async
+
+EARTH_RADIUS_METERS = 6371000
+
+GEOFENCE_LEFT = "left"
+GEOFENCE_ENTERED = "entered"
+
+# Vorberechnetes Spielfeld pro Spiel: {game_id: FieldGeometry oder None wenn kein Feld gesetzt}
+field_geometries = {}
+# Letzter bestätigter Zustand pro Spieler: {user_id: (game_id, im Feld True/False)}
+geofence_states = {}
+
+class FieldGeometry:
+    """Spielfeld-Polygon in lokalen Metern mit Bounding-Box und Kanten-Normalen
+
+    Wird einmal pro Spiel berechnet, danach kostet eine Prüfung nur noch die
+    Projektion des Punktes und ein paar Multiplikationen pro Kante.
+    """
+
+    def __init__(self, corners):
+        self.ref_lat = sum(lat for lat, _ in corners) / len(corners)
+        self.ref_lon = sum(lon for _, lon in corners) / len(corners)
+        self.lon_scale = math.cos(math.radians(self.ref_lat))
+        self.points = [self.project(lat, lon) for lat, lon in corners]
+
+        xs = [x for x, _ in self.points]
+        ys = [y for _, y in self.points]
+        self.bbox = (min(xs), min(ys), max(xs), max(ys))
+
+        # Kanten als (Startpunkt, Richtungsvektor, Länge, äußere Einheitsnormale)
+        area = sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(self.points, self.points[1:] + self.points[:1]))
+        orientation = 1 if area > 0 else -1  # Gegen den Uhrzeigersinn: Außen liegt rechts
+        self.edges = []
+        for (x1, y1), (x2, y2) in zip(self.points, self.points[1:] + self.points[:1]):
+            dx, dy = x2 - x1, y2 - y1
+            length = math.hypot(dx, dy)
+            if length == 0:
+                continue
+            normal = (orientation * dy / length, -orientation * dx / length)
+            self.edges.append(((x1, y1), (dx, dy), length, normal))
+
+    def project(self, lat, lon):
+        """Projiziert eine Koordinate in Meter relativ zum Feldmittelpunkt"""
+        x = math.radians(lon - self.ref_lon) * self.lon_scale * EARTH_RADIUS_METERS
+        y = math.radians(lat - self.ref_lat) * EARTH_RADIUS_METERS
+        return x, y
+
+    def contains(self, x, y):
+        """Punkt-in-Polygon-Test (Strahlverfahren), vorher Abweisung über die Bounding-Box"""
+        min_x, min_y, max_x, max_y = self.bbox
+        if x < min_x or x > max_x or y < min_y or y > max_y:
+            return False
+        inside = False
+        points = self.points
+        j = len(points) - 1
+        for i in range(len(points)):
+            xi, yi = points[i]
+            xj, yj = points[j]
+            if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+                inside = not inside
+            j = i
+        return inside
+
+    def distance_to_edge(self, x, y):
+        """Kürzeste Entfernung (Meter) vom Punkt zur Feldgrenze"""
+        best = None
+        for (x1, y1), (dx, dy), length, normal in self.edges:
+            t = ((x - x1) * dx + (y - y1) * dy) / (length * length)
+            if 0.0 <= t <= 1.0:
+                # Lotfußpunkt liegt auf der Kante: Abstand entlang der Normalen
+                distance = abs((x - x1) * normal[0] + (y - y1) * normal[1])
+            else:
+                # Sonst ist der nächste Punkt eine Ecke
+                end_x, end_y = (x1, y1) if t < 0.0 else (x1 + dx, y1 + dy)
+                distance = math.hypot(x - end_x, y - end_y)
+            if best is None or distance < best:
+                best = distance
+        return best if best is not None else 0.0
+
+    def signed_distance(self, lat, lon):
+        """Entfernung zur Grenze in Metern: positiv im Feld, negativ außerhalb"""
+        x, y = self.project(lat, lon)
+        distance = self.distance_to_edge(x, y)
+        return distance if self.contains(x, y) else -distance
+
+def geofence_set_field(game_id, field_coords):
+    """Berechnet die Feldgeometrie eines Spiels neu (aufgerufen von cmd_fieldsetup)"""
+    if not field_coords or len(field_coords) < 3 or any(lat is None or lon is None for lat, lon in field_coords):
+        field_geometries[game_id] = None
+        return
+    field_geometries[game_id] = FieldGeometry(field_coords)
+    logger_newLog("debug", "geofence_set_field", f"Spielfeld-Geometrie für Spiel {game_id} berechnet")
+
+def geofence_load_field(game_id):
+    """Lädt das Spielfeld eines Spiels aus der Datenbank (z.B. nach einem Neustart)"""
+    from database import db_Game_getField
+    game = db_Game_getField(game_id)
+    corners = [(game[4], game[5]), (game[6], game[7]), (game[8], game[9]), (game[10], game[11])] if game else []
+    geofence_set_field(game_id, corners)
+    return field_geometries.get(game_id)
+
+def geofence_update(game_id, user_id, lat, lon):
+    """Ordnet ein Standort-Update dem Spielfeld zu
+
+    Der Zustand wechselt erst, wenn der Spieler mindestens GEOFENCE_HYSTERESIS_METERS
+    jenseits der Grenze ist. Jeder Spieler gilt zu Beginn als im Feld.
+
+    Returns:
+        GEOFENCE_LEFT, GEOFENCE_ENTERED oder None (keine Änderung)
+        sowie die Entfernung zur Grenze in Metern
+    """
+    field = field_geometries.get(game_id)
+    if field is None:
+        return None, None
+
+    signed_distance = field.signed_distance(lat, lon)
+    state = geofence_states.get(user_id)
+    inside = state[1] if state and state[0] == game_id else True
+
+    hysteresis = conf_getGeofenceHysteresisMeters()
+    event = None
+    if inside and signed_distance <= -hysteresis:
+        inside = False
+        event = GEOFENCE_LEFT
+    elif not inside and signed_distance >= hysteresis:
+        inside = True
+        event = GEOFENCE_ENTERED
+    geofence_states[user_id] = (game_id, inside)
+    return event, abs(signed_distance)
+
+def geofence_drop_game(game_id):
+    """Verwirft Feldgeometrie und Spielerzustände eines Spiels (z.B. nach Spielende)"""
+    field_geometries.pop(game_id, None)
+    for user_id in [user_id for user_id, state in geofence_states.items() if state[0] == game_id]:
+        del geofence_states[user_id]
+
+async def geofence_check_location(bot, game_id, user_id, role, name, lat, lon):
+    """Prüft nach einem Live-Standort-Update ob ein Spieler das Spielfeld verlassen oder wieder betreten hat
+
+    Gamemaster und Spieler werden bei jedem Wechsel benachrichtigt.
+
+    Returns:
+        GEOFENCE_LEFT, GEOFENCE_ENTERED oder None
+    """
+    if game_id not in field_geometries:
+        await db_async(geofence_load_field, game_id, write=False)
+
+    event, distance = geofence_update(game_id, user_id, lat, lon)
+    if event is None:
+        return None
+
+    role_name = "Runner" if role == 'runner' else "Hunter"
+    if event == GEOFENCE_LEFT:
+        logger_newLog("info", "geofence_check_location", f"{role_name} {name} ({user_id}) hat das Spielfeld von Spiel {game_id} verlassen ({distance:.0f}m außerhalb)")
+        player_message = f"🚧 **Du hast das Spielfeld verlassen!**\n\nDu bist {distance:.0f}m außerhalb. Bitte kehre sofort zurück."
+        gamemaster_message = f"🚧 **{role_name} {name} hat das Spielfeld verlassen!**\n\n📏 **Entfernung zur Grenze:** {distance:.0f}m\n📍 **Position:** {lat:.6f}, {lon:.6f}"
+    else:
+        logger_newLog("info", "geofence_check_location", f"{role_name} {name} ({user_id}) ist zurück im Spielfeld von Spiel {game_id}")
+        player_message = "✅ **Du bist wieder im Spielfeld.**"
+        gamemaster_message = f"✅ **{role_name} {name} ist wieder im Spielfeld.**\n\n📍 **Position:** {lat:.6f}, {lon:.6f}"
+
+    from database import db_Game_getField
+    game = await db_async(db_Game_getField, game_id)
+    messages = {user_id: player_message}
+    if game and game[2] != user_id:
+        messages[game[2]] = gamemaster_message
+    await bot.broadcast(list(messages), messages)
+    return event
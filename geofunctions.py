@@ -1,6 +1,9 @@
 from logger import logger_newLog
-from database import db_User_get, db_Game_getStatus, db_POI_get_by_type, db_Locations_get_position
+from database import db_Locations_get_position
 import math
+import time
+from telegram_outbound import PRIORITY_CRITICAL
+from database_async import db_async
 
 # Dictionary für aktive Interaktionen: {user_id: {poi_id: timestamp}}
 active_interactions = {}
@@ -23,6 +26,30 @@ def calculate_distance(lat1, lon1, lat2, lon2):
     distance = R * c
     return distance
 
+# Letzter in den Standortverlauf geschriebener Punkt pro Spieler: {user_id: (game_id, lat, lon, zeit)}
+last_history_points = {}
+
+def location_history_should_record(user_id, game_id, lat, lon):
+    """Prüft ob ein neuer Standort in den Verlauf (locations) geschrieben werden soll
+
+    Ein Punkt wird nur gespeichert, wenn sich der Spieler seit dem letzten gespeicherten
+    Punkt um mindestens LOCATION_HISTORY_MIN_DISTANCE_METERS bewegt hat oder dieser
+    älter als LOCATION_HISTORY_MAX_INTERVAL_SECONDS ist.
+    """
+    from config import conf_getLocationHistoryMinDistanceMeters, conf_getLocationHistoryMaxIntervalSeconds
+    last = last_history_points.get(user_id)
+    if last is None or last[0] != game_id:
+        return True
+    
+    _, last_lat, last_lon, last_time = last
+    if time.monotonic() - last_time >= conf_getLocationHistoryMaxIntervalSeconds():
+        return True
+    return calculate_distance(last_lat, last_lon, lat, lon) >= conf_getLocationHistoryMinDistanceMeters()
+
+def location_history_remember(user_id, game_id, lat, lon):
+    """Merkt sich den zuletzt in den Verlauf geschriebenen Punkt eines Spielers"""
+    last_history_points[user_id] = (game_id, lat, lon, time.monotonic())
+
 def is_interaction_active(user_id, poi_id):
     """Prüft ob eine Interaktion bereits aktiv ist"""
     if user_id in active_interactions and poi_id in active_interactions[user_id]:
@@ -60,8 +87,9 @@ async def Check_location(bot, user_id, lat, lon):
     """
     logger_newLog("debug", "Check_location", f"Prüfe Position für User {user_id}: {lat}, {lon}")
     
-    # Hole User-Daten
-    user = db_User_get(user_id)
+    # Hole User-Daten (aus dem Cache, wird bei Änderungen von Rolle, Team oder Spiel neu geladen)
+    from user_session import user_session_load
+    user = await user_session_load(user_id)
     if not user:
         logger_newLog("debug", "Check_location", f"User {user_id} nicht gefunden")
         return False
@@ -74,7 +102,9 @@ async def Check_location(bot, user_id, lat, lon):
         logger_newLog("debug", "Check_location", f"User {user_id} ist in keinem Spiel")
         return False
     
-    game_status = db_Game_getStatus(game_id)
+    from game_config import game_config_load
+    game_config = await game_config_load(game_id)
+    game_status = game_config.status if game_config else None
     if game_status not in ['headstart', 'running']:
         logger_newLog("debug", "Check_location", f"Spiel {game_id} ist nicht aktiv (Status: {game_status})")
         return False
@@ -89,49 +119,41 @@ async def Check_location(bot, user_id, lat, lon):
     interactions_found = False
     current_pois_in_range = set()  # Track POIs die aktuell in Reichweite sind
     
-    # Prüfe Fallen
-    traps = db_POI_get_by_type(game_id, 'TRAP')
-    for trap in traps:
-        trap_id, trap_game_id, trap_type, trap_lat, trap_lon, trap_range, trap_team, trap_creator, trap_timestamp = trap
-        poi_id = f"poi_{trap_id}"
-        
-        distance = calculate_distance(lat, lon, trap_lat, trap_lon)
+    # POIs in Reichweite aus dem räumlichen Index (wird pro Spiel nur einmal aus der DB geladen)
+    from poi_index import poi_index_is_loaded, poi_index_load, poi_index_query
+    if not poi_index_is_loaded(game_id):
+        await db_async(poi_index_load, game_id, write=False)
+    hits = poi_index_query(game_id, lat, lon)
+    # Reihenfolge wie bisher: zuerst Fallen, dann Wachtürme, jeweils neueste zuerst
+    hits.sort(key=lambda hit: (hit[0][2] != 'TRAP', -hit[0][0]))
+    
+    for poi, distance in hits:
+        poi_db_id, poi_game_id, poi_type, poi_lat, poi_lon, poi_range, poi_team, poi_creator, poi_timestamp = poi
+        poi_id = f"poi_{poi_db_id}"
+        current_pois_in_range.add(poi_id)
         
-        if distance <= trap_range:
-            current_pois_in_range.add(poi_id)
-            
+        if poi_type == 'TRAP':
             # Prüfe ob Interaktion bereits aktiv ist
             if not is_interaction_active(user_id, poi_id):
-                logger_newLog("info", "Check_location", f"Runner {user_id} ist in Reichweite einer Falle (ID: {trap_id}, Team: {trap_team}, Distanz: {distance:.1f}m)")
+                logger_newLog("info", "Check_location", f"Runner {user_id} ist in Reichweite einer Falle (ID: {poi_db_id}, Team: {poi_team}, Distanz: {distance:.1f}m)")
                 
                 # Markiere Interaktion als aktiv und führe Handling aus
                 set_interaction_active(user_id, poi_id)
-                await handle_trap_interaction(bot, user_id, trap_id, trap_team, distance)
+                await handle_trap_interaction(bot, user_id, poi_db_id, poi_team, distance)
                 interactions_found = True
             else:
-                logger_newLog("debug", "Check_location", f"Runner {user_id} ist noch in Reichweite der Falle {trap_id}, aber Interaktion bereits aktiv")
-    
-    # Prüfe Wachtürme
-    watchtowers = db_POI_get_by_type(game_id, 'WATCHTOWER')
-    for watchtower in watchtowers:
-        tower_id, tower_game_id, tower_type, tower_lat, tower_lon, tower_range, tower_team, tower_creator, tower_timestamp = watchtower
-        poi_id = f"poi_{tower_id}"
-        
-        distance = calculate_distance(lat, lon, tower_lat, tower_lon)
-        
-        if distance <= tower_range:
-            current_pois_in_range.add(poi_id)
-            
+                logger_newLog("debug", "Check_location", f"Runner {user_id} ist noch in Reichweite der Falle {poi_db_id}, aber Interaktion bereits aktiv")
+        else:
             # Prüfe ob Interaktion bereits aktiv ist
             if not is_interaction_active(user_id, poi_id):
-                logger_newLog("info", "Check_location", f"Runner {user_id} ist in Reichweite eines Wachturms (ID: {tower_id}, Team: {tower_team}, Distanz: {distance:.1f}m)")
+                logger_newLog("info", "Check_location", f"Runner {user_id} ist in Reichweite eines Wachturms (ID: {poi_db_id}, Team: {poi_team}, Distanz: {distance:.1f}m)")
                 
                 # Markiere Interaktion als aktiv und führe Handling aus
                 set_interaction_active(user_id, poi_id)
-                await handle_watchtower_interaction(bot, user_id, tower_id, tower_team, distance)
+                await handle_watchtower_interaction(bot, user_id, poi_db_id, poi_team, distance)
                 interactions_found = True
             else:
-                logger_newLog("debug", "Check_location", f"Runner {user_id} ist noch in Reichweite des Wachturms {tower_id}, aber Interaktion bereits aktiv")
+                logger_newLog("debug", "Check_location", f"Runner {user_id} ist noch in Reichweite des Wachturms {poi_db_id}, aber Interaktion bereits aktiv")
     
     # Prüfe ob User POIs verlassen hat und entferne inaktive Interaktionen
     if user_id in active_interactions:
@@ -159,7 +181,7 @@ async def handle_trap_interaction(bot, user_id, trap_id, trap_team, distance):
     
     # Hole User-Daten für Benachrichtigungen
     from database import db_User_get, db_Game_getField, db_getTeamMembers, db_POI_add
-    user = db_User_get(user_id)
+    user = await db_async(db_User_get, user_id)
     if not user:
         logger_newLog("error", "handle_trap_interaction", f"User {user_id} nicht gefunden")
         return
@@ -168,7 +190,7 @@ async def handle_trap_interaction(bot, user_id, trap_id, trap_team, distance):
     game_id = user[8]
     
     # Hole Spieldaten für Gamemaster-ID
-    game = db_Game_getField(game_id)
+    game = await db_async(db_Game_getField, game_id)
     if not game:
         logger_newLog("error", "handle_trap_interaction", f"Spiel {game_id} nicht gefunden")
         return
@@ -177,7 +199,7 @@ async def handle_trap_interaction(bot, user_id, trap_id, trap_team, distance):
     
     # Hole aktuelle Position des Runners
     from database import db_getUserPosition
-    user_position = db_getUserPosition(user_id)
+    user_position = await db_async(db_getUserPosition, user_id)
     if not user_position or user_position[3] is None or user_position[4] is None:
         logger_newLog("error", "handle_trap_interaction", f"Keine Position für Runner {user_id} gefunden")
         return
@@ -185,39 +207,29 @@ async def handle_trap_interaction(bot, user_id, trap_id, trap_team, distance):
     runner_lat = user_position[3]
     runner_lon = user_position[4]
     
-    # 1. Benachrichtige das Team (ohne Runner-Info)
-    try:
-        team_members = db_getTeamMembers(game_id, trap_team)
-        team_message = f"🪤 **Ein Runner hat eure Falle ausgelöst!**\n\n📍 **Fallen-Position:** {runner_lat:.6f}, {runner_lon:.6f}\n📏 **Distanz:** {distance:.1f}m"
-        
-        for member in team_members:
-            try:
-                await bot.send_message(member[0], team_message)
-                logger_newLog("info", "handle_trap_interaction", f"Team-Benachrichtigung an {member[1]} ({member[0]}) gesendet")
-            except Exception as e:
-                logger_newLog("error", "handle_trap_interaction", f"Fehler beim Senden der Team-Benachrichtigung an {member[1]}: {str(e)}")
-    except Exception as e:
-        logger_newLog("error", "handle_trap_interaction", f"Fehler beim Abrufen der Teammitglieder: {str(e)}")
+    # 1.-3. Benachrichtige Team (ohne Runner-Info), Gamemaster und Runner gleichzeitig
+    team_message = f"🪤 **Ein Runner hat eure Falle ausgelöst!**\n\n📍 **Fallen-Position:** {runner_lat:.6f}, {runner_lon:.6f}\n📏 **Distanz:** {distance:.1f}m"
+    gamemaster_message = f"🪤 **Falle ausgelöst!**\n\n👤 **Runner:** {username} ({user_id})\n🎯 **Team:** {trap_team}\n📍 **Position:** {runner_lat:.6f}, {runner_lon:.6f}\n📏 **Distanz:** {distance:.1f}m"
+    runner_message = f"🪤 **Du hast eine Falle ausgelöst!**\n\n🎯 **Team:** {trap_team}\n📏 **Distanz:** {distance:.1f}m\n\n⚠️ Das Team wurde benachrichtigt!"
     
-    # 2. Benachrichtige den Gamemaster
+    messages = {}
     try:
-        gamemaster_message = f"🪤 **Falle ausgelöst!**\n\n👤 **Runner:** {username} ({user_id})\n🎯 **Team:** {trap_team}\n📍 **Position:** {runner_lat:.6f}, {runner_lon:.6f}\n📏 **Distanz:** {distance:.1f}m"
-        await bot.send_message(gamemaster_id, gamemaster_message)
-        logger_newLog("info", "handle_trap_interaction", f"Gamemaster-Benachrichtigung gesendet")
+        for member in await db_async(db_getTeamMembers, game_id, trap_team):
+            messages[member[0]] = team_message
     except Exception as e:
-        logger_newLog("error", "handle_trap_interaction", f"Fehler beim Senden der Gamemaster-Benachrichtigung: {str(e)}")
+        logger_newLog("error", "handle_trap_interaction", f"Fehler beim Abrufen der Teammitglieder: {str(e)}")
+    messages[gamemaster_id] = gamemaster_message
+    messages[user_id] = runner_message
     
-    # 3. Benachrichtige den Runner
     try:
-        runner_message = f"🪤 **Du hast eine Falle ausgelöst!**\n\n🎯 **Team:** {trap_team}\n📏 **Distanz:** {distance:.1f}m\n\n⚠️ Das Team wurde benachrichtigt!"
-        await bot.send_message(user_id, runner_message)
-        logger_newLog("info", "handle_trap_interaction", f"Runner-Benachrichtigung an {username} ({user_id}) gesendet")
+        results = await bot.broadcast(list(messages), messages, priority=PRIORITY_CRITICAL)
+        logger_newLog("info", "handle_trap_interaction", f"Fallen-Benachrichtigungen gesendet: {sum(results.values())} von {len(results)} zugestellt")
     except Exception as e:
-        logger_newLog("error", "handle_trap_interaction", f"Fehler beim Senden der Runner-Benachrichtigung: {str(e)}")
+        logger_newLog("error", "handle_trap_interaction", f"Fehler beim Senden der Fallen-Benachrichtigungen: {str(e)}")
     
     # 4. Erstelle RUNNERTRAP POI-Eintrag
     try:
-        if db_POI_add(game_id, "RUNNERTRAP", runner_lat, runner_lon, team=trap_team, creator_id=user_id):
+        if await db_async(db_POI_add, game_id, "RUNNERTRAP", runner_lat, runner_lon, team=trap_team, creator_id=user_id):
             logger_newLog("info", "handle_trap_interaction", f"RUNNERTRAP POI für Runner {username} ({user_id}) erstellt")
         else:
             logger_newLog("error", "handle_trap_interaction", f"Fehler beim Erstellen des RUNNERTRAP POI")
@@ -238,7 +250,7 @@ async def handle_watchtower_interaction(bot, user_id, tower_id, tower_team, dist
     
     # Hole User-Daten für Benachrichtigungen
     from database import db_User_get, db_Game_getField, db_getTeamMembers, db_POI_add
-    user = db_User_get(user_id)
+    user = await db_async(db_User_get, user_id)
     if not user:
         logger_newLog("error", "handle_watchtower_interaction", f"User {user_id} nicht gefunden")
         return
@@ -247,7 +259,7 @@ async def handle_watchtower_interaction(bot, user_id, tower_id, tower_team, dist
     game_id = user[8]
     
     # Hole Spieldaten für Gamemaster-ID
-    game = db_Game_getField(game_id)
+    game = await db_async(db_Game_getField, game_id)
     if not game:
         logger_newLog("error", "handle_watchtower_interaction", f"Spiel {game_id} nicht gefunden")
         return
@@ -256,7 +268,7 @@ async def handle_watchtower_interaction(bot, user_id, tower_id, tower_team, dist
     
     # Hole aktuelle Position des Runners
     from database import db_getUserPosition
-    user_position = db_getUserPosition(user_id)
+    user_position = await db_async(db_getUserPosition, user_id)
     if not user_position or user_position[3] is None or user_position[4] is None:
         logger_newLog("error", "handle_watchtower_interaction", f"Keine Position für Runner {user_id} gefunden")
         return
@@ -269,39 +281,29 @@ async def handle_watchtower_interaction(bot, user_id, tower_id, tower_team, dist
     is_first_interaction = not is_interaction_active(user_id, poi_id)
     
     if is_first_interaction:
-        # 1. Benachrichtige das Team (nur beim ersten Betreten)
-        try:
-            team_members = db_getTeamMembers(game_id, tower_team)
-            team_message = f"🔭 **Ein Runner ist in Reichweite eures Wachturms!**\n\n📍 **Position:** {runner_lat:.6f}, {runner_lon:.6f}\n📏 **Distanz:** {distance:.1f}m"
-            
-            for member in team_members:
-                try:
-                    await bot.send_message(member[0], team_message)
-                    logger_newLog("info", "handle_watchtower_interaction", f"Team-Benachrichtigung an {member[1]} ({member[0]}) gesendet")
-                except Exception as e:
-                    logger_newLog("error", "handle_watchtower_interaction", f"Fehler beim Senden der Team-Benachrichtigung an {member[1]}: {str(e)}")
-        except Exception as e:
-            logger_newLog("error", "handle_watchtower_interaction", f"Fehler beim Abrufen der Teammitglieder: {str(e)}")
+        # 1.-3. Benachrichtige Team, Gamemaster und Runner gleichzeitig (nur beim ersten Betreten)
+        team_message = f"🔭 **Ein Runner ist in Reichweite eures Wachturms!**\n\n📍 **Position:** {runner_lat:.6f}, {runner_lon:.6f}\n📏 **Distanz:** {distance:.1f}m"
+        gamemaster_message = f"🔭 **Wachturm hat Runner entdeckt!**\n\n👤 **Runner:** {username} ({user_id})\n🎯 **Team:** {tower_team}\n📍 **Position:** {runner_lat:.6f}, {runner_lon:.6f}\n📏 **Distanz:** {distance:.1f}m"
+        runner_message = f"🔭 **Du wurdest von einem Wachturm entdeckt!**\n\n🎯 **Team:** {tower_team}\n📏 **Distanz:** {distance:.1f}m\n\n⚠️ Das Team wurde benachrichtigt!"
         
-        # 2. Benachrichtige den Gamemaster (nur beim ersten Betreten)
+        messages = {}
         try:
-            gamemaster_message = f"🔭 **Wachturm hat Runner entdeckt!**\n\n👤 **Runner:** {username} ({user_id})\n🎯 **Team:** {tower_team}\n📍 **Position:** {runner_lat:.6f}, {runner_lon:.6f}\n📏 **Distanz:** {distance:.1f}m"
-            await bot.send_message(gamemaster_id, gamemaster_message)
-            logger_newLog("info", "handle_watchtower_interaction", f"Gamemaster-Benachrichtigung gesendet")
+            for member in await db_async(db_getTeamMembers, game_id, tower_team):
+                messages[member[0]] = team_message
         except Exception as e:
-            logger_newLog("error", "handle_watchtower_interaction", f"Fehler beim Senden der Gamemaster-Benachrichtigung: {str(e)}")
+            logger_newLog("error", "handle_watchtower_interaction", f"Fehler beim Abrufen der Teammitglieder: {str(e)}")
+        messages[gamemaster_id] = gamemaster_message
+        messages[user_id] = runner_message
         
-        # 3. Benachrichtige den Runner (nur beim ersten Betreten)
         try:
-            runner_message = f"🔭 **Du wurdest von einem Wachturm entdeckt!**\n\n🎯 **Team:** {tower_team}\n📏 **Distanz:** {distance:.1f}m\n\n⚠️ Das Team wurde benachrichtigt!"
-            await bot.send_message(user_id, runner_message)
-            logger_newLog("info", "handle_watchtower_interaction", f"Runner-Benachrichtigung an {username} ({user_id}) gesendet")
+            results = await bot.broadcast(list(messages), messages)
+            logger_newLog("info", "handle_watchtower_interaction", f"Wachturm-Benachrichtigungen gesendet: {sum(results.values())} von {len(results)} zugestellt")
         except Exception as e:
-            logger_newLog("error", "handle_watchtower_interaction", f"Fehler beim Senden der Runner-Benachrichtigung: {str(e)}")
+            logger_newLog("error", "handle_watchtower_interaction", f"Fehler beim Senden der Wachturm-Benachrichtigungen: {str(e)}")
     
     # 4. Erstelle RUNNERWATCHTOWER POI-Eintrag (bei jeder Position in der Range)
     try:
-        if db_POI_add(game_id, "RUNNERWATCHTOWER", runner_lat, runner_lon, team=tower_team, creator_id=user_id):
+        if await db_async(db_POI_add, game_id, "RUNNERWATCHTOWER", runner_lat, runner_lon, team=tower_team, creator_id=user_id):
             logger_newLog("info", "handle_watchtower_interaction", f"RUNNERWATCHTOWER POI für Runner {username} ({user_id}) erstellt")
         else:
             logger_newLog("error", "handle_watchtower_interaction", f"Fehler beim Erstellen des RUNNERWATCHTOWER POI")
@@ -0,0 +1,25 @@
+# Übernimmt den alten Tile-Cache (ein PNG je Tile unter <provider>/<z>/<x>/<y>.png)
+# in die MBTiles-Dateien des Tile-Caches
+# Aufruf: python import_tile_cache.py [Verzeichnis] [--remove]
+#
+# Ohne Verzeichnis wird TILE_CACHE_DIR verwendet. Mit --remove werden die
+# übernommenen Dateien und leeren Verzeichnisse gelöscht.
+import os
+import sys
+
+from config import conf_getTileCacheDir
+from tile_cache_server import get_tile_cache
+
+args = [arg for arg in sys.argv[1:] if arg != '--remove']
+source_dir = args[0] if args else conf_getTileCacheDir()
+if not os.path.isdir(source_dir):
+    print(f"Verzeichnis {source_dir} nicht gefunden")
+    sys.exit(1)
+
+cache = get_tile_cache()
+imported = cache.import_directory_tree(source_dir, remove='--remove' in sys.argv)
+cache.close()
+
+for provider, count in imported.items():
+    print(f"{provider}: {count} Tiles nach {cache.get_store_path(provider)} übernommen")
+print(f"Insgesamt {sum(imported.values())} Tiles übernommen")
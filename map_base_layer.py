@@ -0,0 +1,281 @@
+import asyncio
+import glob
+import hashlib
+import io
+import json
+import os
+import threading
+import staticmaps
+from PIL import Image
+from logger import logger_newLog
+from geofunctions import calculate_distance
+from config import conf_getMapProvider, conf_getRenderCacheDir
+from cached_tile_provider import CachedTileProvider
+
+# Vorgerenderte Grundkarte pro Spiel (in jedem Render-Prozess): {game_id: (Schlüssel, MapBaseLayer)}
+map_base_layers = {}
+map_base_lock = threading.Lock()
+# Laufende Vorab-Renderings (Referenz halten, damit die Tasks nicht eingesammelt werden)
+map_base_tasks = set()
+
+class MapBaseLayer:
+    """Grundkarte eines Spiels (Tiles + Spielfeld + Ziellinie) mit ihren Projektionsparametern
+
+    Mit denselben Parametern (Größe, Zoom, Zentrum, Tile-Größe) lassen sich später
+    Spieler und POIs pixelgenau auf eine Kopie des Bildes zeichnen.
+    """
+
+    def __init__(self, image, width, height, zoom, center, tile_size):
+        self.image = image
+        self.width = width
+        self.height = height
+        self.zoom = zoom
+        self.center = center
+        self.tile_size = tile_size
+
+    def transformer(self):
+        """Projektion der Grundkarte für das Zeichnen weiterer Objekte"""
+        return staticmaps.Transformer(self.width, self.height, self.zoom, self.center, self.tile_size)
+
+def map_tile_provider(tile_provider_name, cache_enabled):
+    """Wählt den Tile-Provider aus der Konfiguration (bei aktiviertem Caching über den lokalen Tile-Server)"""
+    if tile_provider_name == "OSM":
+        original_provider = staticmaps.tile_provider_OSM
+    elif tile_provider_name == "CartoDarkNoLabels":
+        original_provider = staticmaps.tile_provider_CartoDarkNoLabels
+    elif tile_provider_name == "CartoNoLabels":
+        original_provider = staticmaps.tile_provider_CartoNoLabels
+    elif tile_provider_name == "ArcGISWorldImagery":
+        original_provider = staticmaps.tile_provider_ArcGISWorldImagery
+    elif tile_provider_name in ["StamenTonerLite", "StamenToner", "StamenTerrain"]:
+        logger_newLog("warning", "map_tile_provider", f"{tile_provider_name} ist nicht mehr verfügbar, verwende OSM")
+        original_provider = staticmaps.tile_provider_OSM
+    else:
+        logger_newLog("warning", "map_tile_provider", f"Unbekannter Tile-Provider '{tile_provider_name}', verwende OSM")
+        original_provider = staticmaps.tile_provider_OSM
+
+    if cache_enabled:
+        try:
+            cached_provider = CachedTileProvider(original_provider, cache_enabled=True)
+            logger_newLog("info", "map_tile_provider", f"Verwende Cached-Tile-Provider: {cached_provider.name()}")
+            return cached_provider
+        except Exception as e:
+            logger_newLog("warning", "map_tile_provider", f"Fehler beim Erstellen des Cached-Tile-Providers: {str(e)}, verwende Original-Provider")
+    logger_newLog("info", "map_tile_provider", f"Verwende Original-Tile-Provider: {original_provider.name()}")
+    return original_provider
+
+def map_image_size(game_data, max_size):
+    """Berechnet die Bildgröße aus dem Seitenverhältnis des Spielfelds und der maximalen Kantenlänge"""
+    corners = [
+        (game_data[4], game_data[5]),  # Ecke 1
+        (game_data[6], game_data[7]),  # Ecke 2
+        (game_data[8], game_data[9]),  # Ecke 3
+        (game_data[10], game_data[11]) # Ecke 4
+    ]
+    # Länge: Ecke 1 zu 2, Breite: Ecke 2 zu 3
+    field_length = calculate_distance(corners[0][0], corners[0][1], corners[1][0], corners[1][1])
+    field_width = calculate_distance(corners[1][0], corners[1][1], corners[2][0], corners[2][1])
+
+    # Seitenverhältnis = Breite / Höhe
+    aspect = field_width / field_length if field_length > 0 else 1
+    logger_newLog("debug", "map_image_size", f"Seitenverhältnis Spielfeld: {aspect:.3f} (Breite: {field_width:.1f}m, Höhe: {field_length:.1f}m)")
+    if aspect > 1:  # Spielfeld ist breiter als hoch
+        return max_size, int(max_size / aspect)
+    # Spielfeld ist höher als breit oder quadratisch
+    return int(max_size * aspect), max_size
+
+def map_base_key(game_data, tile_provider_name, max_size):
+    """Alles was die Grundkarte bestimmt: Spielfeld, Ziellinie und Karteneinstellungen"""
+    return (tile_provider_name, max_size, tuple(game_data[4:16]))
+
+def map_base_context(game_data, tile_provider_name, cache_enabled, max_size):
+    """Baut den staticmaps-Context der Grundkarte und bestimmt Bildgröße, Zentrum und Zoom
+
+    Returns:
+        (Context, Tile-Provider, Breite, Höhe, Zentrum, Zoom)
+    """
+    context = staticmaps.Context()
+    tile_provider = map_tile_provider(tile_provider_name, cache_enabled)
+    context.set_tile_provider(tile_provider)
+
+    # Spielfeld als Polygon
+    field_corners = [
+        staticmaps.create_latlng(game_data[4], game_data[5]),  # corner1
+        staticmaps.create_latlng(game_data[6], game_data[7]),  # corner2
+        staticmaps.create_latlng(game_data[8], game_data[9]),  # corner3
+        staticmaps.create_latlng(game_data[10], game_data[11]), # corner4
+        staticmaps.create_latlng(game_data[4], game_data[5])   # corner1 wiederholen (Polygon schließen)
+    ]
+    context.add_object(staticmaps.Area(
+        field_corners,
+        fill_color=staticmaps.parse_color("#FF000020"),  # Rot mit Transparenz
+        width=2,
+        color=staticmaps.RED
+    ))
+
+    # Ziellinie
+    finish_line = [
+        staticmaps.create_latlng(game_data[12], game_data[13]),  # finish1
+        staticmaps.create_latlng(game_data[14], game_data[15])   # finish2
+    ]
+    context.add_object(staticmaps.Line(
+        finish_line,
+        color=staticmaps.GREEN,
+        width=4
+    ))
+
+    center_lat = (game_data[4] + game_data[6] + game_data[8] + game_data[10]) / 4
+    center_lon = (game_data[5] + game_data[7] + game_data[9] + game_data[11]) / 4
+    context.set_center(staticmaps.create_latlng(center_lat, center_lon))
+
+    width_px, height_px = map_image_size(game_data, max_size)
+    # Zoom wird einmal aus dem Spielfeld bestimmt und für alle Overlays beibehalten
+    center, zoom = context.determine_center_zoom(width_px, height_px)
+    return context, tile_provider, width_px, height_px, center, zoom
+
+def map_base_tiles(game_data, tile_provider_name, max_size):
+    """Alle Tiles (z, x, y), die für die Grundkarte eines Spiels gebraucht werden
+
+    Returns:
+        (Original-Tile-Provider, Liste der Tiles)
+    """
+    _, tile_provider, width_px, height_px, center, zoom = map_base_context(game_data, tile_provider_name, False, max_size)
+    trans = staticmaps.Transformer(width_px, height_px, zoom, center, tile_provider.tile_size())
+    # Gleiche Auswahl wie beim Rendern der Tiles durch staticmaps
+    tiles = []
+    for yy in range(trans.tiles_y()):
+        y = trans.first_tile_y() + yy
+        if y < 0 or y >= trans.number_of_tiles():
+            continue
+        for xx in range(trans.tiles_x()):
+            tiles.append((zoom, (trans.first_tile_x() + xx) % trans.number_of_tiles(), y))
+    return tile_provider, tiles
+
+def map_base_render(game_data, tile_provider_name, cache_enabled, max_size):
+    """Rendert die Grundkarte eines Spiels (blockierend, lädt die Tiles)
+
+    Returns:
+        MapBaseLayer
+    """
+    context, tile_provider, width_px, height_px, center, zoom = map_base_context(game_data, tile_provider_name, cache_enabled, max_size)
+    logger_newLog("debug", "map_base_render", f"Rendere Grundkarte für Spiel {game_data[0]} in {width_px}x{height_px}, Zoom {zoom}")
+
+    try:
+        surface = context.render_cairo(width_px, height_px)
+        buffer = io.BytesIO()
+        surface.write_to_png(buffer)
+        buffer.seek(0)
+        image = Image.open(buffer).convert("RGBA")
+        logger_newLog("info", "map_base_render", f"Grundkarte für Spiel {game_data[0]} mit Cairo gerendert")
+    except Exception as e:
+        logger_newLog("warning", "map_base_render", f"Cairo nicht verfügbar, verwende Pillow: {str(e)}")
+        image = context.render_pillow(width_px, height_px).convert("RGBA")
+        logger_newLog("info", "map_base_render", f"Grundkarte für Spiel {game_data[0]} mit Pillow gerendert")
+
+    return MapBaseLayer(image, width_px, height_px, zoom, center, tile_provider.tile_size())
+
+def _map_base_path(game_id, key):
+    """Dateiname der gespeicherten Grundkarte (ohne Endung), eindeutig pro Spiel und Schlüssel"""
+    digest = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(conf_getRenderCacheDir(), f"base_{game_id}_{digest}")
+
+def _map_base_load(path):
+    """Lädt eine gespeicherte Grundkarte samt Projektionsparametern oder gibt None zurück"""
+    try:
+        with open(f"{path}.json") as f:
+            params = json.load(f)
+        image = Image.open(f"{path}.png").convert("RGBA")
+    except (OSError, ValueError):
+        return None
+    center = staticmaps.create_latlng(params['center_lat'], params['center_lng'])
+    return MapBaseLayer(image, params['width'], params['height'], params['zoom'], center, params['tile_size'])
+
+def _map_base_save(path, layer):
+    """Speichert Grundkarte und Projektionsparameter, damit andere Render-Prozesse sie wiederverwenden"""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Bild zuerst, die JSON-Datei macht den Eintrag gültig
+        layer.image.save(f"{path}.png.tmp", format="PNG")
+        os.replace(f"{path}.png.tmp", f"{path}.png")
+        params = {
+            'width': layer.width,
+            'height': layer.height,
+            'zoom': layer.zoom,
+            'center_lat': layer.center.lat().degrees,
+            'center_lng': layer.center.lng().degrees,
+            'tile_size': layer.tile_size
+        }
+        with open(f"{path}.json.tmp", 'w') as f:
+            json.dump(params, f)
+        os.replace(f"{path}.json.tmp", f"{path}.json")
+    except OSError as e:
+        logger_newLog("warning", "map_base_save", f"Grundkarte konnte nicht gespeichert werden: {str(e)}")
+
+def map_base_is_stored(game_data, tile_provider_name, max_size):
+    """Prüft ob die Grundkarte eines Spiels bereits als Datei vorliegt"""
+    key = map_base_key(game_data, tile_provider_name, max_size)
+    return os.path.exists(f"{_map_base_path(game_data[0], key)}.json")
+
+def map_base_get(game_data, tile_provider_name, cache_enabled, max_size):
+    """Gibt die Grundkarte eines Spiels zurück und rendert sie nur, wenn sich Spielfeld oder Einstellungen geändert haben
+
+    Reihenfolge: Speicher dieses Prozesses, gespeicherte Datei, neu rendern.
+    """
+    game_id = game_data[0]
+    key = map_base_key(game_data, tile_provider_name, max_size)
+    with map_base_lock:
+        cached = map_base_layers.get(game_id)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    path = _map_base_path(game_id, key)
+    layer = _map_base_load(path)
+    if layer is None:
+        layer = map_base_render(game_data, tile_provider_name, cache_enabled, max_size)
+        _map_base_save(path, layer)
+    with map_base_lock:
+        map_base_layers[game_id] = (key, layer)
+    return layer
+
+def map_base_compose(layer, objects):
+    """Zeichnet Objekte (Spieler, POIs, Reichweiten) auf eine Kopie der Grundkarte
+
+    Returns:
+        PNG als Bytes
+    """
+    renderer = staticmaps.PillowRenderer(layer.transformer())
+    renderer.render_objects(objects)
+    image = Image.alpha_composite(layer.image, renderer.image())
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+async def map_base_prerender(game_id):
+    """Rendert die Grundkarte eines Spiels im Hintergrund vor (nach /fieldsetup und beim Spielstart)"""
+    if conf_getMapProvider() != "py-staticmap-PNG":
+        return
+    from database import db_Game_getField
+    from database_async import db_async
+    game_data = await db_async(db_Game_getField, game_id)
+    if not game_data or any(value is None for value in game_data[4:16]):
+        return
+    # Tiles laden dauert - im Render-Prozess statt im Datenbank-Thread oder in der Event-Loop
+    from map_render import MapRenderJob, map_render
+    if await map_render(MapRenderJob(game_data, None)):
+        logger_newLog("info", "map_base_prerender", f"Grundkarte für Spiel {game_id} vorgerendert")
+
+def map_base_prerender_later(game_id):
+    """Startet map_base_prerender als Hintergrund-Task, ohne auf das Ergebnis zu warten"""
+    task = asyncio.create_task(map_base_prerender(game_id))
+    map_base_tasks.add(task)
+    task.add_done_callback(map_base_tasks.discard)
+
+def map_base_drop(game_id):
+    """Verwirft die Grundkarte eines Spiels (z.B. nach Spielende), auch die gespeicherten Dateien"""
+    with map_base_lock:
+        map_base_layers.pop(game_id, None)
+    for path in glob.glob(os.path.join(conf_getRenderCacheDir(), f"base_{game_id}_*")):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
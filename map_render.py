@@ -0,0 +1,304 @@
+import asyncio
+import concurrent.futures
+import multiprocessing
+import staticmaps
+from logger import logger_newLog
+from config import conf_getMapRenderWorkers, conf_getMapRenderTimeoutSeconds, conf_getMapRenderMaxPending
+from config import conf_getMapExportMaxSize, conf_getTileProvider, conf_getTileCaching
+from map_base_layer import map_base_get, map_base_compose, map_base_is_stored, map_base_tiles
+
+# Prozess-Pool für das Rendern (wird beim ersten Auftrag erstellt)
+map_render_executor = None
+# Begrenzt die gleichzeitig an den Pool übergebenen Aufträge auf die Anzahl der Render-Prozesse
+map_render_semaphore = None
+# Aufträge, die warten oder gerade gerendert werden
+map_render_pending = 0
+# Laufende Aufträge je Pool: {Pool: {concurrent.futures.Future}}
+map_render_inflight = {}
+# Hintergrund-Tasks, die ersetzte Pools nach dem Ende ihrer übrigen Aufträge beenden
+map_render_retire_tasks = set()
+
+class MapRenderJob:
+    """Beschreibung eines Render-Auftrags für einen Render-Prozess (nur einfache, picklebare Werte)
+
+    Attribute:
+        game_data: games-Zeile wie von db_Game_getField (ID, Name, Spielfeld, Ziellinie)
+        features: GeoJSON-Features für POIs und Spieler oder None (nur Grundkarte vorrendern)
+        draw_players: Spieler-Marker zeichnen
+        tile_provider, tile_caching, max_size: Karteneinstellungen aus der Konfiguration
+    """
+
+    def __init__(self, game_data, features, draw_players=False):
+        self.game_data = tuple(game_data[:16])
+        self.features = features
+        self.draw_players = draw_players
+        self.tile_provider = conf_getTileProvider()
+        self.tile_caching = conf_getTileCaching()
+        self.max_size = conf_getMapExportMaxSize()
+
+def map_overlay_objects(features, draw_players):
+    """Erzeugt die staticmaps-Objekte für POIs, Reichweiten und Spieler aus GeoJSON-Features"""
+    overlays = []
+
+    # POIs hinzufügen
+    for feature in features:
+        if feature['type'] == 'Feature' and feature['geometry']['type'] == 'Point':
+            props = feature['properties']
+            feature_type = props.get('featuretype')
+            
+            if feature_type in ['TRAP', 'WATCHTOWER', 'RADARPING']:
+                coords = feature['geometry']['coordinates']
+                lat, lon = coords[1], coords[0]  # GeoJSON: [lon, lat]
+                pos = staticmaps.create_latlng(lat, lon)
+                
+                # Bestimme Farbe und Größe basierend auf POI-Typ
+                if feature_type == 'TRAP':
+                    color = staticmaps.parse_color("#FF0000")  # Rot
+                    size = 8
+                elif feature_type == 'WATCHTOWER':
+                    color = staticmaps.parse_color("#0000FF")  # Blau
+                    size = 10
+                elif feature_type == 'RADARPING':
+                    color = staticmaps.parse_color("#FF00FF")  # Magenta
+                    size = 6
+                else:
+                    continue
+                
+                # Füge POI-Marker hinzu (außer WATCHTOWER, die werden als Ringe dargestellt)
+                if feature_type != 'WATCHTOWER':
+                    overlays.append(staticmaps.Marker(
+                        pos,
+                        color=color,
+                        size=size
+                    ))
+                
+                # Range-Kreise für TRAP und WATCHTOWER
+                if feature_type in ['TRAP', 'WATCHTOWER'] and 'range' in props:
+                    range_meters = props['range']
+                    if range_meters and range_meters > 0:
+                        # Berechne Kreis-Radius (ungefähre Umrechnung)
+                        # 1 Grad ≈ 111km, also range_meters / 111000 Grad
+                        radius_degrees = range_meters / 111000.0
+                        
+                        # Erstelle Kreis-Polygon (vereinfacht als 32-Punkt-Polygon für bessere Darstellung)
+                        import math
+                        circle_points = []
+                        for i in range(32):
+                            angle = i * 2 * math.pi / 32
+                            dlat = radius_degrees * math.cos(angle)
+                            dlon = radius_degrees * math.sin(angle) / math.cos(math.radians(lat))
+                            circle_points.append(staticmaps.create_latlng(lat + dlat, lon + dlon))
+                        
+                        # Schließe den Kreis, indem der erste Punkt am Ende wiederholt wird
+                        if circle_points:
+                            circle_points.append(circle_points[0])
+                        
+                        if feature_type == 'TRAP':
+                            # TRAP: Gefüllter Kreis mit Transparenz
+                            range_color = staticmaps.parse_color("#FF000020")  # Rot mit Transparenz
+                            overlays.append(staticmaps.Area(
+                                circle_points,
+                                fill_color=range_color,
+                                width=2,
+                                color=color
+                            ))
+                        elif feature_type == 'WATCHTOWER':
+                            # WATCHTOWER: Nur Ring (keine Füllung) + kleiner Marker in der Mitte
+                            overlays.append(staticmaps.Area(
+                                circle_points,
+                                fill_color=staticmaps.parse_color("#00000000"),  # Transparent
+                                width=3,
+                                color=color
+                            ))
+                            # Kleiner Marker in der Mitte des Wachturms
+                            overlays.append(staticmaps.Marker(
+                                pos,
+                                color=color,
+                                size=6
+                            ))
+
+    # Spieler-Marker hinzufügen (bereits nach Rolle gefiltert,
+    # damit das Bild genau dem Schlüssel im Render-Cache entspricht)
+    color_map = {
+        "red": staticmaps.RED,
+        "blue": staticmaps.BLUE,
+        "green": staticmaps.GREEN,
+        "yellow": staticmaps.YELLOW,
+        "purple": staticmaps.PURPLE
+    }
+    if draw_players:
+        for feature in features:
+            if feature['type'] != 'Feature' or feature['geometry']['type'] != 'Point':
+                continue
+            feature_type = feature['properties'].get('featuretype')
+            coords = feature['geometry']['coordinates']
+            pos = staticmaps.create_latlng(coords[1], coords[0])  # GeoJSON: [lon, lat]
+            if feature_type == 'runner':
+                overlays.append(staticmaps.Marker(
+                    pos,
+                    color=staticmaps.parse_color("#808080"),  # Grau
+                    size=10
+                ))
+            elif feature_type == 'hunter':
+                # Farbe basierend auf Team
+                team_color = feature['properties'].get('team') or "blue"
+                overlays.append(staticmaps.Marker(
+                    pos,
+                    color=color_map.get(team_color, staticmaps.BLUE),
+                    size=12
+                ))
+
+    return overlays
+
+def map_render_run(job):
+    """Führt einen Render-Auftrag aus (läuft im Render-Prozess)
+
+    Returns:
+        PNG als Bytes, bei reinem Vorrendern der Grundkarte True
+    """
+    base_layer = map_base_get(job.game_data, job.tile_provider, job.tile_caching, job.max_size)
+    if job.features is None:
+        return True
+    overlays = map_overlay_objects(job.features, job.draw_players)
+    return map_base_compose(base_layer, overlays)
+
+def _map_render_worker_init():
+    """Initialisierung jedes Render-Prozesses"""
+    # Der lokale Tile-Server läuft im Hauptprozess, die Render-Prozesse nutzen ihn nur
+    from tile_cache_server import tile_server_use_existing
+    tile_server_use_existing()
+
+def map_render_get_executor():
+    """Gibt den Prozess-Pool zurück und erstellt ihn bei Bedarf"""
+    global map_render_executor
+    if map_render_executor is None:
+        if conf_getTileCaching():
+            from tile_cache_server import start_tile_server
+            start_tile_server()
+        # spawn statt fork: der Bot hat bereits Threads (Datenbank, Tile-Server), die ein fork nicht sauber übernimmt
+        map_render_executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=conf_getMapRenderWorkers(),
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_map_render_worker_init
+        )
+        logger_newLog("info", "map_render", f"Render-Pool mit {conf_getMapRenderWorkers()} Prozessen gestartet")
+    return map_render_executor
+
+def map_render_shutdown(kill=False):
+    """Beendet den Prozess-Pool (beim Beenden des Bots)
+
+    Args:
+        kill: Laufende Render-Prozesse sofort beenden statt auf sie zu warten
+    """
+    # Auch Pools, die gerade wegen eines hängenden Prozesses ersetzt werden
+    for executor in set(map_render_inflight) | ({map_render_executor} if map_render_executor is not None else set()):
+        _map_render_discard(executor, kill)
+
+def _map_render_discard(executor, kill):
+    """Verwirft einen Pool; der nächste Auftrag erstellt einen neuen"""
+    global map_render_executor
+    if map_render_executor is executor:
+        map_render_executor = None
+    map_render_inflight.pop(executor, None)
+    # ProcessPoolExecutor bietet (vor Python 3.14) keinen öffentlichen Weg, hängende Prozesse zu beenden
+    processes = list((getattr(executor, '_processes', None) or {}).values()) if kill else []
+    executor.shutdown(wait=not kill, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+
+def _map_render_retire(executor, hung_future):
+    """Ersetzt einen Pool mit hängendem Render-Prozess, ohne die übrigen Aufträge abzubrechen
+
+    Neue Aufträge gehen sofort an einen neuen Pool. Der alte nimmt nichts mehr an
+    und wird beendet, sobald seine anderen Aufträge fertig oder selbst abgelaufen
+    sind - ein Prozess lässt sich nicht einzeln beenden, ohne den ganzen Pool
+    unbrauchbar zu machen.
+    """
+    global map_render_executor
+    if map_render_executor is not executor:
+        return  # Wird bereits ersetzt
+    map_render_executor = None
+    executor.shutdown(wait=False)
+    others = [future for future in map_render_inflight.get(executor, ()) if future is not hung_future]
+
+    async def retire():
+        if others:
+            await asyncio.wait([asyncio.wrap_future(future) for future in others], timeout=conf_getMapRenderTimeoutSeconds())
+        _map_render_discard(executor, kill=True)
+        logger_newLog("info", "map_render", "Ersetzter Render-Pool beendet")
+
+    task = asyncio.create_task(retire())
+    map_render_retire_tasks.add(task)
+    task.add_done_callback(map_render_retire_tasks.discard)
+
+def map_render_overloaded():
+    """Gibt zurück ob map_render einen neuen Auftrag wegen MAP_RENDER_MAX_PENDING ablehnen würde"""
+    return map_render_pending >= conf_getMapRenderMaxPending()
+
+async def map_render(job):
+    """Rendert eine Karte im Prozess-Pool, ohne die Event-Loop zu blockieren
+
+    Höchstens MAP_RENDER_WORKERS Aufträge laufen gleichzeitig, weitere warten.
+    Sind schon MAP_RENDER_MAX_PENDING Aufträge offen, wird abgelehnt (siehe
+    map_render_overloaded). Dauert ein Auftrag länger als MAP_RENDER_TIMEOUT_SECONDS
+    (inkl. Wartezeit) oder wird der aufrufende Task abgebrochen, wird sein
+    Render-Prozess beendet, ohne andere laufende Aufträge abzubrechen.
+
+    Returns:
+        Ergebnis von map_render_run oder None bei Fehler, Timeout oder Überlast
+    """
+    global map_render_pending, map_render_semaphore
+    game_id = job.game_data[0]
+    if map_render_overloaded():
+        logger_newLog("warning", "map_render", f"Zu viele offene Render-Aufträge ({map_render_pending}), Karte für Spiel {game_id} abgelehnt")
+        return None
+    if map_render_semaphore is None:
+        map_render_semaphore = asyncio.Semaphore(conf_getMapRenderWorkers())
+
+    map_render_pending += 1
+    try:
+        return await asyncio.wait_for(_map_render_submit(job), timeout=conf_getMapRenderTimeoutSeconds())
+    except asyncio.TimeoutError:
+        logger_newLog("error", "map_render", f"Rendern der Karte für Spiel {game_id} nach {conf_getMapRenderTimeoutSeconds()}s abgebrochen")
+        return None
+    except concurrent.futures.process.BrokenProcessPool:
+        logger_newLog("error", "map_render", f"Render-Pool beim Rendern der Karte für Spiel {game_id} ausgefallen")
+        return None
+    except Exception as e:
+        logger_newLog("error", "map_render", f"Fehler beim Rendern der Karte für Spiel {game_id}: {str(e)}")
+        return None
+    finally:
+        map_render_pending -= 1
+
+async def _map_render_prefetch_tiles(job):
+    """Lädt vor dem ersten Rendern der Grundkarte alle ihre Tiles gleichzeitig in den Tile-Cache
+
+    Ohne das würde staticmaps im Render-Prozess jedes fehlende Tile einzeln nachladen.
+    """
+    if not job.tile_caching or map_base_is_stored(job.game_data, job.tile_provider, job.max_size):
+        return
+    from tile_fetcher import tile_fetch_all
+    provider, tiles = map_base_tiles(job.game_data, job.tile_provider, job.max_size)
+    await tile_fetch_all(provider, tiles)
+
+async def _map_render_submit(job):
+    """Übergibt einen Auftrag an den Pool, sobald ein Render-Prozess frei ist"""
+    await _map_render_prefetch_tiles(job)
+    async with map_render_semaphore:
+        executor = map_render_get_executor()
+        future = executor.submit(map_render_run, job)
+        inflight = map_render_inflight.setdefault(executor, set())
+        inflight.add(future)
+        future.add_done_callback(inflight.discard)
+        try:
+            return await asyncio.wrap_future(future)
+        except concurrent.futures.process.BrokenProcessPool:
+            # Ein Render-Prozess ist abgestürzt oder wurde beendet - beim nächsten Auftrag neuer Pool
+            _map_render_discard(executor, kill=True)
+            raise
+        except asyncio.CancelledError:
+            # Timeout oder Abbruch: noch nicht gestartete Aufträge verwerfen, hängenden Prozess über einen neuen Pool loswerden
+            if not future.cancel():
+                logger_newLog("warning", "map_render", "Render-Prozess hängt, Pool wird ersetzt")
+                _map_render_retire(executor, future)
+            raise
@@ -0,0 +1,110 @@
+import math
+import threading
+from logger import logger_newLog
+from config import conf_getTrapRangeMeters, conf_getWatchtowerRangeMeters
+from geo_batch import geo_distances_from_point
+
+# POI-Typen mit Reichweite, die bei jedem Live-Standort eines Runners geprüft werden
+INDEXED_POI_TYPES = ('TRAP', 'WATCHTOWER')
+
+METERS_PER_DEGREE_LAT = 111320.0
+
+# Ein Index pro Spiel: {game_id: POIGridIndex}
+poi_indexes = {}
+# Schützt poi_indexes: db_POI_add läuft im Datenbank-Thread, Abfragen in der Event-Loop
+poi_index_lock = threading.Lock()
+
+class POIGridIndex:
+    """Räumlicher Gitter-Index für die POIs eines Spiels
+
+    Die POIs werden in Zellen von cell_size Metern einsortiert. Für eine Position
+    müssen nur die Zellen im Umkreis der größten POI-Reichweite geprüft werden
+    statt aller POIs des Spiels.
+    """
+
+    def __init__(self, cell_size):
+        self.cell_size = max(1.0, float(cell_size))
+        self.lat_step = self.cell_size / METERS_PER_DEGREE_LAT  # Zellhöhe in Grad
+        self.cells = {}       # {(Zeile, Spalte): [poi, ...]}
+        self.poi_ids = set()  # Verhindert doppelte Einträge
+        self.max_range = 0
+
+    def _cell(self, lat, lon):
+        # Zellbreite in Grad Länge ist überall gleich (am Äquator cell_size Meter),
+        # daher bleibt die Einteilung unabhängig von der Position stabil
+        return (math.floor(lat / self.lat_step), math.floor(lon / self.lat_step))
+
+    def add(self, poi):
+        """Fügt einen POI hinzu (Tuple wie aus der poi-Tabelle)"""
+        poi_id, _, _, lat, lon, range_meters = poi[:6]
+        if poi_id in self.poi_ids:
+            return
+        self.poi_ids.add(poi_id)
+        self.cells.setdefault(self._cell(lat, lon), []).append(poi)
+        self.max_range = max(self.max_range, range_meters or 0)
+
+    def query(self, lat, lon):
+        """Gibt alle POIs zurück, in deren Reichweite die Position liegt
+
+        Returns:
+            Liste von (poi, Entfernung in Metern)
+        """
+        if not self.poi_ids:
+            return []
+        row, col = self._cell(lat, lon)
+        # Anzahl Nachbarzellen, die die größte Reichweite abdecken (in Längenrichtung
+        # sind die Zellen zum Pol hin schmaler, daher entsprechend mehr)
+        rows = math.ceil(self.max_range / self.cell_size)
+        cols = math.ceil(self.max_range / (self.cell_size * max(0.01, math.cos(math.radians(lat)))))
+
+        candidates = []
+        for r in range(row - rows, row + rows + 1):
+            for c in range(col - cols, col + cols + 1):
+                candidates.extend(self.cells.get((r, c), ()))
+
+        distances = geo_distances_from_point(lat, lon, [(poi[3], poi[4]) for poi in candidates])
+        return [(poi, distance) for poi, distance in zip(candidates, distances) if distance <= poi[5]]
+
+def poi_index_is_loaded(game_id):
+    """Prüft ob der Index eines Spiels bereits geladen ist"""
+    return game_id in poi_indexes
+
+def poi_index_load(game_id):
+    """Lädt alle TRAP- und WATCHTOWER-POIs eines Spiels einmalig aus der Datenbank"""
+    from database import db_POI_get_by_type
+    with poi_index_lock:
+        if game_id in poi_indexes:
+            return poi_indexes[game_id]
+        index = POIGridIndex(max(conf_getTrapRangeMeters(), conf_getWatchtowerRangeMeters()))
+        for poi_type in INDEXED_POI_TYPES:
+            for poi in db_POI_get_by_type(game_id, poi_type):
+                index.add(poi)
+        poi_indexes[game_id] = index
+    logger_newLog("info", "poi_index_load", f"POI-Index für Spiel {game_id} geladen ({len(index.poi_ids)} POIs)")
+    return index
+
+def poi_index_add(poi):
+    """Trägt einen neu angelegten POI in den Index seines Spiels ein (nur wenn dieser schon geladen ist)"""
+    if poi[2] not in INDEXED_POI_TYPES:
+        return
+    with poi_index_lock:
+        index = poi_indexes.get(poi[1])
+        if index is not None:
+            index.add(poi)
+
+def poi_index_query(game_id, lat, lon):
+    """Gibt alle POIs eines Spiels zurück, in deren Reichweite die Position liegt
+
+    Returns:
+        Liste von (poi, Entfernung in Metern)
+    """
+    with poi_index_lock:
+        index = poi_indexes.get(game_id)
+        if index is None:
+            return []
+        return index.query(lat, lon)
+
+def poi_index_drop(game_id):
+    """Entfernt den Index eines Spiels (z.B. nach Spielende)"""
+    with poi_index_lock:
+        poi_indexes.pop(game_id, None)
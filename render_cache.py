@@ -0,0 +1,214 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from logger import logger_newLog
+from config import conf_getRenderCacheTTLSeconds, conf_getRenderCacheMaxMemoryMB, conf_getRenderCacheDir, conf_getRenderCacheMaxDiskMB
+
+# Gerenderte Karten im Speicher, älteste Verwendung zuerst: {Schlüssel: (Zeitpunkt, PNG-Bytes)}
+render_cache_entries = OrderedDict()
+render_cache_bytes = 0
+render_cache_lock = threading.Lock()
+# Telegram file_ids bereits hochgeladener Karten: {(Schlüssel, 'photo'/'document'): (Zeitpunkt, file_id)}
+render_cache_file_ids = OrderedDict()
+RENDER_CACHE_MAX_FILE_IDS = 1000
+
+# Eigenschaften, die map_overlay_objects je Feature-Typ tatsächlich zeichnet
+RENDER_CACHE_DRAWN_PROPERTIES = {
+    'TRAP': ('range',),
+    'WATCHTOWER': ('range',),
+    'RADARPING': (),
+    'runner': (),
+    'hunter': ('team',),
+}
+
+def _render_cache_drawn(feature):
+    """Reduziert ein Feature auf das, was im Bild sichtbar ist (None = wird nicht gezeichnet)
+
+    Spielfeld und Ziellinie bleiben mit ihrer Geometrie enthalten, weil sie die Grundkarte bestimmen.
+    """
+    geometry = feature.get('geometry') or {}
+    props = feature.get('properties') or {}
+    feature_type = props.get('featuretype')
+    if geometry.get('type') != 'Point':
+        return {'featuretype': feature_type, 'geometry': geometry}
+    if feature_type not in RENDER_CACHE_DRAWN_PROPERTIES:
+        return None
+    drawn = {'featuretype': feature_type, 'coordinates': geometry.get('coordinates')}
+    for name in RENDER_CACHE_DRAWN_PROPERTIES[feature_type]:
+        drawn[name] = props.get(name)
+    return drawn
+
+def render_cache_key(geojson, settings):
+    """Erzeugt den Cache-Schlüssel aus dem (rollengefilterten) GeoJSON und den Renderer-Einstellungen
+
+    Nur gezeichnete Angaben gehen ein (Geometrie, Typ, Reichweite, Team-Farbe), nicht etwa
+    Zeitstempel oder Namen. Zwei Anfragen mit gleichem sichtbaren Spielstand und gleichen
+    Einstellungen erhalten denselben Schlüssel und damit dasselbe Bild.
+    """
+    features = []
+    for feature in (geojson or {}).get('features', []):
+        drawn = _render_cache_drawn(feature)
+        if drawn is not None:
+            features.append(drawn)
+    payload = json.dumps({'features': features, 'settings': settings}, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def _render_cache_path(key):
+    return os.path.join(conf_getRenderCacheDir(), f"{key}.png")
+
+async def render_cache_get(key):
+    """Gibt das gespeicherte PNG zu einem Schlüssel zurück (erst Speicher, dann Festplatte)
+
+    Returns:
+        PNG als Bytes oder None wenn nicht vorhanden bzw. älter als RENDER_CACHE_TTL_SECONDS
+    """
+    global render_cache_bytes
+    ttl = conf_getRenderCacheTTLSeconds()
+    now = time.time()
+    with render_cache_lock:
+        entry = render_cache_entries.get(key)
+        if entry is not None:
+            if now - entry[0] <= ttl:
+                render_cache_entries.move_to_end(key)
+                return entry[1]
+            del render_cache_entries[key]
+            render_cache_bytes -= len(entry[1])
+
+    if conf_getRenderCacheMaxDiskMB() <= 0:
+        return None
+    # Festplattenzugriff im Thread-Pool, damit der Event-Loop nicht blockiert
+    return await asyncio.get_running_loop().run_in_executor(None, _render_cache_read_disk, key, now, ttl)
+
+def _render_cache_read_disk(key, now, ttl):
+    """Liest ein PNG von der Festplatte und legt es im Speicher ab (läuft im Thread-Pool)"""
+    path = _render_cache_path(key)
+    try:
+        created = os.path.getmtime(path)
+        if now - created > ttl:
+            os.unlink(path)
+            return None
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    _render_cache_remember(key, data, created)
+    return data
+
+async def render_cache_put(key, data):
+    """Speichert ein gerendertes PNG im Speicher und (falls aktiviert) auf der Festplatte"""
+    _render_cache_remember(key, data, time.time())
+    if conf_getRenderCacheMaxDiskMB() <= 0:
+        return
+    await asyncio.get_running_loop().run_in_executor(None, _render_cache_write_disk, key, data)
+
+def _render_cache_write_disk(key, data):
+    """Schreibt ein PNG auf die Festplatte und hält RENDER_CACHE_MAX_DISK_MB ein (läuft im Thread-Pool)"""
+    try:
+        cache_dir = conf_getRenderCacheDir()
+        os.makedirs(cache_dir, exist_ok=True)
+        path = _render_cache_path(key)
+        # Erst vollständig schreiben, dann umbenennen, damit nie eine halbe Datei gelesen wird
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        _render_cache_trim_disk(cache_dir)
+    except OSError as e:
+        logger_newLog("warning", "render_cache_put", f"Karte konnte nicht auf der Festplatte gespeichert werden: {str(e)}")
+
+def _render_cache_remember(key, data, created):
+    """Legt ein PNG im Speicher ab und verdrängt die am längsten unbenutzten Einträge"""
+    global render_cache_bytes
+    max_bytes = conf_getRenderCacheMaxMemoryMB() * 1024 * 1024
+    if len(data) > max_bytes:
+        return
+    with render_cache_lock:
+        old = render_cache_entries.pop(key, None)
+        if old is not None:
+            render_cache_bytes -= len(old[1])
+        render_cache_entries[key] = (created, data)
+        render_cache_bytes += len(data)
+        while render_cache_bytes > max_bytes:
+            _, (_, evicted) = render_cache_entries.popitem(last=False)
+            render_cache_bytes -= len(evicted)
+
+def _render_cache_trim_disk(cache_dir):
+    """Löscht abgelaufene Dateien und danach die ältesten, bis RENDER_CACHE_MAX_DISK_MB eingehalten ist"""
+    max_bytes = conf_getRenderCacheMaxDiskMB() * 1024 * 1024
+    ttl = conf_getRenderCacheTTLSeconds()
+    now = time.time()
+    files = []
+    total = 0
+    for entry in os.scandir(cache_dir):
+        if not entry.is_file() or not entry.name.endswith('.png'):
+            continue
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        if now - stat.st_mtime > ttl:
+            try:
+                os.unlink(entry.path)
+            except OSError:
+                pass
+            continue
+        files.append((stat.st_mtime, stat.st_size, entry.path))
+        total += stat.st_size
+    files.sort()
+    for _, size, path in files:
+        if total <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+            total -= size
+        except OSError:
+            pass
+
+def render_cache_get_file_id(key, kind):
+    """Gibt die Telegram file_id zurück, unter der das Bild zu einem Schlüssel schon gesendet wurde
+
+    Args:
+        kind: 'photo' oder 'document' (Telegram vergibt je Versandart eigene file_ids)
+
+    Returns:
+        file_id oder None wenn unbekannt bzw. älter als RENDER_CACHE_TTL_SECONDS
+    """
+    with render_cache_lock:
+        entry = render_cache_file_ids.get((key, kind))
+        if entry is None:
+            return None
+        if time.time() - entry[0] > conf_getRenderCacheTTLSeconds():
+            del render_cache_file_ids[(key, kind)]
+            return None
+        render_cache_file_ids.move_to_end((key, kind))
+        return entry[1]
+
+def render_cache_set_file_id(key, kind, file_id):
+    """Merkt sich die file_id einer hochgeladenen Karte (gültig so lange wie das Bild selbst)"""
+    with render_cache_lock:
+        if (key, kind) in render_cache_file_ids:
+            # Zeitpunkt des ersten Renderns behalten, sonst würde die TTL nie ablaufen
+            created = render_cache_file_ids.pop((key, kind))[0]
+        else:
+            entry = render_cache_entries.get(key)
+            created = entry[0] if entry is not None else time.time()
+        render_cache_file_ids[(key, kind)] = (created, file_id)
+        while len(render_cache_file_ids) > RENDER_CACHE_MAX_FILE_IDS:
+            render_cache_file_ids.popitem(last=False)
+
+def render_cache_forget_file_id(key, kind):
+    """Verwirft eine file_id, die Telegram nicht mehr annimmt"""
+    with render_cache_lock:
+        render_cache_file_ids.pop((key, kind), None)
+
+def render_cache_clear():
+    """Leert den Speicher-Cache (Dateien auf der Festplatte laufen über die TTL ab)"""
+    global render_cache_bytes
+    with render_cache_lock:
+        render_cache_entries.clear()
+        render_cache_file_ids.clear()
+        render_cache_bytes = 0
@@ -1,5 +1,6 @@
 from logger import logger_newLog
 from database import db_getRunners, db_getHunters, db_getTeamMembers, db_Wallet_get_available_items, db_Wallet_decrement_item
+from database_async import db_async
 
 # Runner Shop Items
 async def ShopItemRunner1(bot, chat_id, user_id, username, game_id):
@@ -7,12 +8,12 @@ async def ShopItemRunner1(bot, chat_id, user_id, username, game_id):
     logger_newLog("info", "ShopItemRunner1", f"Runner Item 1 (RADAR PING) von {username} ({user_id}) in Spiel {game_id} aktiviert")
     
     # Hole verfügbare Anzahl für Nachricht
-    available_items = db_Wallet_get_available_items(game_id, "runner", str(user_id))
+    available_items = await db_async(db_Wallet_get_available_items, game_id, "runner", str(user_id))
     current_count = available_items.get("1", 0)
     
     # Hole aktuelle Position des Runners
     from database import db_getUserPosition
-    runner_position = db_getUserPosition(user_id)
+    runner_position = await db_async(db_getUserPosition, user_id)
     
     if not runner_position or runner_position[3] is None or runner_position[4] is None:
         await bot.send_message(chat_id, f"❌ **RADAR PING konnte nicht gesendet werden!**\n\nDu musst deinen Live-Standort aktiviert haben, um einen Radar Ping zu senden.")
@@ -23,34 +24,40 @@ async def ShopItemRunner1(bot, chat_id, user_id, username, game_id):
     
     # Hole alle Hunter und berechne Entfernungen
     from database import db_getHunters, db_POI_add
-    from geofunctions import calculate_distance
-    hunters = db_getHunters(game_id)
+    from geo_batch import geo_distances_from_point
+    hunters = await db_async(db_getHunters, game_id)
     
     if not hunters:
         await bot.send_message(chat_id, f"📡 **RADAR PING gesendet!**\n\nKeine Hunter im Spiel gefunden.\n📦 **Verfügbare Pings:** {current_count}")
         return
     
-    # Berechne Entfernungen zu allen Huntern und erstelle POI-Einträge
+    # Entfernungen zu allen Huntern mit Standort in einem Durchgang berechnen
+    located_hunters = [hunter for hunter in hunters if hunter[3] is not None and hunter[4] is not None]
+    distances_by_hunter = dict(zip(
+        [hunter[0] for hunter in located_hunters],
+        geo_distances_from_point(runner_lat, runner_lon, [(hunter[3], hunter[4]) for hunter in located_hunters])
+    ))
+    
+    # Erstelle POI-Einträge für die Entfernungen
     hunter_distances = []
-    for hunter in hunters:
+    for hunter in located_hunters:
         hunter_user_id, hunter_username, hunter_team, hunter_lat, hunter_lon, hunter_timestamp = hunter
         
-        if hunter_lat is not None and hunter_lon is not None:
-            distance = calculate_distance(runner_lat, runner_lon, hunter_lat, hunter_lon)
-            hunter_distances.append(distance)
-            
-            # Erstelle POI-Eintrag für diese Entfernung
-            # Verwende die Position des Runners als POI-Position
-            # Die Entfernung wird als range_meters gespeichert
-            db_POI_add(
-                game_id=game_id,
-                poi_type="RADARPING",
-                lat=runner_lat,
-                lon=runner_lon,
-                range_meters=int(distance),  # Entfernung als range_meters
-                team=None,  # Runner haben kein Team
-                creator_id=user_id
-            )
+        distance = distances_by_hunter[hunter_user_id]
+        hunter_distances.append(distance)
+        
+        # Erstelle POI-Eintrag für diese Entfernung
+        # Verwende die Position des Runners als POI-Position
+        # Die Entfernung wird als range_meters gespeichert
+        await db_async(db_POI_add,
+            game_id=game_id,
+            poi_type="RADARPING",
+            lat=runner_lat,
+            lon=runner_lon,
+            range_meters=int(distance),  # Entfernung als range_meters
+            team=None,  # Runner haben kein Team
+            creator_id=user_id
+        )
     
     # Sortiere nach Entfernung (nächster zuerst)
     hunter_distances.sort()
@@ -72,24 +79,21 @@ async def ShopItemRunner1(bot, chat_id, user_id, username, game_id):
     await bot.send_message(chat_id, runner_message)
     
     # Benachrichtige alle Hunter über den Ping (nur Entfernung)
-    for hunter in hunters:
-        hunter_user_id, hunter_username, hunter_team, hunter_lat, hunter_lon, hunter_timestamp = hunter
-        
-        if hunter_lat is not None and hunter_lon is not None:
-            distance = calculate_distance(runner_lat, runner_lon, hunter_lat, hunter_lon)
-            
-            hunter_message = f"📡 **Du wurdest von einem RADAR PING erfasst!**\n\n"
-            hunter_message += f"📏 **Entfernung zum Sender:** {distance:.1f}m\n\n"
-            hunter_message += "⚠️ Ein Runner kennt jetzt deine ungefähre Position!"
-            
-            try:
-                await bot.send_message(hunter_user_id, hunter_message)
-            except Exception as e:
-                logger_newLog("error", "ShopItemRunner1", f"Fehler beim Benachrichtigen von Hunter {hunter_user_id}: {str(e)}")
+    hunter_messages = {}
+    for hunter_user_id, distance in distances_by_hunter.items():
+        hunter_message = f"📡 **Du wurdest von einem RADAR PING erfasst!**\n\n"
+        hunter_message += f"📏 **Entfernung zum Sender:** {distance:.1f}m\n\n"
+        hunter_message += "⚠️ Ein Runner kennt jetzt deine ungefähre Position!"
+        hunter_messages[hunter_user_id] = hunter_message
+    
+    try:
+        await bot.broadcast(list(hunter_messages), hunter_messages)
+    except Exception as e:
+        logger_newLog("error", "ShopItemRunner1", f"Fehler beim Benachrichtigen der Hunter: {str(e)}")
     
     # Benachrichtige den Gamemaster
     from database import db_Game_getField
-    game = db_Game_getField(game_id)
+    game = await db_async(db_Game_getField, game_id)
     if game:
         gamemaster_id = game[2]
         gamemaster_message = f"📡 **RADAR PING von Runner {username} ({user_id}) gesendet!**\n\n"
@@ -114,12 +118,12 @@ async def ShopItemRunner2(bot, chat_id, user_id, username, game_id):
     logger_newLog("info", "ShopItemRunner2", f"Runner Item 2 (RADAR PING) von {username} ({user_id}) in Spiel {game_id} aktiviert")
     
     # Hole verfügbare Anzahl für Nachricht
-    available_items = db_Wallet_get_available_items(game_id, "runner", str(user_id))
+    available_items = await db_async(db_Wallet_get_available_items, game_id, "runner", str(user_id))
     current_count = available_items.get("2", 0)
     
     # Hole aktuelle Position des Runners
     from database import db_getUserPosition
-    runner_position = db_getUserPosition(user_id)
+    runner_position = await db_async(db_getUserPosition, user_id)
     
     if not runner_position or runner_position[3] is None or runner_position[4] is None:
         await bot.send_message(chat_id, f"❌ **RADAR PING konnte nicht gesendet werden!**\n\nDu musst deinen Live-Standort aktiviert haben, um einen Radar Ping zu senden.")
@@ -130,34 +134,40 @@ async def ShopItemRunner2(bot, chat_id, user_id, username, game_id):
     
     # Hole alle Hunter und berechne Entfernungen
     from database import db_getHunters, db_POI_add
-    from geofunctions import calculate_distance
-    hunters = db_getHunters(game_id)
+    from geo_batch import geo_distances_from_point
+    hunters = await db_async(db_getHunters, game_id)
     
     if not hunters:
         await bot.send_message(chat_id, f"📡 **RADAR PING gesendet!**\n\nKeine Hunter im Spiel gefunden.\n📦 **Verfügbare Pings:** {current_count}")
         return
     
-    # Berechne Entfernungen zu allen Huntern und erstelle POI-Einträge
+    # Entfernungen zu allen Huntern mit Standort in einem Durchgang berechnen
+    located_hunters = [hunter for hunter in hunters if hunter[3] is not None and hunter[4] is not None]
+    distances_by_hunter = dict(zip(
+        [hunter[0] for hunter in located_hunters],
+        geo_distances_from_point(runner_lat, runner_lon, [(hunter[3], hunter[4]) for hunter in located_hunters])
+    ))
+    
+    # Erstelle POI-Einträge für die Entfernungen
     hunter_distances = []
-    for hunter in hunters:
+    for hunter in located_hunters:
         hunter_user_id, hunter_username, hunter_team, hunter_lat, hunter_lon, hunter_timestamp = hunter
         
-        if hunter_lat is not None and hunter_lon is not None:
-            distance = calculate_distance(runner_lat, runner_lon, hunter_lat, hunter_lon)
-            hunter_distances.append(distance)
-            
-            # Erstelle POI-Eintrag für diese Entfernung
-            # Verwende die Position des Runners als POI-Position
-            # Die Entfernung wird als range_meters gespeichert
-            db_POI_add(
-                game_id=game_id,
-                poi_type="RADARPING",
-                lat=runner_lat,
-                lon=runner_lon,
-                range_meters=int(distance),  # Entfernung als range_meters
-                team=None,  # Runner haben kein Team
-                creator_id=user_id
-            )
+        distance = distances_by_hunter[hunter_user_id]
+        hunter_distances.append(distance)
+        
+        # Erstelle POI-Eintrag für diese Entfernung
+        # Verwende die Position des Runners als POI-Position
+        # Die Entfernung wird als range_meters gespeichert
+        await db_async(db_POI_add,
+            game_id=game_id,
+            poi_type="RADARPING",
+            lat=runner_lat,
+            lon=runner_lon,
+            range_meters=int(distance),  # Entfernung als range_meters
+            team=None,  # Runner haben kein Team
+            creator_id=user_id
+        )
     
     # Sortiere nach Entfernung (nächster zuerst)
     hunter_distances.sort()
@@ -179,21 +189,18 @@ async def ShopItemRunner2(bot, chat_id, user_id, username, game_id):
     await bot.send_message(chat_id, runner_message)
     
     # Benachrichtige alle Hunter über den Ping (ohne Entfernungsangabe)
-    for hunter in hunters:
-        hunter_user_id, hunter_username, hunter_team, hunter_lat, hunter_lon, hunter_timestamp = hunter
-        
-        if hunter_lat is not None and hunter_lon is not None:
-            hunter_message = f"📡 **Du wurdest von einem RADAR PING erfasst!**\n\n"
-            hunter_message += "⚠️ Ein Runner kennt jetzt deine ungefähre Position!"
-            
-            try:
-                await bot.send_message(hunter_user_id, hunter_message)
-            except Exception as e:
-                logger_newLog("error", "ShopItemRunner2", f"Fehler beim Benachrichtigen von Hunter {hunter_user_id}: {str(e)}")
+    hunter_ids = [hunter[0] for hunter in hunters if hunter[3] is not None and hunter[4] is not None]
+    hunter_message = f"📡 **Du wurdest von einem RADAR PING erfasst!**\n\n"
+    hunter_message += "⚠️ Ein Runner kennt jetzt deine ungefähre Position!"
+    
+    try:
+        await bot.broadcast(hunter_ids, hunter_message)
+    except Exception as e:
+        logger_newLog("error", "ShopItemRunner2", f"Fehler beim Benachrichtigen der Hunter: {str(e)}")
     
     # Benachrichtige den Gamemaster
     from database import db_Game_getField
-    game = db_Game_getField(game_id)
+    game = await db_async(db_Game_getField, game_id)
     if game:
         gamemaster_id = game[2]
         gamemaster_message = f"📡 **RADAR PING von Runner {username} ({user_id}) gesendet!**\n\n"
@@ -239,12 +246,12 @@ async def ShopItemHunter1(bot, chat_id, user_id, username, game_id, team):
     logger_newLog("info", "ShopItemHunter1", f"Hunter Item 1 (TRAP) von {username} ({user_id}) für Team {team} in Spiel {game_id} aktiviert")
     
     # Hole verfügbare Anzahl für Nachricht
-    available_items = db_Wallet_get_available_items(game_id, "hunter", team)
+    available_items = await db_async(db_Wallet_get_available_items, game_id, "hunter", team)
     current_count = available_items.get("1", 0)
     
     # Hole aktuelle Position des Hunters
     from database import db_getUserPosition
-    user_position = db_getUserPosition(user_id)
+    user_position = await db_async(db_getUserPosition, user_id)
     
     if not user_position or user_position[3] is None or user_position[4] is None:
         await bot.send_message(chat_id, f"❌ **TRAP konnte nicht erstellt werden!**\n\nDu musst deinen Live-Standort aktiviert haben, um eine Falle zu platzieren.")
@@ -255,7 +262,7 @@ async def ShopItemHunter1(bot, chat_id, user_id, username, game_id, team):
     
     # Erstelle POI (Falle) in der Datenbank
     from database import db_POI_add
-    if db_POI_add(game_id, "TRAP", lat, lon, team=team, creator_id=user_id):
+    if await db_async(db_POI_add, game_id, "TRAP", lat, lon, team=team, creator_id=user_id):
         await bot.send_message(chat_id, f"🎁 **TRAP erfolgreich erstellt!**\n\n📍 **Position:** {lat:.6f}, {lon:.6f}\n🎯 **Team:** {team}\n📦 **Verfügbare Fallen:** {current_count}")
         
         # Benachrichtige Teammitglieder
@@ -268,12 +275,12 @@ async def ShopItemHunter2(bot, chat_id, user_id, username, game_id, team):
     logger_newLog("info", "ShopItemHunter2", f"Hunter Item 2 (WATCHTOWER) von {username} ({user_id}) für Team {team} in Spiel {game_id} aktiviert")
     
     # Hole verfügbare Anzahl für Nachricht
-    available_items = db_Wallet_get_available_items(game_id, "hunter", team)
+    available_items = await db_async(db_Wallet_get_available_items, game_id, "hunter", team)
     current_count = available_items.get("2", 0)
     
     # Hole aktuelle Position des Hunters
     from database import db_getUserPosition
-    user_position = db_getUserPosition(user_id)
+    user_position = await db_async(db_getUserPosition, user_id)
     
     if not user_position or user_position[3] is None or user_position[4] is None:
         await bot.send_message(chat_id, f"❌ **WATCHTOWER konnte nicht erstellt werden!**\n\nDu musst deinen Live-Standort aktiviert haben, um einen Wachturm zu platzieren.")
@@ -288,7 +295,7 @@ async def ShopItemHunter2(bot, chat_id, user_id, username, game_id, team):
     
     # Erstelle POI (Wachturm) in der Datenbank
     from database import db_POI_add
-    if db_POI_add(game_id, "WATCHTOWER", lat, lon, range_meters=range_meters, team=team, creator_id=user_id):
+    if await db_async(db_POI_add, game_id, "WATCHTOWER", lat, lon, range_meters=range_meters, team=team, creator_id=user_id):
         await bot.send_message(chat_id, f"🔭 **WATCHTOWER erfolgreich erstellt!**\n\n📍 **Position:** {lat:.6f}, {lon:.6f}\n🎯 **Team:** {team}\n📏 **Reichweite:** {range_meters}m\n📦 **Verfügbare Wachtürme:** {current_count}")
         
         # Benachrichtige Teammitglieder
@@ -301,12 +308,12 @@ async def ShopItemHunter3(bot, chat_id, user_id, username, game_id, team):
     logger_newLog("info", "ShopItemHunter3", f"Hunter Item 3 (RADAR PING) von {username} ({user_id}) für Team {team} in Spiel {game_id} aktiviert")
     
     # Hole verfügbare Anzahl für Nachricht
-    available_items = db_Wallet_get_available_items(game_id, "hunter", team)
+    available_items = await db_async(db_Wallet_get_available_items, game_id, "hunter", team)
     current_count = available_items.get("3", 0)
     
     # Hole aktuelle Position des Hunters
     from database import db_getUserPosition
-    hunter_position = db_getUserPosition(user_id)
+    hunter_position = await db_async(db_getUserPosition, user_id)
     
     if not hunter_position or hunter_position[3] is None or hunter_position[4] is None:
         await bot.send_message(chat_id, f"❌ **RADAR PING konnte nicht gesendet werden!**\n\nDu musst deinen Live-Standort aktiviert haben, um einen Radar Ping zu senden.")
@@ -317,34 +324,40 @@ async def ShopItemHunter3(bot, chat_id, user_id, username, game_id, team):
     
     # Hole alle Runner und berechne Entfernungen
     from database import db_getRunners, db_POI_add
-    from geofunctions import calculate_distance
-    runners = db_getRunners(game_id)
+    from geo_batch import geo_distances_from_point
+    runners = await db_async(db_getRunners, game_id)
     
     if not runners:
         await bot.send_message(chat_id, f"📡 **RADAR PING gesendet!**\n\nKeine Runner im Spiel gefunden.\n📦 **Verfügbare Pings:** {current_count}")
         return
     
-    # Berechne Entfernungen zu allen Runnern und erstelle POI-Einträge
+    # Entfernungen zu allen Runnern mit Standort in einem Durchgang berechnen
+    located_runners = [runner for runner in runners if runner[3] is not None and runner[4] is not None]
+    distances_by_runner = dict(zip(
+        [runner[0] for runner in located_runners],
+        geo_distances_from_point(hunter_lat, hunter_lon, [(runner[3], runner[4]) for runner in located_runners])
+    ))
+    
+    # Erstelle POI-Einträge für die Entfernungen
     runner_distances = []
-    for runner in runners:
+    for runner in located_runners:
         runner_user_id, runner_username, runner_team, runner_lat, runner_lon, runner_timestamp = runner
         
-        if runner_lat is not None and runner_lon is not None:
-            distance = calculate_distance(hunter_lat, hunter_lon, runner_lat, runner_lon)
-            runner_distances.append(distance)
-            
-            # Erstelle POI-Eintrag für diese Entfernung
-            # Verwende die Position des Hunters als POI-Position
-            # Die Entfernung wird als range_meters gespeichert
-            db_POI_add(
-                game_id=game_id,
-                poi_type="RADARPING",
-                lat=hunter_lat,
-                lon=hunter_lon,
-                range_meters=int(distance),  # Entfernung als range_meters
-                team=team,
-                creator_id=user_id
-            )
+        distance = distances_by_runner[runner_user_id]
+        runner_distances.append(distance)
+        
+        # Erstelle POI-Eintrag für diese Entfernung
+        # Verwende die Position des Hunters als POI-Position
+        # Die Entfernung wird als range_meters gespeichert
+        await db_async(db_POI_add,
+            game_id=game_id,
+            poi_type="RADARPING",
+            lat=hunter_lat,
+            lon=hunter_lon,
+            range_meters=int(distance),  # Entfernung als range_meters
+            team=team,
+            creator_id=user_id
+        )
     
     # Sortiere nach Entfernung (nächster zuerst)
     runner_distances.sort()
@@ -369,24 +382,21 @@ async def ShopItemHunter3(bot, chat_id, user_id, username, game_id, team):
     await notify_team_members(bot, game_id, team, team_message, exclude_user_id=user_id)
     
     # Benachrichtige alle Runner über den Ping (nur Entfernung)
-    for runner in runners:
-        runner_user_id, runner_username, runner_team, runner_lat, runner_lon, runner_timestamp = runner
-        
-        if runner_lat is not None and runner_lon is not None:
-            distance = calculate_distance(hunter_lat, hunter_lon, runner_lat, runner_lon)
-            
-            runner_message = f"📡 **Du wurdest von einem RADAR PING erfasst!**\n\n"
-            runner_message += f"📏 **Entfernung zum Sender:** {distance:.1f}m\n\n"
-            runner_message += "⚠️ Ein Hunter-Team kennt jetzt deine ungefähre Position!"
-            
-            try:
-                await bot.send_message(runner_user_id, runner_message)
-            except Exception as e:
-                logger_newLog("error", "ShopItemHunter3", f"Fehler beim Benachrichtigen von Runner {runner_user_id}: {str(e)}")
+    runner_messages = {}
+    for runner_user_id, distance in distances_by_runner.items():
+        runner_message = f"📡 **Du wurdest von einem RADAR PING erfasst!**\n\n"
+        runner_message += f"📏 **Entfernung zum Sender:** {distance:.1f}m\n\n"
+        runner_message += "⚠️ Ein Hunter-Team kennt jetzt deine ungefähre Position!"
+        runner_messages[runner_user_id] = runner_message
+    
+    try:
+        await bot.broadcast(list(runner_messages), runner_messages)
+    except Exception as e:
+        logger_newLog("error", "ShopItemHunter3", f"Fehler beim Benachrichtigen der Runner: {str(e)}")
     
     # Benachrichtige den Gamemaster
     from database import db_Game_getField
-    game = db_Game_getField(game_id)
+    game = await db_async(db_Game_getField, game_id)
     if game:
         gamemaster_id = game[2]
         gamemaster_message = f"📡 **RADAR PING von Hunter {username} ({user_id}) für Team {team} gesendet!**\n\n"
@@ -418,46 +428,31 @@ async def ShopItemHunter4(bot, chat_id, user_id, username, game_id, team):
 
 # Hilfsfunktionen für Shop-Items
 async def notify_team_members(bot, game_id, team, message, exclude_user_id=None):
-    """Benachrichtigt alle Teammitglieder"""
+    """Benachrichtigt alle Teammitglieder gleichzeitig"""
     try:
-        team_members = db_getTeamMembers(game_id, team)
-        for member in team_members:
-            member_user_id = member[0]
-            if exclude_user_id and member_user_id == exclude_user_id:
-                continue
-            try:
-                await bot.send_message(member_user_id, message)
-            except Exception as e:
-                logger_newLog("error", "notify_team_members", f"Fehler beim Benachrichtigen von Teammitglied {member_user_id}: {str(e)}")
+        team_members = await db_async(db_getTeamMembers, game_id, team)
+        recipients = [member[0] for member in team_members if not (exclude_user_id and member[0] == exclude_user_id)]
+        return await bot.broadcast(recipients, message)
     except Exception as e:
-        logger_newLog("error", "notify_team_members", f"Fehler beim Abrufen der Teammitglieder: {str(e)}")
+        logger_newLog("error", "notify_team_members", f"Fehler beim Benachrichtigen der Teammitglieder: {str(e)}")
+        return {}
 
 async def notify_all_runners(bot, game_id, message, exclude_user_id=None):
-    """Benachrichtigt alle Runner"""
+    """Benachrichtigt alle Runner gleichzeitig"""
     try:
-        runners = db_getRunners(game_id)
-        for runner in runners:
-            runner_user_id = runner[0]
-            if exclude_user_id and runner_user_id == exclude_user_id:
-                continue
-            try:
-                await bot.send_message(runner_user_id, message)
-            except Exception as e:
-                logger_newLog("error", "notify_all_runners", f"Fehler beim Benachrichtigen von Runner {runner_user_id}: {str(e)}")
+        runners = await db_async(db_getRunners, game_id)
+        recipients = [runner[0] for runner in runners if not (exclude_user_id and runner[0] == exclude_user_id)]
+        return await bot.broadcast(recipients, message)
     except Exception as e:
-        logger_newLog("error", "notify_all_runners", f"Fehler beim Abrufen der Runner: {str(e)}")
+        logger_newLog("error", "notify_all_runners", f"Fehler beim Benachrichtigen der Runner: {str(e)}")
+        return {}
 
 async def notify_all_hunters(bot, game_id, message, exclude_user_id=None):
-    """Benachrichtigt alle Hunter"""
+    """Benachrichtigt alle Hunter gleichzeitig"""
     try:
-        hunters = db_getHunters(game_id)
-        for hunter in hunters:
-            hunter_user_id = hunter[0]
-            if exclude_user_id and hunter_user_id == exclude_user_id:
-                continue
-            try:
-                await bot.send_message(hunter_user_id, message)
-            except Exception as e:
-                logger_newLog("error", "notify_all_hunters", f"Fehler beim Benachrichtigen von Hunter {hunter_user_id}: {str(e)}")
+        hunters = await db_async(db_getHunters, game_id)
+        recipients = [hunter[0] for hunter in hunters if not (exclude_user_id and hunter[0] == exclude_user_id)]
+        return await bot.broadcast(recipients, message)
     except Exception as e:
-        logger_newLog("error", "notify_all_hunters", f"Fehler beim Abrufen der Hunter: {str(e)}") 
\ No newline at end of file
+        logger_newLog("error", "notify_all_hunters", f"Fehler beim Benachrichtigen der Hunter: {str(e)}")
+        return {}
@@ -1,32 +1,157 @@
 import asyncio
+import json
+import os
 import aiohttp
-from config import conf_getTelegramAPIkey
+from aiohttp import web
+from config import conf_getTelegramAPIkey, conf_getUpdateMode, conf_getWebhookURL, conf_getWebhookListenHost, conf_getWebhookListenPort, conf_getWebhookPath, conf_getWebhookSecret, conf_getDispatcherWorkers, conf_getDispatcherMaxPending, conf_getTelegramConnectionLimit, conf_getTelegramConnectionLimitPerHost, conf_getTelegramDnsCacheSeconds, conf_getTelegramKeepaliveSeconds, conf_getOutboundGlobalRate, conf_getOutboundChatRate, conf_getOutboundChatBurst, conf_getOutboundMaxRetries, conf_getOutboundMaxQueue, conf_getOutboundWorkers
 from logger import logger_newLog
 from telegram_commands import cmd_start, cmd_new, cmd_join, cmd_leave, cmd_fieldsetup, cmd_map, cmd_mapedit, cmd_unknown, handle_text, handle_location, cmd_role, cmd_startgame, cmd_listgames, cmd_listusers, cmd_team, cmd_shop, cmd_buy, cmd_status, cmd_endgame, cmd_keyboard
 from telegram_helpmessage import send_helpmessage
+from telegram_dispatcher import UpdateDispatcher
+from telegram_outbound import OutboundQueue, PRIORITY_NORMAL
+
+# Globale HTTP-Session (wird von allen TelegramBot-Instanzen geteilt)
+http_session = None
+
+def get_http_session():
+    """Gibt die gemeinsame aiohttp-Session zurück und erstellt sie bei Bedarf
+    
+    Die Session hält Verbindungen zur Telegram API offen (Keep-Alive) und cacht
+    DNS-Auflösungen, damit nicht jede Nachricht einen neuen TCP+TLS-Handshake braucht.
+    """
+    global http_session
+    if http_session is None or http_session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=conf_getTelegramConnectionLimit(),
+            limit_per_host=conf_getTelegramConnectionLimitPerHost(),
+            ttl_dns_cache=conf_getTelegramDnsCacheSeconds(),
+            keepalive_timeout=conf_getTelegramKeepaliveSeconds()
+        )
+        http_session = aiohttp.ClientSession(connector=connector)
+        logger_newLog("info", "get_http_session", "Neue HTTP-Session für die Telegram API erstellt")
+    return http_session
+
+async def close_http_session():
+    """Schließt die gemeinsame aiohttp-Session (beim Beenden des Bots)"""
+    global http_session
+    if http_session is not None and not http_session.closed:
+        await http_session.close()
+        logger_newLog("info", "close_http_session", "HTTP-Session geschlossen")
+    http_session = None
+
+# Globale Warteschlange für ausgehende Anfragen (Rate-Limits gelten pro Bot-Token)
+outbound_queue = None
+
+async def telegram_api_request(method, payload, files=None):
+    """Führt eine einzelne Anfrage an die Telegram API aus
+    
+    Args:
+        method: API-Methode (z.B. 'sendMessage')
+        payload: Parameter der Anfrage
+        files: Optional {Feldname: (Dateiname, Bytes, Content-Type)} für Uploads
+    
+    Returns:
+        (HTTP-Status, JSON-Antwort) - die Antwort ist None wenn sie kein JSON war
+    """
+    url = f"https://api.telegram.org/bot{conf_getTelegramAPIkey()}/{method}"
+    session = get_http_session()
+    
+    if files:
+        # FormData wird bei jedem Versuch neu gebaut, da sie nur einmal gesendet werden kann
+        data = aiohttp.FormData()
+        for key, value in payload.items():
+            data.add_field(key, json.dumps(value) if isinstance(value, (dict, list)) else str(value))
+        for field, (filename, content, content_type) in files.items():
+            data.add_field(field, content, filename=filename, content_type=content_type)
+        request = session.post(url, data=data)
+    else:
+        request = session.post(url, json=payload)
+    
+    async with request as response:
+        try:
+            result = await response.json(content_type=None)
+        except Exception:
+            result = None
+        return response.status, result
+
+def get_outbound_queue():
+    """Gibt die gemeinsame Warteschlange für ausgehende Nachrichten zurück und erstellt sie bei Bedarf"""
+    global outbound_queue
+    if outbound_queue is None:
+        outbound_queue = OutboundQueue(
+            telegram_api_request,
+            global_rate=conf_getOutboundGlobalRate(),
+            chat_rate=conf_getOutboundChatRate(),
+            chat_burst=conf_getOutboundChatBurst(),
+            max_retries=conf_getOutboundMaxRetries(),
+            max_queue=conf_getOutboundMaxQueue(),
+            workers=conf_getOutboundWorkers()
+        )
+    return outbound_queue
 
 class TelegramBot:
     def __init__(self):
         self.api_key = conf_getTelegramAPIkey()
         self.base_url = f"https://api.telegram.org/bot{self.api_key}"
         self.offset = 0
+        self.dispatcher = None
         
     async def get_updates(self):
-        """Holt Updates von der Telegram API"""
+        """Holt Updates von der Telegram API
+        
+        Returns:
+            Liste der Updates oder None wenn die Abfrage fehlgeschlagen ist
+        """
         try:
             url = f"{self.base_url}/getUpdates"
             params = {'offset': self.offset, 'timeout': 30}
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get('ok'):
-                            return data.get('result', [])
-            return []
+            session = get_http_session()
+            async with session.get(url, params=params) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    if data.get('ok'):
+                        return data.get('result', [])
+                logger_newLog("error", "get_updates", f"Fehler beim Abrufen der Updates: {response.status}")
+            return None
         except Exception as e:
             logger_newLog("error", "get_updates", f"Fehler beim Abrufen der Updates: {str(e)}")
-            return []
+            return None
+    
+    async def set_webhook(self, webhook_url, secret=""):
+        """Registriert die Webhook-URL bei Telegram"""
+        try:
+            url = f"{self.base_url}/setWebhook"
+            data = {'url': webhook_url, 'allowed_updates': ['message', 'edited_message']}
+            if secret:
+                data['secret_token'] = secret
+            
+            session = get_http_session()
+            async with session.post(url, json=data) as response:
+                result = await response.json()
+                if response.status == 200 and result.get('ok'):
+                    logger_newLog("info", "set_webhook", f"Webhook registriert: {webhook_url}")
+                    return True
+                logger_newLog("error", "set_webhook", f"Fehler beim Registrieren des Webhooks: {response.status} {result.get('description', '')}")
+                return False
+        except Exception as e:
+            logger_newLog("error", "set_webhook", f"Fehler beim Registrieren des Webhooks: {str(e)}")
+            return False
+    
+    async def delete_webhook(self):
+        """Entfernt einen registrierten Webhook (nötig damit getUpdates funktioniert)"""
+        try:
+            url = f"{self.base_url}/deleteWebhook"
+            session = get_http_session()
+            async with session.post(url) as response:
+                if response.status == 200:
+                    logger_newLog("debug", "delete_webhook", "Webhook entfernt")
+                    return True
+                logger_newLog("error", "delete_webhook", f"Fehler beim Entfernen des Webhooks: {response.status}")
+                return False
+        except Exception as e:
+            logger_newLog("error", "delete_webhook", f"Fehler beim Entfernen des Webhooks: {str(e)}")
+            return False
     
     async def handle_command(self, message):
         """Behandelt eingehende Befehle und Nachrichten"""
@@ -35,9 +160,9 @@ class TelegramBot:
         username = message['from'].get('username', '')
         first_name = message['from'].get('first_name', '')
         
-        # Prüfe ob User in der Datenbank existiert (außer bei /start)
-        from database import db_User_get
-        existing_user = db_User_get(user_id)
+        # Prüfe ob User in der Datenbank existiert (außer bei /start), bekannte User kommen aus dem Cache
+        from user_session import user_session_load
+        existing_user = await user_session_load(user_id)
         
         # Prüfe ob es ein Befehl ist (beginnt mit /)
         text = message.get('text', '')
@@ -174,81 +299,238 @@ class TelegramBot:
             from telegram_commands import handle_text
             await handle_text(self, chat_id, user_id, username, text)
     
-    async def send_message(self, chat_id, text, reply_markup=None):
-        """Sendet eine Nachricht"""
+    async def send_message(self, chat_id, text, reply_markup=None, priority=PRIORITY_NORMAL):
+        """Sendet eine Nachricht über die ausgehende Warteschlange
+        
+        Returns:
+            True wenn die Nachricht zugestellt wurde, sonst False
+        """
+        data = {'chat_id': chat_id, 'text': text}
+        if reply_markup:
+            data['reply_markup'] = reply_markup
+        
         try:
-            url = f"{self.base_url}/sendMessage"
-            data = {'chat_id': chat_id, 'text': text}
-            
-            if reply_markup:
-                data['reply_markup'] = reply_markup
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=data) as response:
-                    if response.status == 200:
-                        logger_newLog("debug", "send_message", f"Nachricht gesendet an {chat_id}")
-                    else:
-                        logger_newLog("error", "send_message", f"Fehler beim Senden: {response.status}")
+            result = await get_outbound_queue().enqueue(chat_id, 'sendMessage', data, priority=priority)
+            return result is not None
         except Exception as e:
             logger_newLog("error", "send_message", f"Fehler beim Senden der Nachricht: {str(e)}")
+            return False
     
-    async def send_photo(self, chat_id, photo_file, caption=""):
-        """Sendet ein Foto"""
+    async def send_photo(self, chat_id, photo_file, caption="", priority=PRIORITY_NORMAL):
+        """Sendet ein Foto (Dateiobjekt oder Bytes) über die ausgehende Warteschlange"""
         try:
-            url = f"{self.base_url}/sendPhoto"
-            
-            data = aiohttp.FormData()
-            data.add_field('chat_id', str(chat_id))
-            data.add_field('photo', photo_file, filename='map.png', content_type='image/png')
+            photo = photo_file.read() if hasattr(photo_file, 'read') else photo_file
+            data = {'chat_id': chat_id}
             if caption:
-                data.add_field('caption', caption)
+                data['caption'] = caption
+            files = {'photo': ('map.png', photo, 'image/png')}
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, data=data) as response:
-                    if response.status == 200:
-                        logger_newLog("debug", "send_photo", f"Foto gesendet an {chat_id}")
-                    else:
-                        logger_newLog("error", "send_photo", f"Fehler beim Senden des Fotos: {response.status}")
+            result = await get_outbound_queue().enqueue(chat_id, 'sendPhoto', data, files=files, priority=priority)
+            return result is not None
         except Exception as e:
             logger_newLog("error", "send_photo", f"Fehler beim Senden des Fotos: {str(e)}")
+            return False
     
-    async def send_document(self, chat_id, document_file, caption=""):
-        """Sendet ein Dokument (z.B. HTML-Datei)"""
+    async def send_document(self, chat_id, document_file, caption="", priority=PRIORITY_NORMAL):
+        """Sendet ein Dokument (z.B. HTML-Datei) über die ausgehende Warteschlange"""
         try:
-            url = f"{self.base_url}/sendDocument"
-            data = aiohttp.FormData()
-            data.add_field('chat_id', str(chat_id))
-            data.add_field('document', document_file, filename=getattr(document_file, 'name', 'file.html'), content_type='application/octet-stream')
+            filename = os.path.basename(getattr(document_file, 'name', 'file.html'))
+            document = document_file.read() if hasattr(document_file, 'read') else document_file
+            data = {'chat_id': chat_id}
             if caption:
-                data.add_field('caption', caption)
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, data=data) as response:
-                    if response.status == 200:
-                        logger_newLog("debug", "send_document", f"Dokument gesendet an {chat_id}")
-                    else:
-                        logger_newLog("error", "send_document", f"Fehler beim Senden des Dokuments: {response.status}")
+                data['caption'] = caption
+            files = {'document': (filename, document, 'application/octet-stream')}
+            
+            result = await get_outbound_queue().enqueue(chat_id, 'sendDocument', data, files=files, priority=priority)
+            return result is not None
         except Exception as e:
             logger_newLog("error", "send_document", f"Fehler beim Senden des Dokuments: {str(e)}")
+            return False
+
+    async def send_image(self, chat_id, image, caption="", as_document=False, file_id=None, priority=PRIORITY_NORMAL):
+        """Sendet ein PNG als Photo oder Dokument und verwendet dabei wenn möglich eine bekannte file_id
+
+        Mit file_id wird das Bild nicht erneut hochgeladen. Lehnt Telegram die file_id ab
+        (z.B. abgelaufen), werden die Bytes hochgeladen, sofern vorhanden.
+
+        Args:
+            image: PNG als Bytes oder None (nur file_id verwenden)
+            file_id: file_id einer früheren Sendung desselben Bildes
+
+        Returns:
+            (gesendet True/False, file_id des gesendeten Bildes oder None)
+        """
+        method, field = ('sendDocument', 'document') if as_document else ('sendPhoto', 'photo')
+        data = {'chat_id': chat_id}
+        if caption:
+            data['caption'] = caption
+        try:
+            if file_id:
+                result = await get_outbound_queue().enqueue(chat_id, method, dict(data, **{field: file_id}), priority=priority)
+                if result is not None:
+                    return True, self._media_file_id(result, field) or file_id
+                logger_newLog("warning", "send_image", f"file_id für {method} an {chat_id} abgelehnt, lade Bild neu hoch")
+            if image is None:
+                return False, None
+            mime = 'image/png' if field == 'photo' else 'application/octet-stream'
+            files = {field: ('map.png', image, mime)}
+            result = await get_outbound_queue().enqueue(chat_id, method, data, files=files, priority=priority)
+            if result is None:
+                return False, None
+            return True, self._media_file_id(result, field)
+        except Exception as e:
+            logger_newLog("error", "send_image", f"Fehler beim Senden des Bildes: {str(e)}")
+            return False, None
+
+    def _media_file_id(self, message, field):
+        """Liest die file_id aus der Telegram-Antwort (bei Photos die größte Auflösung)"""
+        media = message.get(field) if isinstance(message, dict) else None
+        if field == 'photo' and media:
+            media = media[-1]
+        return media.get('file_id') if media else None
+
+    async def broadcast(self, chat_ids, text, reply_markup=None, priority=PRIORITY_NORMAL):
+        """Sendet Nachrichten gleichzeitig an mehrere Chats
+
+        Die Sendungen laufen parallel über die ausgehende Warteschlange und
+        unterliegen damit denselben Rate-Limits wie einzelne Nachrichten.
+
+        Args:
+            chat_ids: Liste der Empfänger (doppelte Einträge werden nur einmal beschickt)
+            text: Gleicher Text für alle oder {chat_id: Text} für individuelle Nachrichten
+            reply_markup: Optionale Tastatur für alle Empfänger
+            priority: Priorität der Nachrichten
+
+        Returns:
+            {chat_id: True/False} - ob die Nachricht zugestellt wurde
+        """
+        recipients = [chat_id for chat_id in dict.fromkeys(chat_ids) if chat_id is not None]
+        if isinstance(text, dict):
+            recipients = [chat_id for chat_id in recipients if chat_id in text]
+        if not recipients:
+            return {}
+
+        results = await asyncio.gather(
+            *[self.send_message(chat_id, text[chat_id] if isinstance(text, dict) else text, reply_markup=reply_markup, priority=priority) for chat_id in recipients],
+            return_exceptions=True
+        )
+
+        delivered = {chat_id: result is True for chat_id, result in zip(recipients, results)}
+        failed = [chat_id for chat_id, ok in delivered.items() if not ok]
+        if failed:
+            logger_newLog("warning", "broadcast", f"{len(failed)} von {len(recipients)} Nachrichten nicht zugestellt: {failed}")
+        else:
+            logger_newLog("debug", "broadcast", f"Nachricht an {len(recipients)} Empfänger gesendet")
+        return delivered
+
+    def get_outbound_metrics(self):
+        """Gibt Länge und Zähler der ausgehenden Warteschlange zurück"""
+        return get_outbound_queue().get_metrics()
+    
+    async def dispatch_update(self, update):
+        """Reiht ein Update im Dispatcher ein (Reihenfolge pro Chat bleibt erhalten)"""
+        if 'message' in update:
+            message = update['message']
+        elif 'edited_message' in update:
+            # Verarbeite Live-Location-Updates
+            message = update['edited_message']
+        else:
+            return
+        
+        chat_id = message.get('chat', {}).get('id')
+        await self.dispatcher.dispatch(chat_id, message)
+    
+    async def handle_webhook(self, request):
+        """Nimmt ein Update per HTTP-POST von Telegram entgegen und reiht es im Dispatcher ein"""
+        secret = conf_getWebhookSecret()
+        if secret and request.headers.get('X-Telegram-Bot-Api-Secret-Token') != secret:
+            logger_newLog("warning", "handle_webhook", f"Webhook-Aufruf mit ungültigem Secret von {request.remote}")
+            return web.Response(status=403)
+        
+        try:
+            update = await request.json()
+        except Exception:
+            logger_newLog("warning", "handle_webhook", "Webhook-Aufruf mit ungültigem JSON")
+            return web.Response(status=400)
+        
+        if not isinstance(update, dict):
+            return web.Response(status=400)
+        
+        # Sofort einreihen und bestätigen - die Verarbeitung läuft im Dispatcher
+        await self.dispatch_update(update)
+        return web.Response(status=200)
+    
+    def create_webhook_app(self):
+        """Erstellt die aiohttp-Anwendung mit dem Webhook-Endpunkt"""
+        app = web.Application()
+        app.router.add_post(conf_getWebhookPath(), self.handle_webhook)
+        return app
+    
+    def start_dispatcher(self):
+        """Erstellt und startet den Dispatcher für eingehende Updates"""
+        if self.dispatcher is None:
+            self.dispatcher = UpdateDispatcher(self.handle_command, max_workers=conf_getDispatcherWorkers(), max_pending=conf_getDispatcherMaxPending())
+            self.dispatcher.start()
     
     async def run(self):
         """Hauptschleife des Bots"""
         logger_newLog("info", "telegram_bot", "Telegram Bot gestartet")
         
+        self.start_dispatcher()
+        
+        if conf_getUpdateMode() == 'webhook':
+            await self.run_webhook()
+        else:
+            await self.run_polling()
+    
+    async def run_webhook(self):
+        """Empfängt Updates über einen Webhook-Server statt über getUpdates"""
+        webhook_url = conf_getWebhookURL()
+        if not webhook_url:
+            logger_newLog("error", "run_webhook", "WEBHOOK_URL ist nicht gesetzt, verwende Polling")
+            await self.run_polling()
+            return
+        
+        runner = web.AppRunner(self.create_webhook_app())
+        await runner.setup()
+        site = web.TCPSite(runner, conf_getWebhookListenHost(), conf_getWebhookListenPort())
+        await site.start()
+        logger_newLog("info", "run_webhook", f"Webhook-Server lauscht auf {conf_getWebhookListenHost()}:{conf_getWebhookListenPort()}{conf_getWebhookPath()}")
+        
+        try:
+            # Registrierung wiederholen bis Telegram sie bestätigt
+            while not await self.set_webhook(webhook_url, conf_getWebhookSecret()):
+                await asyncio.sleep(5)
+            
+            while True:
+                await asyncio.sleep(60)
+                logger_newLog("debug", "run_webhook", f"Dispatcher-Status: {self.dispatcher.get_metrics()}")
+                logger_newLog("debug", "run_webhook", f"Ausgehende Warteschlange: {self.get_outbound_metrics()}")
+        finally:
+            await runner.cleanup()
+    
+    async def run_polling(self):
+        """Empfängt Updates per getUpdates Long-Polling"""
+        # Ein noch registrierter Webhook würde getUpdates blockieren
+        await self.delete_webhook()
+        
         while True:
             try:
+                # Long-Polling: getUpdates kehrt sofort zurück sobald Updates vorliegen,
+                # daher keine zusätzliche Pause zwischen den Abfragen
                 updates = await self.get_updates()
+                if updates is None:
+                    await asyncio.sleep(1)  # Kurze Pause nach fehlgeschlagener Abfrage
+                    continue
                 
                 for update in updates:
                     self.offset = update.get('update_id', 0) + 1
-                    
-                    if 'message' in update:
-                        await self.handle_command(update['message'])
-                    elif 'edited_message' in update:
-                        # Verarbeite Live-Location-Updates
-                        await self.handle_command(update['edited_message'])
+                    await self.dispatch_update(update)
                 
-                await asyncio.sleep(1)  # Kurze Pause zwischen Polls
+                if updates:
+                    logger_newLog("debug", "telegram_bot", f"Dispatcher-Status: {self.dispatcher.get_metrics()}")
+                    logger_newLog("debug", "telegram_bot", f"Ausgehende Warteschlange: {self.get_outbound_metrics()}")
                 
             except Exception as e:
                 logger_newLog("error", "telegram_bot", f"Fehler in Bot-Schleife: {str(e)}")
-                await asyncio.sleep(5)  # Längere Pause bei Fehler 
\ No newline at end of file
+                await asyncio.sleep(5)  # Längere Pause bei Fehler
\ No newline at end of file
@@ -3,6 +3,13 @@ from database import db_User_new, db_User_get, db_User_update_lastseen, db_User_
 from Map import Map_SendMap
 import os
 from telegram_helpmessage import send_helpmessage
+from telegram_outbound import PRIORITY_CRITICAL, PRIORITY_LOW
+from database_async import db_async
+import asyncio
+import weakref
+
+# Kauf-Locks je Wallet (game_id, type, name); Einträge verschwinden, sobald kein Kauf mehr läuft
+_buy_locks = weakref.WeakValueDictionary()
 
 async def send_Helpmessage(bot, chat_id):
     """Sendet eine Hilfemeldung"""
@@ -35,13 +42,30 @@ async def handle_location(bot, chat_id, user_id, username, lat, lon):
     logger_newLog("info", "handle_location", f"Live-Location von {username} ({user_id}): {lat}, {lon}")
     
     # Speichere Standort in Datenbank
-    if db_User_update_location(user_id, lat, lon):
+    if await db_async(db_User_update_location, user_id, lat, lon):
         logger_newLog("info", "handle_location", f"Standort gespeichert für User {username}")
     else:
         await bot.send_message(chat_id, "❌ Fehler beim Speichern des Standorts")
         logger_newLog("error", "handle_location", f"Fehler beim Speichern des Standorts für User {username}")
         return
     
+    # Standortverlauf: neuen Punkt nur bei laufendem Spiel und echter Bewegung speichern
+    user = None
+    try:
+        from database import db_Locations_add
+        from geofunctions import location_history_should_record, location_history_remember
+        from game_config import game_config_load
+        from user_session import user_session_load
+        user = await user_session_load(user_id)
+        game_id = user[8] if user else None
+        if game_id is not None and location_history_should_record(user_id, game_id, lat, lon):
+            game_config = await game_config_load(game_id)
+            if game_config and game_config.status in ['headstart', 'running']:
+                if await db_async(db_Locations_add, user_id, game_id, lat, lon):
+                    location_history_remember(user_id, game_id, lat, lon)
+    except Exception as e:
+        logger_newLog("error", "handle_location", f"Fehler beim Speichern des Standortverlaufs für User {username}: {str(e)}")
+    
     # Prüfe Position auf POI-Interaktionen
     try:
         from geofunctions import Check_location
@@ -54,17 +78,51 @@ async def handle_location(bot, chat_id, user_id, username, lat, lon):
             
     except Exception as e:
         logger_newLog("error", "handle_location", f"Fehler bei POI-Prüfung für User {username}: {str(e)}")
+    
+    # Fangerkennung, Spielfeldgrenze und Ziellinie betreffen nur Runner und Hunter in einem aktiven Spiel
+    game_status = None
+    if user and user[8] is not None and user[6] in ['runner', 'hunter']:
+        try:
+            from game_config import game_config_load
+            game_config = await game_config_load(user[8])
+            game_status = game_config.status if game_config else None
+        except Exception as e:
+            logger_newLog("error", "handle_location", f"Fehler beim Holen des Spielstatus für User {username}: {str(e)}")
+    
+    # Prüfe ob ein Hunter einem Runner nahe genug für einen Fang ist (nur im laufenden Spiel)
+    if game_status == 'running':
+        try:
+            from capture_detection import capture_check_location
+            await capture_check_location(bot, user[8], user_id, user[6], username, lat, lon)
+        except Exception as e:
+            logger_newLog("error", "handle_location", f"Fehler bei der Fangerkennung für User {username}: {str(e)}")
+    
+    # Prüfe ob ein Spieler das Spielfeld verlassen oder wieder betreten hat
+    if game_status in ['headstart', 'running']:
+        try:
+            from geofence import geofence_check_location
+            await geofence_check_location(bot, user[8], user_id, user[6], username, lat, lon)
+        except Exception as e:
+            logger_newLog("error", "handle_location", f"Fehler bei der Spielfeldprüfung für User {username}: {str(e)}")
+    
+    # Prüfe ob ein Runner die Ziellinie überquert hat
+    if game_status in ['headstart', 'running'] and user[6] == 'runner':
+        try:
+            from finish_line import finish_line_check_location
+            await finish_line_check_location(bot, user[8], user_id, username, lat, lon)
+        except Exception as e:
+            logger_newLog("error", "handle_location", f"Fehler bei der Zielprüfung für User {username}: {str(e)}")
 
 async def cmd_start(bot, chat_id, user_id, username):
     """Behandelt /start Befehl"""
     logger_newLog("info", "cmd_start", f"Start Befehl von {username} ({user_id})")
     
     # Prüfe ob User bereits existiert
-    existing_user = db_User_get(user_id)
+    existing_user = await db_async(db_User_get, user_id)
     
     if existing_user:
         # User existiert bereits - aktualisiere last_seen
-        if db_User_update_lastseen(user_id):
+        if await db_async(db_User_update_lastseen, user_id):
             await bot.send_message(chat_id, f"Willkommen zurück {username or f'User_{user_id}'}!")
         else:
             await bot.send_message(chat_id, "Fehler beim Aktualisieren. Bitte versuche es später erneut.")
@@ -77,7 +135,7 @@ async def cmd_start(bot, chat_id, user_id, username):
         
         # Neuer User mit Username - füge zur Datenbank hinzu
         first_name = username  # Verwende Username als first_name
-        if db_User_new(user_id, username, first_name):
+        if await db_async(db_User_new, user_id, username, first_name):
             await bot.send_message(chat_id, f"Willkommen {first_name}! Du bist jetzt registriert.")
             # Zeige Hilfe nach erfolgreicher Registrierung
             await send_helpmessage(bot, user_id, chat_id)
@@ -94,17 +152,17 @@ async def cmd_new(bot, chat_id, user_id, username, command_text):
         return
     
     # Prüfe ob User bereits in einem Spiel ist
-    existing_user = db_User_get(user_id)
+    existing_user = await db_async(db_User_get, user_id)
     if existing_user and existing_user[8] is not None:  # game_id ist in Spalte 8
         await bot.send_message(chat_id, "❌ Du musst das Spiel erst verlassen, bevor du ein neues Spiel erstellen kannst.")
         return
     
     # Erstelle neues Spiel
-    game_id = db_Game_new(command_text.strip(), user_id)
+    game_id = await db_async(db_Game_new, command_text.strip(), user_id)
     
     if game_id:
         # Setze User-Game-ID, Rolle auf Gamemaster und Team auf None
-        if db_User_setGameID(user_id, game_id) and db_User_setRole(user_id, "gamemaster") and db_User_setTeam(user_id, None):
+        if await db_async(db_User_setGameID, user_id, game_id) and await db_async(db_User_setRole, user_id, "gamemaster") and await db_async(db_User_setTeam, user_id, None):
             await bot.send_message(chat_id, f"✅ Spiel '{command_text.strip()}' erfolgreich erstellt! (Game ID: {game_id})\n🎮 Du bist jetzt Gamemaster!")
             # Sende Standard-Tastatur
             await send_helpmessage(bot, user_id, chat_id)
@@ -128,14 +186,14 @@ async def cmd_join(bot, chat_id, user_id, username, command_text):
         return
     
     # Prüfe ob User existiert
-    existing_user = db_User_get(user_id)
+    existing_user = await db_async(db_User_get, user_id)
     if not existing_user:
         # Nur wenn User wirklich nicht existiert, erstelle ihn
         first_name = username or f"User_{user_id}"
-        if not db_User_new(user_id, username, first_name):
+        if not await db_async(db_User_new, user_id, username, first_name):
             await bot.send_message(chat_id, "❌ Fehler bei der User-Erstellung")
             return
-        existing_user = db_User_get(user_id)
+        existing_user = await db_async(db_User_get, user_id)
     
     # Prüfe ob User bereits in einem anderen Spiel ist
     if existing_user and existing_user[8] is not None and existing_user[8] != game_id:  # game_id ist in Spalte 8
@@ -144,10 +202,10 @@ async def cmd_join(bot, chat_id, user_id, username, command_text):
     
     # Prüfe ob User bereits als Gamemaster in diesem Spiel eingetragen ist
     # Dazu müssen wir prüfen, ob er in der games Tabelle als gamemaster_id eingetragen ist
-    is_gamemaster = db_Game_isGamemaster(user_id, game_id)
+    is_gamemaster = await db_async(db_Game_isGamemaster, user_id, game_id)
     
     # Setze User zum Spiel hinzu
-    if db_User_setGameID(user_id, game_id):
+    if await db_async(db_User_setGameID, user_id, game_id):
         # Setze Rolle basierend auf Gamemaster-Status
         if is_gamemaster:
             role_to_set = "gamemaster"
@@ -156,15 +214,15 @@ async def cmd_join(bot, chat_id, user_id, username, command_text):
             role_to_set = "none"
             role_message = "Keine"
         
-        if db_User_setRole(user_id, role_to_set):
+        if await db_async(db_User_setRole, user_id, role_to_set):
             # Leere das Team
-            if db_User_setTeam(user_id, None):
+            if await db_async(db_User_setTeam, user_id, None):
                 await bot.send_message(chat_id, f"✅ Du bist erfolgreich Spiel {game_id} beigetreten!\n🎮 Rolle: {role_message}\n🎨 Team: Noch nicht zugewiesen")
                 
                 # Benachrichtige den Gamemaster (außer wenn der User selbst Gamemaster ist)
                 if not is_gamemaster:
                     from database import db_Game_getField
-                    game = db_Game_getField(game_id)
+                    game = await db_async(db_Game_getField, game_id)
                     if game:
                         gamemaster_id = game[2]
                         player_name = username or f"User_{user_id}"
@@ -187,7 +245,7 @@ async def cmd_leave(bot, chat_id, user_id, username, command_text):
     logger_newLog("info", "cmd_leave", f"Leave Befehl von {username} ({user_id})")
     
     # Prüfe ob User existiert und in einem Spiel ist
-    existing_user = db_User_get(user_id)
+    existing_user = await db_async(db_User_get, user_id)
     if not existing_user:
         await bot.send_message(chat_id, "❌ Du bist in keinem Spiel registriert.")
         return
@@ -200,13 +258,13 @@ async def cmd_leave(bot, chat_id, user_id, username, command_text):
     
     # Hole Gamemaster-ID vor dem Zurücksetzen der Werte
     from database import db_Game_getField
-    game = db_Game_getField(game_id)
+    game = await db_async(db_Game_getField, game_id)
     gamemaster_id = None
     if game:
         gamemaster_id = game[2]
     
     # Setze alle Werte zurück
-    if db_User_setGameID(user_id, None) and db_User_setRole(user_id, "none") and db_User_setTeam(user_id, None):
+    if await db_async(db_User_setGameID, user_id, None) and await db_async(db_User_setRole, user_id, "none") and await db_async(db_User_setTeam, user_id, None):
         await bot.send_message(chat_id, f"✅ Du hast Spiel {game_id} erfolgreich verlassen.\n🎮 Rolle und Team wurden zurückgesetzt.")
         
         # Benachrichtige den Gamemaster (außer wenn der User selbst Gamemaster ist)
@@ -279,7 +337,7 @@ async def handle_text(bot, chat_id, user_id, username, text):
         return
     
     # Normale Textnachrichten-Behandlung (Chat-System)
-    user = db_User_get(user_id)
+    user = await db_async(db_User_get, user_id)
     if not user:
         await bot.send_message(chat_id, "Du bist nicht in einem Spiel. Textnachrichten werden ignoriert.")
         return
@@ -288,33 +346,29 @@ async def handle_text(bot, chat_id, user_id, username, text):
     if not game_id:
         await bot.send_message(chat_id, "Du bist nicht in einem Spiel. Textnachrichten werden ignoriert.")
         return
-    game = db_Game_getField(game_id)
+    game = await db_async(db_Game_getField, game_id)
     if not game:
         await bot.send_message(chat_id, "Fehler: Spiel nicht gefunden.")
         return
     gamemaster_id = game[2]
     # Gamemaster: Nachricht an alle Spieler
     if role == 'gamemaster':
-        runners = db_getRunners(game_id)
-        hunters = db_getHunters(game_id)
-        for runner in runners:
-            await bot.send_message(runner[0], f"[Gamemaster]: {text}")
-        for hunter in hunters:
-            await bot.send_message(hunter[0], f"[Gamemaster]: {text}")
+        runners = await db_async(db_getRunners, game_id)
+        hunters = await db_async(db_getHunters, game_id)
+        await bot.broadcast([player[0] for player in runners + hunters], f"[Gamemaster]: {text}", priority=PRIORITY_LOW)
         await bot.send_message(chat_id, "Nachricht an alle Spieler gesendet.")
         return
     # Runner: Nachricht an Gamemaster
     if role == 'runner':
-        await bot.send_message(gamemaster_id, f"[Runner {username}]: {text}")
+        await bot.send_message(gamemaster_id, f"[Runner {username}]: {text}", priority=PRIORITY_LOW)
         await bot.send_message(chat_id, "Nachricht an den Gamemaster gesendet.")
         return
     # Hunter: Nachricht an Team und Gamemaster
     if role == 'hunter':
         team = user[7]
-        team_members = db_getTeamMembers(game_id, team)
-        for member in team_members:
-            await bot.send_message(member[0], f"[Team {team} | Hunter {username}]: {text}")
-        await bot.send_message(gamemaster_id, f"[Team {team} | Hunter {username}]: {text}")
+        team_members = await db_async(db_getTeamMembers, game_id, team)
+        recipients = [member[0] for member in team_members] + [gamemaster_id]
+        await bot.broadcast(recipients, f"[Team {team} | Hunter {username}]: {text}", priority=PRIORITY_LOW)
         await bot.send_message(chat_id, "Nachricht an dein Team und den Gamemaster gesendet.")
         return
     # Sonst: Standardantwort
@@ -329,7 +383,7 @@ async def cmd_fieldsetup(bot, chat_id, user_id, username, command_text):
         return
     
     # Prüfe ob User existiert und in einem Spiel ist
-    existing_user = db_User_get(user_id)
+    existing_user = await db_async(db_User_get, user_id)
     if not existing_user:
         await bot.send_message(chat_id, "❌ Du bist in keinem Spiel registriert.")
         return
@@ -402,9 +456,25 @@ async def cmd_fieldsetup(bot, chat_id, user_id, username, command_text):
         # Speichere alle Daten in der Datenbank
         from database import db_Game_setField, db_Game_setDuration, db_Game_setRunnerHeadstart
         
-        if (db_Game_setField(game_id, field_lat_lon, finish_lat_lon) and 
-            db_Game_setDuration(game_id, duration_minutes) and 
-            db_Game_setRunnerHeadstart(game_id, runner_headstart_minutes)):
+        if (await db_async(db_Game_setField, game_id, field_lat_lon, finish_lat_lon) and 
+            await db_async(db_Game_setDuration, game_id, duration_minutes) and 
+            await db_async(db_Game_setRunnerHeadstart, game_id, runner_headstart_minutes)):
+            
+            # Geänderte Zeiten eines laufenden Spiels im Scheduler übernehmen
+            from game import game_reschedule
+            await game_reschedule(game_id)
+            
+            # Neue Ziellinie beim nächsten Standort-Update neu laden
+            from finish_line import finish_line_invalidate
+            finish_line_invalidate(game_id)
+            
+            # Feldgeometrie für die Prüfung der Spielfeldgrenze neu berechnen
+            from geofence import geofence_set_field
+            geofence_set_field(game_id, field_lat_lon)
+            
+            # Kartenkacheln laden und Grundkarte für /map schon jetzt im Hintergrund rendern
+            from tile_fetcher import tile_prefetch_later
+            tile_prefetch_later(bot, game_id)
             
             await bot.send_message(chat_id, f"✅ Spielfeld für Spiel {game_id} erfolgreich eingerichtet!\n🎯 4 Spielfeld-Ecken und 2 Ziellinien-Punkte gespeichert.\n⏱️ Spieldauer: {duration_minutes} Minuten\n🏃 Runner-Vorsprung: {runner_headstart_minutes} Minuten")
         else:
@@ -421,7 +491,7 @@ async def cmd_map(bot, chat_id, user_id, username, command_text):
     logger_newLog("info", "cmd_map", f"Map Befehl von {username} ({user_id})")
     
     # Prüfe ob User existiert und in einem Spiel ist
-    existing_user = db_User_get(user_id)
+    existing_user = await db_async(db_User_get, user_id)
     if not existing_user:
         await bot.send_message(chat_id, "❌ Du bist in keinem Spiel registriert.")
         return
@@ -440,7 +510,7 @@ async def cmd_mapedit(bot, chat_id, user_id, username, command_text):
     logger_newLog("info", "cmd_mapedit", f"Mapedit Befehl von {username} ({user_id})")
     
     # Prüfe ob User existiert und in einem Spiel ist
-    existing_user = db_User_get(user_id)
+    existing_user = await db_async(db_User_get, user_id)
     if not existing_user:
         await bot.send_message(chat_id, "❌ Du bist in keinem Spiel registriert.")
         return
@@ -477,7 +547,7 @@ async def cmd_mapedit(bot, chat_id, user_id, username, command_text):
 
 async def cmd_listusers(bot, chat_id, user_id, username, command_text):
     from database import db_User_get, db_getUsers
-    user = db_User_get(user_id)
+    user = await db_async(db_User_get, user_id)
     if not user:
         await bot.send_message(chat_id, "Du bist in keinem Spiel.")
         return
@@ -488,7 +558,7 @@ async def cmd_listusers(bot, chat_id, user_id, username, command_text):
     if user[6] != 'gamemaster':
         await bot.send_message(chat_id, "Nur der Gamemaster darf diesen Befehl ausführen.")
         return
-    users = db_getUsers()
+    users = await db_async(db_getUsers)
     spieler = [u for u in users if u[8] == game_id]  # u[8] = game_id
     if not spieler:
         await bot.send_message(chat_id, "Keine Spieler im Spiel gefunden.")
@@ -519,7 +589,7 @@ async def cmd_role(bot, chat_id, user_id, username, command_text):
         return
     
     # Prüfe ob User existiert und in einem Spiel ist
-    existing_user = db_User_get(user_id)
+    existing_user = await db_async(db_User_get, user_id)
     if not existing_user:
         await bot.send_message(chat_id, "❌ Du bist in keinem Spiel registriert.")
         return
@@ -551,7 +621,7 @@ async def cmd_role(bot, chat_id, user_id, username, command_text):
     
     # Finde den Zielspieler
     from database import db_getUsers
-    users = db_getUsers()
+    users = await db_async(db_getUsers)
     target_user = None
     
     for user in users:
@@ -574,10 +644,10 @@ async def cmd_role(bot, chat_id, user_id, username, command_text):
         return
     
     # Weise Rolle zu
-    if db_User_setRole(target_user_id, role.lower()):
+    if await db_async(db_User_setRole, target_user_id, role.lower()):
         # Wenn Rolle auf hunter gesetzt wird, setze automatisch ein Standard-Team
         if role.lower() == "hunter":
-            db_User_setTeam(target_user_id, "red")  # Standard-Team für neue Hunter
+            await db_async(db_User_setTeam, target_user_id, "red")  # Standard-Team für neue Hunter
             await bot.send_message(chat_id, f"✅ Rolle '{role}' erfolgreich an '{target_name}' zugewiesen. Standard-Team 'red' gesetzt.")
             # Benachrichtige den Spieler
             try:
@@ -586,7 +656,7 @@ async def cmd_role(bot, chat_id, user_id, username, command_text):
                 logger_newLog("error", "cmd_role", f"Fehler beim Benachrichtigen von {target_name}: {str(e)}")
         else:
             # Für andere Rollen Team zurücksetzen
-            db_User_setTeam(target_user_id, None)
+            await db_async(db_User_setTeam, target_user_id, None)
             await bot.send_message(chat_id, f"✅ Rolle '{role}' erfolgreich an '{target_name}' zugewiesen.")
             # Benachrichtige den Spieler
             try:
@@ -608,7 +678,7 @@ async def cmd_team(bot, chat_id, user_id, username, command_text):
         return
     
     # Prüfe ob User existiert und in einem Spiel ist
-    existing_user = db_User_get(user_id)
+    existing_user = await db_async(db_User_get, user_id)
     if not existing_user:
         await bot.send_message(chat_id, "❌ Du bist in keinem Spiel registriert.")
         return
@@ -640,7 +710,7 @@ async def cmd_team(bot, chat_id, user_id, username, command_text):
     
     # Finde den Zielspieler
     from database import db_getUsers
-    users = db_getUsers()
+    users = await db_async(db_getUsers)
     target_user = None
     
     for user in users:
@@ -663,7 +733,7 @@ async def cmd_team(bot, chat_id, user_id, username, command_text):
         return
     
     # Weise Team zu
-    if db_User_setTeam(target_user_id, team_color.lower()):
+    if await db_async(db_User_setTeam, target_user_id, team_color.lower()):
         await bot.send_message(chat_id, f"✅ Team '{team_color}' erfolgreich an Hunter '{target_name}' zugewiesen.")
         # Benachrichtige den Spieler
         try:
@@ -680,7 +750,7 @@ async def cmd_shop(bot, chat_id, user_id, username, command_text):
     logger_newLog("info", "cmd_shop", f"Shop Befehl von {username} ({user_id})")
     
     # Prüfe ob User existiert und in einem Spiel ist
-    existing_user = db_User_get(user_id)
+    existing_user = await db_async(db_User_get, user_id)
     if not existing_user:
         await bot.send_message(chat_id, "❌ Du bist in keinem Spiel registriert.")
         return
@@ -693,9 +763,10 @@ async def cmd_shop(bot, chat_id, user_id, username, command_text):
     role = existing_user[6]
     team = existing_user[7]
     
-    # Prüfe ob Spiel läuft
-    from database import db_Game_getStatus
-    game_status = db_Game_getStatus(game_id)
+    # Prüfe ob Spiel läuft (Spielkonfiguration mit einer Abfrage bzw. aus dem Cache)
+    from game_config import game_config_load
+    game_config = await game_config_load(game_id)
+    game_status = game_config.status if game_config else None
     if game_status not in ['headstart', 'running']:
         await bot.send_message(chat_id, "❌ Der Shop ist nur während des Spiels verfügbar.")
         return
@@ -709,11 +780,11 @@ async def cmd_shop(bot, chat_id, user_id, username, command_text):
     # Hole Wallet
     from database import db_Wallet_get
     if role == 'runner':
-        wallet = db_Wallet_get(game_id, "runner", str(user_id))
+        wallet = await db_async(db_Wallet_get, game_id, "runner", str(user_id))
         wallet_type = "runner"
         wallet_name = str(user_id)
     elif role == 'hunter' and team:
-        wallet = db_Wallet_get(game_id, "hunter", team)
+        wallet = await db_async(db_Wallet_get, game_id, "hunter", team)
         wallet_type = "hunter"
         wallet_name = team
     else:
@@ -728,9 +799,8 @@ async def cmd_shop(bot, chat_id, user_id, username, command_text):
     last_purchase = wallet[5]  # last_purchase ist in Spalte 5
     
     # Prüfe Cooldown
-    from database import db_Game_getShopCooldown
     from datetime import datetime, timedelta
-    cooldown_minutes = db_Game_getShopCooldown(game_id)
+    cooldown_minutes = game_config.shop_cooldown
     
     cooldown_active = False
     if last_purchase:
@@ -753,30 +823,12 @@ async def cmd_shop(bot, chat_id, user_id, username, command_text):
         shop_message += "✅ Bereit zum Kaufen\n\n"
     
     # Hole Shop-Items basierend auf Rolle
-    if role == 'runner':
-        from database import (db_Game_getRunnerShop1price, db_Game_getRunnerShop1amount,
-                             db_Game_getRunnerShop2price, db_Game_getRunnerShop2amount,
-                             db_Game_getRunnerShop3price, db_Game_getRunnerShop3amount,
-                             db_Game_getRunnerShop4price, db_Game_getRunnerShop4amount)
-        
-        items = [
-            (1, "Runner Item 1", db_Game_getRunnerShop1price(game_id), db_Game_getRunnerShop1amount(game_id)),
-            (2, "Runner Item 2", db_Game_getRunnerShop2price(game_id), db_Game_getRunnerShop2amount(game_id)),
-            (3, "Runner Item 3", db_Game_getRunnerShop3price(game_id), db_Game_getRunnerShop3amount(game_id)),
-            (4, "Runner Item 4", db_Game_getRunnerShop4price(game_id), db_Game_getRunnerShop4amount(game_id))
-        ]
-    else:  # hunter
-        from database import (db_Game_getHunterShop1price, db_Game_getHunterShop1amount,
-                             db_Game_getHunterShop2price, db_Game_getHunterShop2amount,
-                             db_Game_getHunterShop3price, db_Game_getHunterShop3amount,
-                             db_Game_getHunterShop4price, db_Game_getHunterShop4amount)
-        
-        items = [
-            (1, "Hunter Item 1", db_Game_getHunterShop1price(game_id), db_Game_getHunterShop1amount(game_id)),
-            (2, "Hunter Item 2", db_Game_getHunterShop2price(game_id), db_Game_getHunterShop2amount(game_id)),
-            (3, "Hunter Item 3", db_Game_getHunterShop3price(game_id), db_Game_getHunterShop3amount(game_id)),
-            (4, "Hunter Item 4", db_Game_getHunterShop4price(game_id), db_Game_getHunterShop4amount(game_id))
-        ]
+    shop_role = 'runner' if role == 'runner' else 'hunter'
+    item_label = "Runner Item" if shop_role == 'runner' else "Hunter Item"
+    items = [
+        (item_id, f"{item_label} {item_id}", price, amount)
+        for item_id, price, amount in zip(range(1, 5), game_config.shop_prices(shop_role), game_config.shop_amounts(shop_role))
+    ]
     
     shop_message += "Verfügbare Items:\n"
     for item_id, item_name, price, max_amount in items:
@@ -787,7 +839,7 @@ async def cmd_shop(bot, chat_id, user_id, username, command_text):
         
         # Hole verfügbare Anzahl
         from database import db_Wallet_get_available_items
-        available_items = db_Wallet_get_available_items(game_id, wallet_type, wallet_name)
+        available_items = await db_async(db_Wallet_get_available_items, game_id, wallet_type, wallet_name)
         available_count = available_items.get(str(item_id), 0)
         
         shop_message += f"{status} {item_name} - {price} Coins (Verfügbar: {available_count})\n"
@@ -796,7 +848,7 @@ async def cmd_shop(bot, chat_id, user_id, username, command_text):
     for item_id, item_name, price, max_amount in items:
         # Prüfe ob Item noch gekauft werden kann
         from database import db_Wallet_can_buy_item
-        can_buy = db_Wallet_can_buy_item(game_id, wallet_type, wallet_name, item_id)
+        can_buy = await db_async(db_Wallet_can_buy_item, game_id, wallet_type, wallet_name, item_id)
         
         if budget >= price and not cooldown_active and can_buy:
             shop_message += f"• `/buy {item_id}` - {item_name}\n"
@@ -819,22 +871,20 @@ async def show_gamemaster_shop_overview(bot, chat_id, game_id):
     """Zeigt Gamemaster eine Übersicht aller Wallets und Items"""
     logger_newLog("info", "show_gamemaster_shop_overview", f"Shop-Übersicht für Gamemaster in Spiel {game_id}")
     
-    from database import (db_Wallet_get_all_for_game, db_getRunners, db_getHunters, 
-                         db_Game_getRunnerShop1amount, db_Game_getRunnerShop2amount, 
-                         db_Game_getRunnerShop3amount, db_Game_getRunnerShop4amount,
-                         db_Game_getHunterShop1amount, db_Game_getHunterShop2amount,
-                         db_Game_getHunterShop3amount, db_Game_getHunterShop4amount)
+    from database import db_Wallet_get_all_for_game, db_getRunners, db_getHunters
     
     # Hole alle Wallets für das Spiel
-    wallets = db_Wallet_get_all_for_game(game_id)
+    wallets = await db_async(db_Wallet_get_all_for_game, game_id)
     
     if not wallets:
         await bot.send_message(chat_id, "🛒 Shop-Übersicht\n\n❌ Keine Wallets gefunden. Das Spiel muss erst gestartet werden.")
         return
     
     # Hole Shop-Cooldown für das Spiel
-    from database import db_Game_getShopCooldown
-    cooldown_minutes = db_Game_getShopCooldown(game_id)
+    from game_config import game_config_load
+    from config import conf_getShopCooldown
+    game_config = await game_config_load(game_id)
+    cooldown_minutes = game_config.shop_cooldown if game_config else conf_getShopCooldown()
     
     # Erstelle Übersicht
     overview_message = f"🛒 Shop-Übersicht - Spiel {game_id}\n\n"
@@ -853,7 +903,7 @@ async def show_gamemaster_shop_overview(bot, chat_id, game_id):
             
             # Hole User-Name aus der Datenbank
             from database import db_User_get
-            user = db_User_get(int(runner_user_id))
+            user = await db_async(db_User_get, int(runner_user_id))
             if user:
                 runner_name = user[1] or user[2] or f"User_{runner_user_id}"  # username or first_name
             else:
@@ -861,7 +911,7 @@ async def show_gamemaster_shop_overview(bot, chat_id, game_id):
             
             # Hole verfügbare Items
             from database import db_Wallet_get_available_items
-            available_items = db_Wallet_get_available_items(game_id, "runner", runner_user_id)
+            available_items = await db_async(db_Wallet_get_available_items, game_id, "runner", runner_user_id)
             
             # Formatiere Items als [1] 2 [2] 1 [3] 0 [4] 1
             items_display = ""
@@ -895,7 +945,7 @@ async def show_gamemaster_shop_overview(bot, chat_id, game_id):
             
             # Hole verfügbare Items
             from database import db_Wallet_get_available_items
-            available_items = db_Wallet_get_available_items(game_id, "hunter", team_name)
+            available_items = await db_async(db_Wallet_get_available_items, game_id, "hunter", team_name)
             
             # Formatiere Items als [1] 2 [2] 1 [3] 0 [4] 1
             items_display = ""
@@ -950,7 +1000,7 @@ async def cmd_buy(bot, chat_id, user_id, username, command_text):
         return
     
     # Prüfe ob User existiert und in einem Spiel ist
-    existing_user = db_User_get(user_id)
+    existing_user = await db_async(db_User_get, user_id)
     if not existing_user:
         await bot.send_message(chat_id, "❌ Du bist in keinem Spiel registriert.")
         return
@@ -964,26 +1014,37 @@ async def cmd_buy(bot, chat_id, user_id, username, command_text):
     team = existing_user[7]
     
     # Prüfe ob Spiel läuft
-    from database import db_Game_getStatus
-    game_status = db_Game_getStatus(game_id)
+    from game_config import game_config_load
+    game_config = await game_config_load(game_id)
+    game_status = game_config.status if game_config else None
     if game_status not in ['headstart', 'running']:
         await bot.send_message(chat_id, "❌ Der Shop ist nur während des Spiels verfügbar.")
         return
     
-    # Hole Wallet
-    from database import db_Wallet_get
     if role == 'runner':
-        wallet = db_Wallet_get(game_id, "runner", str(user_id))
         wallet_type = "runner"
         wallet_name = str(user_id)
     elif role == 'hunter' and team:
-        wallet = db_Wallet_get(game_id, "hunter", team)
         wallet_type = "hunter"
         wallet_name = team
     else:
         await bot.send_message(chat_id, "❌ Du hast kein Wallet. Nur Runner und Hunter mit Team können den Shop nutzen.")
         return
     
+    # Ein Kauf pro Wallet gleichzeitig: Hunter eines Teams teilen sich ein Wallet
+    lock = _buy_locks.get((game_id, wallet_type, wallet_name))
+    if lock is None:
+        lock = asyncio.Lock()
+        _buy_locks[(game_id, wallet_type, wallet_name)] = lock
+    async with lock:
+        await _cmd_buy_locked(bot, chat_id, user_id, username, game_id, role, team, game_config, wallet_type, wallet_name, item_id)
+
+async def _cmd_buy_locked(bot, chat_id, user_id, username, game_id, role, team, game_config, wallet_type, wallet_name, item_id):
+    """Prüft und bucht einen Kauf, während der Wallet-Lock gehalten wird"""
+    # Hole Wallet
+    from database import db_Wallet_get
+    wallet = await db_async(db_Wallet_get, game_id, wallet_type, wallet_name)
+    
     if not wallet:
         await bot.send_message(chat_id, "❌ Wallet nicht gefunden. Bitte kontaktiere den Gamemaster.")
         return
@@ -992,9 +1053,8 @@ async def cmd_buy(bot, chat_id, user_id, username, command_text):
     last_purchase = wallet[5]  # last_purchase ist in Spalte 5
     
     # Prüfe Cooldown
-    from database import db_Game_getShopCooldown
     from datetime import datetime, timedelta
-    cooldown_minutes = db_Game_getShopCooldown(game_id)
+    cooldown_minutes = game_config.shop_cooldown
     
     if last_purchase:
         try:
@@ -1008,43 +1068,12 @@ async def cmd_buy(bot, chat_id, user_id, username, command_text):
             pass
     
     # Hole Item-Preis und Limit basierend auf Rolle
-    if role == 'runner':
-        from database import (db_Game_getRunnerShop1price, db_Game_getRunnerShop1amount,
-                             db_Game_getRunnerShop2price, db_Game_getRunnerShop2amount,
-                             db_Game_getRunnerShop3price, db_Game_getRunnerShop3amount,
-                             db_Game_getRunnerShop4price, db_Game_getRunnerShop4amount)
-        
-        prices = [
-            db_Game_getRunnerShop1price(game_id),
-            db_Game_getRunnerShop2price(game_id),
-            db_Game_getRunnerShop3price(game_id),
-            db_Game_getRunnerShop4price(game_id)
-        ]
-        amounts = [
-            db_Game_getRunnerShop1amount(game_id),
-            db_Game_getRunnerShop2amount(game_id),
-            db_Game_getRunnerShop3amount(game_id),
-            db_Game_getRunnerShop4amount(game_id)
-        ]
+    shop_role = 'runner' if role == 'runner' else 'hunter'
+    prices = game_config.shop_prices(shop_role)
+    amounts = game_config.shop_amounts(shop_role)
+    if shop_role == 'runner':
         item_names = ["Runner Item 1", "Runner Item 2", "Runner Item 3", "Runner Item 4"]
     else:  # hunter
-        from database import (db_Game_getHunterShop1price, db_Game_getHunterShop1amount,
-                             db_Game_getHunterShop2price, db_Game_getHunterShop2amount,
-                             db_Game_getHunterShop3price, db_Game_getHunterShop3amount,
-                             db_Game_getHunterShop4price, db_Game_getHunterShop4amount)
-        
-        prices = [
-            db_Game_getHunterShop1price(game_id),
-            db_Game_getHunterShop2price(game_id),
-            db_Game_getHunterShop3price(game_id),
-            db_Game_getHunterShop4price(game_id)
-        ]
-        amounts = [
-            db_Game_getHunterShop1amount(game_id),
-            db_Game_getHunterShop2amount(game_id),
-            db_Game_getHunterShop3amount(game_id),
-            db_Game_getHunterShop4amount(game_id)
-        ]
         item_names = ["Hunter Item 1", "Hunter Item 2", "Hunter Item 3", "Hunter Item 4"]
     
     price = prices[item_id - 1]
@@ -1058,7 +1087,7 @@ async def cmd_buy(bot, chat_id, user_id, username, command_text):
     
     # Prüfe ob Item noch gekauft werden kann
     from database import db_Wallet_can_buy_item
-    if not db_Wallet_can_buy_item(game_id, wallet_type, wallet_name, item_id):
+    if not await db_async(db_Wallet_can_buy_item, game_id, wallet_type, wallet_name, item_id):
         await bot.send_message(chat_id, f"❌ Du hast bereits die maximale Anzahl von {item_name} gekauft ({max_amount}x).")
         return
     
@@ -1099,28 +1128,20 @@ async def cmd_buy(bot, chat_id, user_id, username, command_text):
         await bot.send_message(chat_id, "❌ Fehler bei der Item-Aktivierung. Kauf abgebrochen.")
         return
     
-    # Nur wenn Item-Funktion erfolgreich war: Geld abbuchen
+    # Nur wenn Item-Funktion erfolgreich war: Geld abbuchen (Budget, Bestand und Cooldown atomar)
     if item_success:
-        from database import db_Wallet_update_budget, db_Wallet_update_last_purchase, db_Wallet_decrement_item, db_Wallet_get_available_items
+        from database import db_Wallet_purchase
         
-        new_budget = budget - price
-        if db_Wallet_update_budget(game_id, wallet_type, wallet_name, new_budget) and db_Wallet_update_last_purchase(game_id, wallet_type, wallet_name):
-            # Reduziere verfügbare Items
-            if db_Wallet_decrement_item(game_id, wallet_type, wallet_name, item_id):
-                # Hole neue verfügbare Anzahl für Nachricht
-                available_items = db_Wallet_get_available_items(game_id, wallet_type, wallet_name)
-                new_available_count = available_items.get(str(item_id), 0)
-                
-                await bot.send_message(chat_id, f"✅ Kauf erfolgreich!\n\n🛒 Item: {item_name}\n💰 Preis: {price} Coins\n💳 Neues Budget: {new_budget} Coins\n📦 Verfügbar: {new_available_count}\n⏳ Nächster Kauf in: {cooldown_minutes} Minuten")
-                
-                # Sende Standard-Tastatur zurück
-                from telegram_helpmessage import send_helpmessage
-                await send_helpmessage(bot, user_id, chat_id)
-                
-                logger_newLog("info", "cmd_buy", f"Item {item_id} von {username} ({user_id}) gekauft für {price} Coins")
-            else:
-                await bot.send_message(chat_id, f"❌ Item nicht mehr verfügbar. Kauf abgebrochen.")
-                return
+        result = await db_async(db_Wallet_purchase, game_id, wallet_type, wallet_name, item_id, price, cooldown_minutes, write=True)
+        if result:
+            new_budget, new_available_count = result
+            await bot.send_message(chat_id, f"✅ Kauf erfolgreich!\n\n🛒 Item: {item_name}\n💰 Preis: {price} Coins\n💳 Neues Budget: {new_budget} Coins\n📦 Verfügbar: {new_available_count}\n⏳ Nächster Kauf in: {cooldown_minutes} Minuten")
+            
+            # Sende Standard-Tastatur zurück
+            from telegram_helpmessage import send_helpmessage
+            await send_helpmessage(bot, user_id, chat_id)
+            
+            logger_newLog("info", "cmd_buy", f"Item {item_id} von {username} ({user_id}) gekauft für {price} Coins")
         else:
             await bot.send_message(chat_id, "❌ Fehler beim Kauf. Bitte versuche es später erneut.")
             logger_newLog("error", "cmd_buy", f"Fehler beim Kauf von Item {item_id} durch {username}")
@@ -1132,7 +1153,7 @@ async def cmd_status(bot, chat_id, user_id, username, command_text):
     logger_newLog("info", "cmd_status", f"Status Befehl von {username} ({user_id})")
     
     # Prüfe ob User existiert und in einem Spiel ist
-    existing_user = db_User_get(user_id)
+    existing_user = await db_async(db_User_get, user_id)
     if not existing_user:
         await bot.send_message(chat_id, "❌ Du bist in keinem Spiel registriert.")
         return
@@ -1145,16 +1166,16 @@ async def cmd_status(bot, chat_id, user_id, username, command_text):
     role = existing_user[6]
     
     # Hole Spieldaten
-    from database import db_Game_getField, db_Game_getStatus, db_Game_getDuration, db_Game_getStartTime, db_Game_getRunnerHeadstart
+    from game_config import game_config_load
     from datetime import datetime, timedelta
     
-    game = db_Game_getField(game_id)
-    if not game:
+    game_config = await game_config_load(game_id)
+    if not game_config:
         await bot.send_message(chat_id, "❌ Spieldaten konnten nicht geladen werden.")
         return
     
-    spielname = game[1]
-    status = db_Game_getStatus(game_id)
+    spielname = game_config.name
+    status = game_config.status
     
     # Erstelle Status-Nachricht
     status_message = f"🎮 Spielstatus: {spielname}\n\n"
@@ -1163,9 +1184,9 @@ async def cmd_status(bot, chat_id, user_id, username, command_text):
     
     if status in ("headstart", "running"):
         # Berechne Restzeit
-        duration = db_Game_getDuration(game_id)
-        start_time_str = db_Game_getStartTime(game_id)
-        headstart_minutes = db_Game_getRunnerHeadstart(game_id) or 0
+        duration = game_config.duration_minutes
+        start_time_str = game_config.start_time
+        headstart_minutes = game_config.runner_headstart_minutes or 0
         
         if duration and start_time_str:
             try:
@@ -1195,8 +1216,8 @@ async def cmd_status(bot, chat_id, user_id, username, command_text):
     
     # Hole Spieler-Statistiken
     from database import db_getRunners, db_getHunters
-    runners = db_getRunners(game_id)
-    hunters = db_getHunters(game_id)
+    runners = await db_async(db_getRunners, game_id)
+    hunters = await db_async(db_getHunters, game_id)
     
     status_message += f"\n👥 Spieler:\n"
     status_message += f"🏃 Runner: {len(runners)}\n"
@@ -1207,7 +1228,7 @@ async def cmd_status(bot, chat_id, user_id, username, command_text):
         team = existing_user[7]
         if team:
             from database import db_getTeamMembers
-            team_members = db_getTeamMembers(game_id, team)
+            team_members = await db_async(db_getTeamMembers, game_id, team)
             status_message += f"🎨 Dein Team: {team} ({len(team_members)} Mitglieder)\n"
     
     await bot.send_message(chat_id, status_message)
@@ -1221,7 +1242,7 @@ async def cmd_startgame(bot, chat_id, user_id, username, command_text):
     logger_newLog("info", "cmd_startgame", f"Startgame Befehl von {username} ({user_id})")
     
     # Prüfe ob User existiert und in einem Spiel ist
-    existing_user = db_User_get(user_id)
+    existing_user = await db_async(db_User_get, user_id)
     if not existing_user:
         await bot.send_message(chat_id, "❌ Du bist in keinem Spiel registriert.")
         return
@@ -1239,7 +1260,7 @@ async def cmd_startgame(bot, chat_id, user_id, username, command_text):
     
     # Prüfe ob Spielfeld konfiguriert ist
     from database import db_Game_getField
-    game = db_Game_getField(game_id)
+    game = await db_async(db_Game_getField, game_id)
     if not game:
         await bot.send_message(chat_id, "❌ Spieldaten konnten nicht geladen werden.")
         return
@@ -1267,8 +1288,9 @@ async def cmd_startgame(bot, chat_id, user_id, username, command_text):
         return
     
     # Prüfe Spieldauer
-    from database import db_Game_getDuration
-    duration = db_Game_getDuration(game_id)
+    from game_config import game_config_load
+    game_config = await game_config_load(game_id)
+    duration = game_config.duration_minutes if game_config else None
     if not duration or duration <= 0:
         await bot.send_message(chat_id, "❌ Die Spieldauer ist nicht konfiguriert.\n\nBitte verwende `/fieldsetup` um eine Spieldauer zu setzen.")
         return
@@ -1277,45 +1299,54 @@ async def cmd_startgame(bot, chat_id, user_id, username, command_text):
     from datetime import datetime
     start_time = datetime.now().isoformat()
     
-    from database import db_Game_setStartTime, db_Game_setStatus, db_Game_getDuration, db_getRunners, db_getHunters, db_Game_getRunnerHeadstart
+    from database import db_Game_setStartTime, db_Game_setStatus, db_getRunners, db_getHunters
     from config import conf_getMaxLocationAgeMinutes
     max_age_min = conf_getMaxLocationAgeMinutes()
     
-    if db_Game_setStartTime(game_id, start_time) and db_Game_setStatus(game_id, 'headstart'):
+    if await db_async(db_Game_setStartTime, game_id, start_time) and await db_async(db_Game_setStatus, game_id, 'headstart'):
         logger_newLog("info", "cmd_startgame", f"Spiel {game_id} von Gamemaster {username} ({user_id}) gestartet")
         
+        # Headstart-Ende, Spielende und Standort-Prüfungen einplanen
+        from game import game_reschedule
+        await game_reschedule(game_id)
+        
+        # Grundkarte für /map vorrendern (falls seit /fieldsetup noch nicht geschehen)
+        from map_base_layer import map_base_prerender_later
+        map_base_prerender_later(game_id)
+        
         # Erstelle Wallets für alle Runner und Teams
-        from database import (db_Game_getStartBudgetRunner, db_Game_getStartBudgetHunter, 
-                             db_Wallet_create, db_getRunners, db_getHunters)
+        from database import db_Wallet_create, db_getRunners, db_getHunters
+        from game_config import game_config_load
         
-        runner_budget = db_Game_getStartBudgetRunner(game_id)
-        hunter_budget = db_Game_getStartBudgetHunter(game_id)
+        game_config = await game_config_load(game_id)
+        runner_budget = game_config.start_budget_runner
+        hunter_budget = game_config.start_budget_hunter
         
         # Erstelle Wallets für Runner
-        runners = db_getRunners(game_id)
+        runners = await db_async(db_getRunners, game_id)
         for runner in runners:
             runner_user_id = runner[0]
-            db_Wallet_create(game_id, "runner", str(runner_user_id), runner_budget)
+            await db_async(db_Wallet_create, game_id, "runner", str(runner_user_id), runner_budget)
         
         # Erstelle Wallets für Hunter-Teams
-        hunters = db_getHunters(game_id)
+        hunters = await db_async(db_getHunters, game_id)
         teams_created = set()
         for hunter in hunters:
             team = hunter[2]  # team ist in Spalte 2
             if team and team not in teams_created:
-                db_Wallet_create(game_id, "hunter", team, hunter_budget)
+                await db_async(db_Wallet_create, game_id, "hunter", team, hunter_budget)
                 teams_created.add(team)
         
         logger_newLog("info", "cmd_startgame", f"Wallets erstellt: {len(runners)} Runner, {len(teams_created)} Teams")
         
         # Hole alle Runner und Hunter
         from database import db_getRunners, db_getHunters
-        runners = db_getRunners(game_id)
-        hunters = db_getHunters(game_id)
+        runners = await db_async(db_getRunners, game_id)
+        hunters = await db_async(db_getHunters, game_id)
         from datetime import datetime, timedelta
         now = datetime.now()
         # Hole Spieldauer für Nachricht
-        duration_minutes = db_Game_getDuration(game_id) or 0
+        duration_minutes = game_config.duration_minutes or 0
         hours = duration_minutes // 60
         minutes = duration_minutes % 60
         time_str = f"{hours:02d}:{minutes:02d}"
@@ -1388,9 +1419,9 @@ async def cmd_startgame(bot, chat_id, user_id, username, command_text):
             return
         
         # Hole Spieldauer
-        duration_minutes = db_Game_getDuration(game_id)
+        duration_minutes = game_config.duration_minutes
         # Hole Runner-Vorsprung
-        headstart_minutes = db_Game_getRunnerHeadstart(game_id) or 0
+        headstart_minutes = game_config.runner_headstart_minutes or 0
         if duration_minutes:
             # Formatiere Zeit als hh:mm
             hours = duration_minutes // 60
@@ -1398,7 +1429,7 @@ async def cmd_startgame(bot, chat_id, user_id, username, command_text):
             time_str = f"{hours:02d}:{minutes:02d}"
             
             # Hole alle Runner
-            runners = db_getRunners(game_id)
+            runners = await db_async(db_getRunners, game_id)
             runner_message = f"🏁 Das Spiel ist gestartet!\n\n⏱️ Du hast {time_str} Zeit um das Ziel zu erreichen.\n\n🗺️ Sende `/map` um eine aktuelle Karte zu bekommen."
             
             # Sende Nachricht an alle Runner
@@ -1406,7 +1437,7 @@ async def cmd_startgame(bot, chat_id, user_id, username, command_text):
             for runner in runners:
                 try:
                     runner_user_id = runner[0]  # user_id ist in Spalte 0
-                    await bot.send_message(runner_user_id, runner_message)
+                    await bot.send_message(runner_user_id, runner_message, priority=PRIORITY_CRITICAL)
                     # Sende Standard-Tastatur
                     await send_helpmessage(bot, runner_user_id, runner_user_id)
                     runner_count += 1
@@ -1415,13 +1446,13 @@ async def cmd_startgame(bot, chat_id, user_id, username, command_text):
                     logger_newLog("error", "cmd_startgame", f"Fehler beim Senden der Runner-Nachricht an User {runner[1]} ({runner[0]}): {str(e)}")
             
             # Hole alle Hunter
-            hunters = db_getHunters(game_id)
+            hunters = await db_async(db_getHunters, game_id)
             hunter_message = f"🏁 Das Spiel wurde gestartet!\n\nDie Runner haben {time_str} Zeit das Ziel zu erreichen.\nDu musst noch {headstart_minutes} Minuten warten, bis du die Verfolgung aufnehmen darfst."
             hunter_count = 0
             for hunter in hunters:
                 try:
                     hunter_user_id = hunter[0]  # user_id ist in Spalte 0
-                    await bot.send_message(hunter_user_id, hunter_message)
+                    await bot.send_message(hunter_user_id, hunter_message, priority=PRIORITY_CRITICAL)
                     # Sende Standard-Tastatur
                     await send_helpmessage(bot, hunter_user_id, hunter_user_id)
                     hunter_count += 1
@@ -1449,7 +1480,7 @@ async def cmd_startgame(bot, chat_id, user_id, username, command_text):
 
 async def cmd_listgames(bot, chat_id):
     from database import db_getGamesWithStatus
-    games = db_getGamesWithStatus('created')
+    games = await db_async(db_getGamesWithStatus, 'created')
     if not games:
         msg = "Es gibt aktuell keine offenen Spiele.\nDu kannst mit /new Spielname ein neues Spiel erstellen."
     else:
@@ -1463,10 +1494,11 @@ async def cmd_keyboard(bot, chat_id, user_id, username, command_text):
     """Behandelt /keyboard Befehl - Zeigt rollenabhängige Reply-Keyboards"""
     logger_newLog("info", "cmd_keyboard", f"Keyboard Befehl von {username} ({user_id})")
     
-    from database import db_User_get, db_Game_getField, db_Game_getDuration, db_Game_getStartTime
+    from database import db_User_get
+    from game_config import game_config_load
     from datetime import datetime, timedelta
     
-    user = db_User_get(user_id)
+    user = await db_async(db_User_get, user_id)
     if not user:
         # Nicht registriert - nur /start
         keyboard = {
@@ -1495,8 +1527,8 @@ async def cmd_keyboard(bot, chat_id, user_id, username, command_text):
         await bot.send_message(chat_id, "🎮 ChaseBot - Hauptmenü\n\nDu bist registriert aber nicht in einem Spiel.", reply_markup=keyboard)
         return
     
-    game = db_Game_getField(game_id)
-    if not game:
+    game_config = await game_config_load(game_id)
+    if not game_config:
         # Spieldaten nicht gefunden
         keyboard = {
             "keyboard": [
@@ -1508,14 +1540,14 @@ async def cmd_keyboard(bot, chat_id, user_id, username, command_text):
         await bot.send_message(chat_id, "❌ Spieldaten konnten nicht geladen werden.", reply_markup=keyboard)
         return
     
-    spielname = game[1]
-    status = game[3]
+    spielname = game_config.name
+    status = game_config.status
     
     # Berechne Restzeit für laufende Spiele
     restzeit = None
     if status in ("headstart", "running"):
-        duration = db_Game_getDuration(game_id)
-        start_time_str = db_Game_getStartTime(game_id)
+        duration = game_config.duration_minutes
+        start_time_str = game_config.start_time
         if duration and start_time_str:
             try:
                 start_time = datetime.fromisoformat(start_time_str)
@@ -1676,7 +1708,7 @@ async def cmd_coins(bot, chat_id, user_id, username, command_text):
         return
     
     # Prüfe ob User existiert und in einem Spiel ist
-    existing_user = db_User_get(user_id)
+    existing_user = await db_async(db_User_get, user_id)
     if not existing_user:
         await bot.send_message(chat_id, "❌ Du bist in keinem Spiel registriert.")
         return
@@ -1709,7 +1741,7 @@ async def cmd_coins(bot, chat_id, user_id, username, command_text):
     
     # Finde das Ziel (User oder Team)
     from database import db_getUsers, db_Wallet_get, db_Wallet_update_budget
-    users = db_getUsers()
+    users = await db_async(db_getUsers)
     target_user = None
     target_team = None
     
@@ -1717,7 +1749,7 @@ async def cmd_coins(bot, chat_id, user_id, username, command_text):
     allowed_teams = ["red", "blue", "green", "yellow", "purple"]
     if target_name.lower() in allowed_teams:
         target_team = target_name.lower()
-        wallet = db_Wallet_get(game_id, "hunter", target_team)
+        wallet = await db_async(db_Wallet_get, game_id, "hunter", target_team)
         if not wallet:
             await bot.send_message(chat_id, f"❌ Team '{target_team}' hat kein Wallet. Das Team muss erst im Spiel sein.")
             return
@@ -1740,7 +1772,7 @@ async def cmd_coins(bot, chat_id, user_id, username, command_text):
             return
         
         target_user_id = target_user[0]
-        wallet = db_Wallet_get(game_id, "runner", str(target_user_id))
+        wallet = await db_async(db_Wallet_get, game_id, "runner", str(target_user_id))
         if not wallet:
             await bot.send_message(chat_id, f"❌ Runner '{target_name}' hat kein Wallet. Das Spiel muss erst gestartet sein.")
             return
@@ -1764,7 +1796,7 @@ async def cmd_coins(bot, chat_id, user_id, username, command_text):
         wallet_name = str(target_user_id)
         target_display = target_name
     
-    if db_Wallet_update_budget(game_id, wallet_type, wallet_name, new_budget):
+    if await db_async(db_Wallet_update_budget, game_id, wallet_type, wallet_name, new_budget):
         # Erstelle Nachricht
         if coin_amount > 0:
             action = "hinzugefügt"
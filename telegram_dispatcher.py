@@ -0,0 +1,108 @@
+import asyncio
+from collections import deque
+from logger import logger_newLog
+
+class UpdateDispatcher:
+    """Verarbeitet eingehende Updates parallel über mehrere Chats hinweg
+
+    Updates desselben Chats werden strikt in Eingangsreihenfolge abgearbeitet,
+    Updates verschiedener Chats laufen gleichzeitig auf einem begrenzten Worker-Pool.
+    So blockiert z.B. ein langsames /map des Gamemasters nicht die Live-Standorte der Runner.
+    """
+
+    def __init__(self, handler, max_workers=8, max_pending=1000):
+        """
+        Args:
+            handler: Coroutine-Funktion, die eine einzelne Nachricht verarbeitet
+            max_workers: Anzahl gleichzeitig arbeitender Worker
+            max_pending: Maximale Anzahl wartender Updates (darüber wartet dispatch)
+        """
+        self.handler = handler
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(1, max_pending)
+
+        self.chat_queues = {}  # {chat_id: deque([message, ...])}
+        self.ready_chats = asyncio.Queue()  # Chats mit wartenden Updates, die kein Worker bearbeitet
+        self.pending_slots = asyncio.Semaphore(self.max_pending)
+        self.workers = []
+
+        # Metriken
+        self.pending = 0
+        self.max_pending_seen = 0
+        self.active_workers = 0
+        self.processed = 0
+        self.failed = 0
+
+    def start(self):
+        """Startet die Worker-Tasks (muss innerhalb der laufenden Event-Loop aufgerufen werden)"""
+        if self.workers:
+            return
+        for worker_id in range(self.max_workers):
+            self.workers.append(asyncio.create_task(self._worker(worker_id)))
+        logger_newLog("info", "UpdateDispatcher", f"Dispatcher gestartet mit {self.max_workers} Workern (max. {self.max_pending} wartende Updates)")
+
+    async def stop(self):
+        """Beendet alle Worker-Tasks"""
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    async def dispatch(self, chat_id, message):
+        """Reiht ein Update für einen Chat ein
+
+        Wartet nur, wenn bereits max_pending Updates auf Verarbeitung warten.
+        """
+        await self.pending_slots.acquire()
+        self.pending += 1
+        self.max_pending_seen = max(self.max_pending_seen, self.pending)
+
+        queue = self.chat_queues.get(chat_id)
+        if queue is None:
+            # Chat ist gerade nicht in Bearbeitung - neue Warteschlange anlegen und Chat freigeben
+            self.chat_queues[chat_id] = deque([message])
+            self.ready_chats.put_nowait(chat_id)
+        else:
+            # Chat wird bereits bearbeitet oder wartet - Reihenfolge bleibt erhalten
+            queue.append(message)
+
+    async def join(self):
+        """Wartet bis alle eingereihten Updates verarbeitet wurden"""
+        while self.pending > 0:
+            await asyncio.sleep(0.01)
+
+    def get_metrics(self):
+        """Gibt die aktuellen Warteschlangen-Metriken zurück"""
+        return {
+            "pending": self.pending,
+            "max_pending_seen": self.max_pending_seen,
+            "chats_waiting": len(self.chat_queues),
+            "active_workers": self.active_workers,
+            "workers": self.max_workers,
+            "processed": self.processed,
+            "failed": self.failed
+        }
+
+    async def _worker(self, worker_id):
+        """Arbeitet die Updates eines Chats nacheinander ab und gibt den Chat dann wieder frei"""
+        while True:
+            chat_id = await self.ready_chats.get()
+            queue = self.chat_queues.get(chat_id)
+            self.active_workers += 1
+            try:
+                while queue:
+                    message = queue.popleft()
+                    try:
+                        await self.handler(message)
+                        self.processed += 1
+                    except Exception as e:
+                        self.failed += 1
+                        logger_newLog("error", "UpdateDispatcher", f"Fehler bei Update von Chat {chat_id} (Worker {worker_id}): {str(e)}")
+                    finally:
+                        self.pending -= 1
+                        self.pending_slots.release()
+
+                # Warteschlange leer - Chat freigeben (kein await dazwischen, daher kein Race)
+                del self.chat_queues[chat_id]
+            finally:
+                self.active_workers -= 1
@@ -1,8 +1,10 @@
 async def send_helpmessage(bot, user_id, chat_id):
-    from database import db_User_get, db_Game_getField, db_Game_getDuration, db_Game_getStartTime
+    from database import db_User_get
+    from game_config import game_config_load
+    from database_async import db_async
     from datetime import datetime, timedelta
     
-    user = db_User_get(user_id)
+    user = await db_async(db_User_get, user_id)
     
     # Fall 1: User ist nicht in der Datenbank (nicht registriert)
     if not user:
@@ -33,8 +35,8 @@ async def send_helpmessage(bot, user_id, chat_id):
         return
     
     # Fall 3: User ist in einem Spiel
-    game = db_Game_getField(game_id)
-    if not game:
+    game_config = await game_config_load(game_id)
+    if not game_config:
         msg = "Du bist im Spiel, aber die Spieldaten konnten nicht geladen werden.\nVerfügbare Befehle:\n/leave\n/help"
         keyboard = {
             "keyboard": [
@@ -47,12 +49,12 @@ async def send_helpmessage(bot, user_id, chat_id):
         return
     
     role = user[6]
-    spielname = game[1]
-    status = game[3]
+    spielname = game_config.name
+    status = game_config.status
     restzeit = None
     if status in ("headstart", "running"):
-        duration = db_Game_getDuration(game_id)
-        start_time_str = db_Game_getStartTime(game_id)
+        duration = game_config.duration_minutes
+        start_time_str = game_config.start_time
         if duration and start_time_str:
             try:
                 start_time = datetime.fromisoformat(start_time_str)
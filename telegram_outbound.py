@@ -0,0 +1,295 @@
+import asyncio
+import heapq
+import itertools
+import time
+from logger import logger_newLog
+
+# Prioritäten für ausgehende Nachrichten (kleiner = wichtiger)
+PRIORITY_CRITICAL = 0  # Spielkritisch: Falle ausgelöst, Spielstart/-ende
+PRIORITY_NORMAL = 1    # Normale Antworten und Benachrichtigungen
+PRIORITY_LOW = 2       # Chat-Nachrichten und sonstiges
+
+# Sekunden zwischen zwei Aufräumläufen für Chats ohne wartende Nachrichten
+CHAT_PRUNE_INTERVAL = 60
+
+class TokenBucket:
+    """Einfacher Token-Bucket für Senderaten"""
+
+    def __init__(self, rate, burst):
+        self.rate = max(0.001, float(rate))
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.last = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        if now <= self.last:
+            return  # Pausiert (siehe pause)
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    def time_until_available(self):
+        """Gibt zurück wie viele Sekunden bis zum nächsten freien Token vergehen"""
+        self._refill()
+        if self.tokens >= 1:
+            return 0
+        return max(0, self.last - time.monotonic()) + (1 - self.tokens) / self.rate
+
+    def pause(self, seconds):
+        """Leert den Bucket und füllt ihn erst nach seconds Sekunden wieder auf"""
+        self._refill()
+        self.tokens = min(self.tokens, 0)
+        self.last = max(self.last, time.monotonic() + seconds)
+
+    def consume(self):
+        self._refill()
+        self.tokens -= 1
+
+    def is_full(self):
+        """Gibt zurück ob der Bucket wieder voll ist (dann gleichwertig zu einem neuen)"""
+        self._refill()
+        return self.tokens >= self.burst
+
+class OutboundQueue:
+    """Zentrale Warteschlange für alle ausgehenden Telegram-Anfragen
+
+    Hält eine globale und eine Rate pro Chat ein, beachtet retry_after bei HTTP 429,
+    wiederholt fehlgeschlagene Anfragen mit Backoff und sendet spielkritische
+    Nachrichten vor normalen. Nachrichten an denselben Chat bleiben (bei gleicher
+    Priorität) in Reihenfolge.
+    """
+
+    def __init__(self, request_func, global_rate=25, chat_rate=1.0, chat_burst=3, max_retries=5, max_queue=2000, workers=4):
+        """
+        Args:
+            request_func: Coroutine (method, payload, files) -> (HTTP-Status oder None, JSON-Antwort oder None)
+            global_rate: Maximale Anfragen pro Sekunde insgesamt
+            chat_rate: Maximale Anfragen pro Sekunde und Chat
+            chat_burst: Anzahl Nachrichten, die an einen Chat kurzzeitig schneller gehen dürfen
+            max_retries: Maximale Anzahl Wiederholungen pro Anfrage
+            max_queue: Maximale Anzahl wartender Anfragen (kritische werden immer angenommen)
+            workers: Anzahl gleichzeitig sendender Worker
+        """
+        self.request_func = request_func
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.max_queue = max_queue
+        self.worker_count = max(1, workers)
+
+        self.chat_buckets = {}      # {chat_id: TokenBucket}
+        self.chat_blocked = {}      # {chat_id: monotonic-Zeit bis wann nicht gesendet werden darf}
+        self.chat_queues = {}       # {chat_id: [(priority, seq, job), ...]} als Heap
+        self.ready_chats = asyncio.PriorityQueue()  # (priority, seq, chat_id)
+        self.chat_scheduled = {}    # {chat_id: (priority, seq)} gültiger Eintrag in ready_chats, ältere werden übersprungen
+        self.last_prune = time.monotonic()
+        self.global_lock = asyncio.Lock()
+        self.seq = itertools.count()
+        self.workers = []
+
+        # Metriken
+        self.pending = 0
+        self.sent = 0
+        self.retried = 0
+        self.flood_waits = 0
+        self.dropped_queue_full = 0
+        self.dropped_retries = 0
+        self.dropped_rejected = 0
+
+    def _start_workers(self):
+        """Startet die Worker beim ersten Senden (benötigt laufende Event-Loop)"""
+        if self.workers:
+            return
+        for worker_id in range(self.worker_count):
+            self.workers.append(asyncio.create_task(self._worker(worker_id)))
+        logger_newLog("info", "OutboundQueue", f"Ausgehende Warteschlange gestartet mit {self.worker_count} Workern")
+
+    def enqueue(self, chat_id, method, payload, files=None, priority=PRIORITY_NORMAL):
+        """Reiht eine Anfrage ein
+
+        Returns:
+            Future, das mit dem 'result' der Telegram-Antwort oder None (Fehler/verworfen) erfüllt wird
+        """
+        self._start_workers()
+        future = asyncio.get_running_loop().create_future()
+
+        if self.pending >= self.max_queue and priority != PRIORITY_CRITICAL:
+            self.dropped_queue_full += 1
+            logger_newLog("warning", "OutboundQueue", f"Warteschlange voll ({self.pending}), {method} an {chat_id} verworfen")
+            future.set_result(None)
+            return future
+
+        job = {
+            "chat_id": chat_id,
+            "method": method,
+            "payload": payload,
+            "files": files,
+            "priority": priority,
+            "attempts": 0,
+            "future": future
+        }
+        seq = next(self.seq)
+        self.pending += 1
+
+        heap = self.chat_queues.get(chat_id)
+        if heap is None:
+            # Chat ist weder in Bearbeitung noch eingeplant - sofort freigeben
+            self.chat_queues[chat_id] = [(priority, seq, job)]
+            self._schedule_chat(chat_id)
+        else:
+            heapq.heappush(heap, (priority, seq, job))
+            scheduled = self.chat_scheduled.get(chat_id)
+            if scheduled is not None and priority < scheduled[0]:
+                # Chat wartet mit niedrigerer Priorität - mit der höheren neu einreihen
+                self._schedule_chat(chat_id)
+        return future
+
+    def get_metrics(self):
+        """Gibt Warteschlangenlänge und Zähler zurück"""
+        return {
+            "queued": self.pending,
+            "chats_waiting": len(self.chat_queues),
+            "sent": self.sent,
+            "retried": self.retried,
+            "flood_waits": self.flood_waits,
+            "dropped_queue_full": self.dropped_queue_full,
+            "dropped_retries": self.dropped_retries,
+            "dropped_rejected": self.dropped_rejected
+        }
+
+    def _get_chat_bucket(self, chat_id):
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self.chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _schedule_chat(self, chat_id):
+        """Reiht einen Chat mit der Priorität seiner wichtigsten wartenden Nachricht in ready_chats ein"""
+        heap = self.chat_queues.get(chat_id)
+        if not heap:
+            return
+        priority, seq, _ = heap[0]
+        self.chat_scheduled[chat_id] = (priority, seq)
+        self.ready_chats.put_nowait((priority, seq, chat_id))
+
+    def _release_chat(self, chat_id, delay=0):
+        """Gibt einen Chat nach der Bearbeitung wieder frei oder entfernt ihn, wenn nichts mehr wartet"""
+        heap = self.chat_queues.get(chat_id)
+        if not heap:
+            self.chat_queues.pop(chat_id, None)
+            self._prune_idle_chats()
+            return
+        if delay > 0:
+            # Priorität erst beim Einreihen bestimmen, falls inzwischen Wichtigeres dazukam
+            asyncio.get_running_loop().call_later(delay, self._schedule_chat, chat_id)
+        else:
+            self._schedule_chat(chat_id)
+
+    def _prune_idle_chats(self):
+        """Entfernt Rate-Zustand von Chats, für die nichts wartet und deren Bucket wieder voll ist"""
+        now = time.monotonic()
+        if now - self.last_prune < CHAT_PRUNE_INTERVAL:
+            return
+        self.last_prune = now
+        for chat_id in [chat_id for chat_id, bucket in self.chat_buckets.items() if chat_id not in self.chat_queues and bucket.is_full()]:
+            del self.chat_buckets[chat_id]
+        for chat_id in [chat_id for chat_id, until in self.chat_blocked.items() if chat_id not in self.chat_queues and until <= now]:
+            del self.chat_blocked[chat_id]
+
+    async def _acquire_global(self):
+        """Wartet auf einen Token der globalen Rate"""
+        async with self.global_lock:
+            wait = self.global_bucket.time_until_available()
+            while wait > 0:
+                await asyncio.sleep(wait)
+                wait = self.global_bucket.time_until_available()
+            self.global_bucket.consume()
+
+    def _finish(self, job, result):
+        self.pending -= 1
+        if not job["future"].done():
+            job["future"].set_result(result)
+
+    async def _worker(self, worker_id):
+        while True:
+            priority, seq, chat_id = await self.ready_chats.get()
+            if self.chat_scheduled.get(chat_id) != (priority, seq):
+                continue  # Veraltet (Chat wurde mit höherer Priorität neu eingereiht)
+            del self.chat_scheduled[chat_id]
+            heap = self.chat_queues.get(chat_id)
+            if not heap:
+                self.chat_queues.pop(chat_id, None)
+                continue
+
+            # Rate pro Chat und evtl. Flood-Sperre beachten, ohne den Worker zu blockieren
+            bucket = self._get_chat_bucket(chat_id)
+            wait = max(bucket.time_until_available(), self.chat_blocked.get(chat_id, 0) - time.monotonic())
+            if wait > 0:
+                self._release_chat(chat_id, wait)
+                continue
+
+            priority, seq, job = heapq.heappop(heap)
+            await self._acquire_global()
+            bucket.consume()
+
+            retry_delay = await self._send(job, priority, seq, heap)
+            self._release_chat(chat_id, retry_delay)
+
+    async def _send(self, job, priority, seq, heap):
+        """Sendet eine Anfrage und plant bei Bedarf eine Wiederholung ein
+
+        Returns:
+            Sekunden, die der Chat bis zum nächsten Versuch warten muss (0 = sofort weiter)
+        """
+        chat_id = job["chat_id"]
+        method = job["method"]
+        try:
+            status, data = await self.request_func(method, job["payload"], job["files"])
+        except Exception as e:
+            logger_newLog("error", "OutboundQueue", f"Fehler beim Senden von {method} an {chat_id}: {str(e)}")
+            status, data = None, None
+
+        if status == 200 and data and data.get('ok'):
+            self.sent += 1
+            logger_newLog("debug", "OutboundQueue", f"{method} an {chat_id} gesendet")
+            self._finish(job, data.get('result'))
+            return 0
+
+        description = data.get('description', '') if data else ''
+
+        if status is not None and 400 <= status < 500 and status != 429:
+            # Von Telegram abgelehnt (z.B. Bot blockiert, Chat unbekannt) - Wiederholung zwecklos
+            self.dropped_rejected += 1
+            logger_newLog("error", "OutboundQueue", f"{method} an {chat_id} abgelehnt: {status} {description}")
+            self._finish(job, None)
+            return 0
+
+        job["attempts"] += 1
+        if job["attempts"] > self.max_retries:
+            self.dropped_retries += 1
+            logger_newLog("error", "OutboundQueue", f"{method} an {chat_id} nach {self.max_retries} Wiederholungen verworfen: {status} {description}")
+            self._finish(job, None)
+            return 0
+
+        if status == 429:
+            # Flood-Control: Telegram gibt vor, wie lange gewartet werden muss
+            retry_after = 1
+            if data:
+                retry_after = data.get('parameters', {}).get('retry_after', retry_after)
+            delay = float(retry_after)
+            self.flood_waits += 1
+            # Flood-Control gilt für den ganzen Bot: auch die globale Rate pausieren
+            self.global_bucket.pause(delay)
+            logger_newLog("warning", "OutboundQueue", f"Flood-Control für Chat {chat_id}: warte {delay:.0f}s (Versuch {job['attempts']})")
+        else:
+            # Netzwerk- oder Serverfehler: exponentieller Backoff
+            delay = min(60.0, 2 ** (job["attempts"] - 1))
+            logger_newLog("warning", "OutboundQueue", f"{method} an {chat_id} fehlgeschlagen ({status}), neuer Versuch in {delay:.0f}s")
+
+        self.retried += 1
+        self.chat_blocked[chat_id] = time.monotonic() + delay
+        # Gleiche Sequenznummer - die Nachricht bleibt vor späteren Nachrichten an diesen Chat
+        heapq.heappush(heap, (priority, seq, job))
+        return delay
@@ -1,170 +1,482 @@
 import os
 import requests
+import sqlite3
 import time
-from collections import OrderedDict
 from logger import logger_newLog
-from config import conf_getTileCacheDir, conf_getTileCacheMaxSize
+from config import conf_getTileCacheDir, conf_getTileCacheMaxSize, conf_getTileCacheMaxMB
 import threading
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 import urllib.parse
+import zlib
+
+TILE_USER_AGENT = 'TelegramChaseBot/1.0 (https://github.com/your-repo; your-email@example.com)'
+# Letzter Zugriff eines Tiles wird höchstens so oft in die Datei geschrieben
+TILE_CACHE_ACCESS_RESOLUTION_SECONDS = 60
+# Größe des Memory-Mappings je MBTiles-Datei
+TILE_CACHE_MMAP_BYTES = 256 * 1024 * 1024
+# Beim Überschreiten eines Limits wird bis auf diesen Anteil verdrängt, damit nicht jedes neue Tile eine Verdrängung auslöst
+TILE_CACHE_EVICT_TARGET = 0.9
 
 # Lokaler Tile-Cache
 class LocalTileCache:
-    def __init__(self, cache_dir, max_size=1000):
+    """Tile-Cache in einer MBTiles-Datei (SQLite) je Provider: <cache_dir>/<provider>.mbtiles
+
+    Die Tabelle tiles folgt dem MBTiles-Schema (zoom_level, tile_column, tile_row
+    im TMS-Schema, tile_data) und hat zusätzlich last_access und tile_size für
+    die LRU-Verdrängung. Beides liegt in der Datei und übersteht damit Neustarts.
+    Anzahl und Gesamtgröße führen Trigger in tile_stats mit, damit die Prüfung
+    der Limits nicht jedes Mal die ganze Tabelle lesen muss.
+    Render-Prozesse öffnen dieselben Dateien (WAL), jeder Prozess mit eigener Instanz.
+    """
+    def __init__(self, cache_dir, max_size=1000, max_bytes=0):
         self.cache_dir = cache_dir
         self.max_size = max_size
-        self.cache_usage = OrderedDict()  # Für LRU-Cache
+        self.max_bytes = max_bytes
+        self.connections = {}  # {Provider: sqlite3.Connection} zum Schreiben, nur unter self.lock
+        self.lock = threading.Lock()
+        self.readers = threading.local()  # Nur-Lese-Verbindungen je Thread: .connections = {Provider: sqlite3.Connection}
+        self.reader_connections = []  # Alle Nur-Lese-Verbindungen (zum Schließen)
+        self.pending_access = {}  # Noch nicht geschriebene Zugriffszeiten: {Provider: {(z, Spalte, Zeile): Zeit}}
+        self.access_lock = threading.Lock()
+        self.access_flusher = None
         os.makedirs(cache_dir, exist_ok=True)
-        logger_newLog("info", "LocalTileCache", f"Tile-Cache initialisiert: {cache_dir}, max {max_size} Tiles")
+        logger_newLog("info", "LocalTileCache", f"Tile-Cache initialisiert: {cache_dir}, max {max_size} Tiles, max {max_bytes // (1024 * 1024)} MB")
     
-    def get_cache_path(self, provider, z, x, y):
-        """Erstellt den Cache-Pfad für ein Tile"""
-        # Erstelle Provider-Unterverzeichnis
-        provider_dir = os.path.join(self.cache_dir, provider)
-        os.makedirs(provider_dir, exist_ok=True)
-        
-        # Erstelle Zoom-Unterverzeichnis
-        zoom_dir = os.path.join(provider_dir, str(z))
-        os.makedirs(zoom_dir, exist_ok=True)
-        
-        # Erstelle X-Unterverzeichnis
-        x_dir = os.path.join(zoom_dir, str(x))
-        os.makedirs(x_dir, exist_ok=True)
-        
-        return os.path.join(x_dir, f"{y}.png")
+    def get_store_path(self, provider):
+        """Pfad der MBTiles-Datei eines Providers"""
+        return os.path.join(self.cache_dir, f"{provider}.mbtiles")
+    
+    def _connection(self, provider):
+        """Gibt die Verbindung zur MBTiles-Datei eines Providers zurück und legt die Datei bei Bedarf an (nur unter self.lock)"""
+        conn = self.connections.get(provider)
+        if conn is None:
+            conn = sqlite3.connect(self.get_store_path(provider), timeout=30.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS tiles (
+                    zoom_level INTEGER NOT NULL,
+                    tile_column INTEGER NOT NULL,
+                    tile_row INTEGER NOT NULL,
+                    tile_data BLOB NOT NULL,
+                    last_access REAL NOT NULL,
+                    tile_size INTEGER NOT NULL
+                )
+            ''')
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS tile_index ON tiles (zoom_level, tile_column, tile_row)")
+            conn.execute("CREATE INDEX IF NOT EXISTS tiles_last_access ON tiles (last_access)")
+            conn.execute("CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("CREATE TABLE IF NOT EXISTS tile_stats (id INTEGER PRIMARY KEY CHECK (id = 1), tile_count INTEGER NOT NULL, total_bytes INTEGER NOT NULL)")
+            # Einmalig aus dem Bestand füllen (auch für Dateien, die noch ohne tile_stats angelegt wurden)
+            conn.execute("INSERT OR IGNORE INTO tile_stats (id, tile_count, total_bytes) SELECT 1, COUNT(*), COALESCE(SUM(tile_size), 0) FROM tiles")
+            conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS tiles_stats_insert AFTER INSERT ON tiles BEGIN
+                    UPDATE tile_stats SET tile_count = tile_count + 1, total_bytes = total_bytes + NEW.tile_size WHERE id = 1;
+                END
+            ''')
+            conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS tiles_stats_delete AFTER DELETE ON tiles BEGIN
+                    UPDATE tile_stats SET tile_count = tile_count - 1, total_bytes = total_bytes - OLD.tile_size WHERE id = 1;
+                END
+            ''')
+            conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS tiles_stats_update AFTER UPDATE OF tile_size ON tiles BEGIN
+                    UPDATE tile_stats SET total_bytes = total_bytes - OLD.tile_size + NEW.tile_size WHERE id = 1;
+                END
+            ''')
+            conn.executemany("INSERT OR IGNORE INTO metadata (name, value) VALUES (?, ?)",
+                             [('name', provider), ('format', 'png'), ('type', 'baselayer'), ('version', '1.0')])
+            conn.commit()
+            self.connections[provider] = conn
+        return conn
+    
+    @staticmethod
+    def _tile_row(z, y):
+        """MBTiles speichert Zeilen im TMS-Schema (y von Süden gezählt)"""
+        return (1 << int(z)) - 1 - int(y)
     
     def get_tile(self, provider, z, x, y, original_url):
-        """Holt ein Tile aus dem Cache oder lädt es von der Original-URL"""
-        cache_path = self.get_cache_path(provider, z, x, y)
+        """Stellt sicher dass ein Tile im Cache liegt und lädt es sonst von der Original-URL
         
-        # Prüfe ob Tile im Cache existiert
-        if os.path.exists(cache_path):
-            # Aktualisiere Cache-Nutzung (LRU)
-            cache_key = f"{provider}/{z}/{x}/{y}"
-            if cache_key in self.cache_usage:
-                self.cache_usage.move_to_end(cache_key)
-            else:
-                self.cache_usage[cache_key] = time.time()
-            
+        Returns:
+            True wenn das Tile im Cache liegt
+        """
+        if self.has_tile(provider, z, x, y):
             logger_newLog("debug", "LocalTileCache", f"Tile {z}/{x}/{y} aus Cache geladen")
-            return cache_path
+            return True
         
         # Tile nicht im Cache - lade von Original-URL
         try:
             logger_newLog("debug", "LocalTileCache", f"Lade Tile {z}/{x}/{y} von {original_url}")
-            headers = {
-                'User-Agent': 'TelegramChaseBot/1.0 (https://github.com/your-repo; your-email@example.com)'
-            }
+            headers = {'User-Agent': TILE_USER_AGENT}
             response = requests.get(original_url, timeout=10, headers=headers)
             response.raise_for_status()
-            
-            # Speichere in Cache
-            with open(cache_path, 'wb') as f:
-                f.write(response.content)
-            
-            # Aktualisiere Cache-Nutzung
-            cache_key = f"{provider}/{z}/{x}/{y}"
-            self.cache_usage[cache_key] = time.time()
-            
-            # Prüfe Cache-Größe und entferne alte Tiles wenn nötig
-            self._cleanup_cache()
-            
-            logger_newLog("debug", "LocalTileCache", f"Tile {z}/{x}/{y} gecacht")
-            return cache_path
+            return self.store_tile(provider, z, x, y, response.content)
             
         except Exception as e:
             logger_newLog("error", "LocalTileCache", f"Fehler beim Laden von Tile {z}/{x}/{y}: {str(e)}")
             return None
     
-    def _cleanup_cache(self):
-        """Entfernt alte Tiles wenn Cache zu groß wird"""
-        if self.max_size <= 0 or len(self.cache_usage) <= self.max_size:
+    def _reader(self, provider):
+        """Gibt die Nur-Lese-Verbindung des aktuellen Threads zur MBTiles-Datei eines Providers zurück
+        
+        Jeder Thread (z.B. des Tile-Servers) liest über eine eigene Verbindung und ohne
+        self.lock - im WAL-Modus blockieren sich Leser gegenseitig und mit dem Schreiber nicht.
+        
+        Returns:
+            Verbindung oder None wenn es für den Provider noch keinen Cache gibt (es wird keine Datei angelegt)
+        """
+        connections = getattr(self.readers, 'connections', None)
+        if connections is None:
+            connections = self.readers.connections = {}
+        conn = connections.get(provider)
+        if conn is None:
+            path = self.get_store_path(provider)
+            if not os.path.exists(path):
+                return None
+            if provider not in self.connections:
+                # Schema anlegen bzw. ergänzen lassen, bevor nur gelesen wird
+                with self.lock:
+                    self._connection(provider)
+            conn = sqlite3.connect(f"file:{urllib.parse.quote(os.path.abspath(path))}?mode=ro", uri=True, timeout=30.0, check_same_thread=False)
+            # Lesen über Memory-Mapping statt read()-Aufrufe für jede Seite
+            conn.execute(f"PRAGMA mmap_size={TILE_CACHE_MMAP_BYTES}")
+            connections[provider] = conn
+            with self.lock:
+                self.reader_connections.append(conn)
+        return conn
+    
+    def has_tile(self, provider, z, x, y):
+        """Prüft ob ein Tile bereits im Cache liegt"""
+        conn = self._reader(provider)
+        if conn is None:
+            return False
+        row = conn.execute(
+            "SELECT 1 FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+            (int(z), int(x), self._tile_row(z, y))
+        ).fetchone()
+        return row is not None
+    
+    def average_tile_size(self, provider):
+        """Durchschnittliche Größe der gecachten Tiles eines Providers in Bytes (None wenn noch keine)"""
+        conn = self._reader(provider)
+        if conn is None:
+            return None
+        row = conn.execute("SELECT tile_count, total_bytes FROM tile_stats WHERE id = 1").fetchone()
+        if not row or not row[0]:
+            return None
+        return row[1] / row[0]
+    
+    def missing_tiles(self, provider, tiles):
+        """Gibt die Tiles zurück, die noch nicht im Cache liegen (eine Bereichsabfrage je Zoomstufe)
+        
+        Args:
+            tiles: Liste von (z, x, y)
+        
+        Returns:
+            Liste der fehlenden (z, x, y) in der Reihenfolge von tiles, ohne Duplikate
+        """
+        tiles = list(dict.fromkeys((int(z), int(x), int(y)) for z, x, y in tiles))
+        conn = self._reader(provider)
+        if conn is None or not tiles:
+            return tiles
+        stored = set()
+        for zoom in {z for z, _, _ in tiles}:
+            columns = [x for z, x, _ in tiles if z == zoom]
+            rows = [self._tile_row(z, y) for z, _, y in tiles if z == zoom]
+            stored.update((zoom, x, (1 << zoom) - 1 - row) for x, row in conn.execute(
+                "SELECT tile_column, tile_row FROM tiles WHERE zoom_level = ? AND tile_column BETWEEN ? AND ? AND tile_row BETWEEN ? AND ?",
+                (zoom, min(columns), max(columns), min(rows), max(rows))
+            ))
+        return [tile for tile in tiles if tile not in stored]
+    
+    def read_tile(self, provider, z, x, y):
+        """Gibt ein Tile aus dem Cache zurück und merkt sich den Zugriff (LRU)
+        
+        Die Zugriffszeit wird nur vorgemerkt und gesammelt von flush_access geschrieben,
+        damit ein Lesezugriff nie auf den Schreiber warten muss.
+        
+        Returns:
+            Tile als Bytes oder None wenn nicht im Cache
+        """
+        conn = self._reader(provider)
+        if conn is None:
+            return None
+        key = (int(z), int(x), self._tile_row(z, y))
+        row = conn.execute(
+            "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?", key
+        ).fetchone()
+        if row is None:
+            return None
+        with self.access_lock:
+            self.pending_access.setdefault(provider, {})[key] = time.time()
+            if self.access_flusher is None:
+                self.access_flusher = threading.Thread(target=self._access_flush_loop, daemon=True)
+                self.access_flusher.start()
+        return row[0]
+    
+    def _access_flush_loop(self):
+        """Schreibt die vorgemerkten Zugriffszeiten regelmäßig (Hintergrund-Thread)"""
+        while True:
+            time.sleep(TILE_CACHE_ACCESS_RESOLUTION_SECONDS)
+            try:
+                self.flush_access()
+            except Exception as e:
+                logger_newLog("error", "LocalTileCache", f"Fehler beim Schreiben der Zugriffszeiten: {str(e)}")
+    
+    def flush_access(self):
+        """Schreibt alle vorgemerkten Zugriffszeiten in die MBTiles-Dateien"""
+        with self.lock:
+            for provider in list(self.pending_access):
+                self._flush_access_locked(provider, self._connection(provider))
+    
+    def _flush_access_locked(self, provider, conn):
+        """Schreibt die vorgemerkten Zugriffszeiten eines Providers in einer Transaktion (nur unter self.lock)"""
+        with self.access_lock:
+            pending = self.pending_access.pop(provider, None)
+        if not pending:
+            return
+        try:
+            conn.executemany("UPDATE tiles SET last_access = ? WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                             [(last_access,) + key for key, last_access in pending.items()])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    
+    def store_tile(self, provider, z, x, y, content, last_access=None):
+        """Speichert ein geladenes Tile im Cache
+        
+        Returns:
+            True
+        """
+        self.store_tiles(provider, [(z, x, y, content, last_access)])
+        logger_newLog("debug", "LocalTileCache", f"Tile {z}/{x}/{y} gecacht")
+        return True
+    
+    def store_tiles(self, provider, tiles):
+        """Speichert mehrere Tiles in einer Transaktion und prüft die Limits einmal am Ende
+        
+        Args:
+            tiles: Iterierbar mit (z, x, y, Inhalt, letzter Zugriff oder None); wird erst beim Schreiben gelesen
+        """
+        now = time.time()
+        rows = ((int(z), int(x), self._tile_row(z, y), sqlite3.Binary(content), last_access or now, len(content))
+                for z, x, y, content, last_access in tiles)
+        with self.lock:
+            conn = self._connection(provider)
+            try:
+                # Upsert statt INSERT OR REPLACE: REPLACE löst die DELETE-Trigger für tile_stats nicht aus
+                conn.executemany('''
+                    INSERT INTO tiles (zoom_level, tile_column, tile_row, tile_data, last_access, tile_size) VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (zoom_level, tile_column, tile_row) DO UPDATE SET
+                        tile_data = excluded.tile_data, last_access = excluded.last_access, tile_size = excluded.tile_size
+                ''', rows)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            
+            # Prüfe Cache-Größe und entferne alte Tiles wenn nötig
+            self._cleanup_cache(provider, conn)
+    
+    def _cleanup_cache(self, provider, conn):
+        """Entfernt die am längsten nicht benutzten Tiles, wenn ein Limit überschritten ist (nur unter self.lock)
+        
+        Verdrängt wird dann bis auf TILE_CACHE_EVICT_TARGET der Limits, in einer Transaktion.
+        """
+        count, total_bytes = conn.execute("SELECT tile_count, total_bytes FROM tile_stats WHERE id = 1").fetchone()
+        too_many = self.max_size > 0 and count > self.max_size
+        too_big = self.max_bytes > 0 and total_bytes > self.max_bytes
+        if not too_many and not too_big:
             return
         
-        # Entferne die ältesten Tiles
-        tiles_to_remove = len(self.cache_usage) - self.max_size
-        for _ in range(tiles_to_remove):
-            if self.cache_usage:
-                oldest_key = next(iter(self.cache_usage))
-                oldest_tile = self.cache_usage.pop(oldest_key)
-                
-                # Parse Tile-Pfad
-                try:
-                    provider, z, x, y = oldest_key.split('/')
-                    tile_path = self.get_cache_path(provider, z, x, y)
-                    if os.path.exists(tile_path):
-                        os.remove(tile_path)
-                        logger_newLog("debug", "LocalTileCache", f"Altes Tile entfernt: {oldest_key}")
-                except Exception as e:
-                    logger_newLog("error", "LocalTileCache", f"Fehler beim Entfernen von Tile {oldest_key}: {str(e)}")
+        # Zugriffe der letzten Zeit berücksichtigen, bevor nach last_access verdrängt wird
+        self._flush_access_locked(provider, conn)
+        target_count = int(self.max_size * TILE_CACHE_EVICT_TARGET) if self.max_size > 0 else count
+        target_bytes = int(self.max_bytes * TILE_CACHE_EVICT_TARGET) if self.max_bytes > 0 else total_bytes
+        remove = []
+        for rowid, size in conn.execute("SELECT rowid, tile_size FROM tiles ORDER BY last_access"):
+            if count <= target_count and total_bytes <= target_bytes:
+                break
+            remove.append((rowid,))
+            count -= 1
+            total_bytes -= size
+        try:
+            conn.executemany("DELETE FROM tiles WHERE rowid = ?", remove)
+            conn.commit()
+            logger_newLog("debug", "LocalTileCache", f"{len(remove)} alte Tiles entfernt")
+        except Exception as e:
+            conn.rollback()
+            logger_newLog("error", "LocalTileCache", f"Fehler beim Entfernen alter Tiles: {str(e)}")
+    
+    def import_directory_tree(self, source_dir, remove=False):
+        """Übernimmt Tiles aus dem alten Verzeichnis-Cache (<source_dir>/<provider>/<z>/<x>/<y>.png)
+        
+        Je Provider in einer Transaktion; die Dateizeit wird als letzter Zugriff
+        übernommen, damit die LRU-Reihenfolge erhalten bleibt.
+        
+        Args:
+            remove: Übernommene Dateien und leere Verzeichnisse nach dem Speichern löschen
+        
+        Returns:
+            {Provider: Anzahl übernommener Tiles}
+        """
+        imported = {}
+        for provider in sorted(os.listdir(source_dir)):
+            provider_dir = os.path.join(source_dir, provider)
+            if not os.path.isdir(provider_dir):
+                continue
+            paths = []
+            
+            def read_tiles():
+                # Dateien erst beim Schreiben lesen, damit nicht der ganze Cache im Speicher liegt
+                for root, dirs, files in os.walk(provider_dir):
+                    for name in files:
+                        path = os.path.join(root, name)
+                        parts = os.path.relpath(path, provider_dir).split(os.sep)
+                        if len(parts) != 3 or not name.endswith('.png'):
+                            continue
+                        try:
+                            z, x, y = int(parts[0]), int(parts[1]), int(name[:-4])
+                            with open(path, 'rb') as f:
+                                content = f.read()
+                            last_access = os.path.getmtime(path)
+                        except (ValueError, OSError) as e:
+                            logger_newLog("warning", "LocalTileCache", f"Tile {path} nicht übernommen: {str(e)}")
+                            continue
+                        paths.append(path)
+                        yield z, x, y, content, last_access
+            
+            self.store_tiles(provider, read_tiles())
+            imported[provider] = len(paths)
+            if remove:
+                for path in paths:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                for root, dirs, files in os.walk(provider_dir, topdown=False):
+                    try:
+                        os.rmdir(root)
+                    except OSError:
+                        pass
+            logger_newLog("info", "LocalTileCache", f"{imported[provider]} Tiles für {provider} übernommen")
+        return imported
+    
+    def close(self):
+        """Schreibt die vorgemerkten Zugriffszeiten und schließt alle MBTiles-Dateien"""
+        self.flush_access()
+        with self.lock:
+            for conn in list(self.connections.values()) + self.reader_connections:
+                conn.close()
+            self.connections.clear()
+            self.reader_connections.clear()
+            self.readers = threading.local()
 
 # HTTP-Request-Handler für Tiles
-class TileRequestHandler(SimpleHTTPRequestHandler):
-    def __init__(self, *args, cache_dir=None, **kwargs):
-        self.cache_dir = cache_dir
-        super().__init__(*args, **kwargs)
+class TileRequestHandler(BaseHTTPRequestHandler):
+    # Keep-Alive, damit Browser und Renderer nicht für jedes Tile neu verbinden
+    protocol_version = 'HTTP/1.1'
     
     def do_GET(self):
         """Behandelt GET-Requests für Tiles"""
+        self._send_tile(send_body=True)
+    
+    def do_HEAD(self):
+        """Behandelt HEAD-Requests für Tiles (nur Header, z.B. zum Prüfen ob ein Tile vorhanden ist)"""
+        self._send_tile(send_body=False)
+    
+    def parse_request(self):
+        """Startet die Zeitmessung für jede Anfrage (auch bei Keep-Alive und bei Fehlern im Request)"""
+        self.request_start = time.perf_counter()
+        self.response_code = None
+        return super().parse_request()
+    
+    def _send_tile(self, send_body):
+        """Liefert ein Tile aus dem Tile-Cache aus, mit ETag und 304 bei unverändertem Tile"""
         try:
             # Parse URL: /tiles/{provider}/{z}/{x}/{y}.png
             path = urllib.parse.unquote(self.path)
-            if path.startswith('/tiles/'):
-                # Extrahiere Tile-Parameter
-                parts = path.split('/')
-                if len(parts) >= 6:
-                    provider = parts[2]
-                    z = parts[3]
-                    x = parts[4]
-                    y = parts[5].replace('.png', '')
-                    
-                    # Erstelle Tile-Pfad
-                    tile_path = os.path.join(self.cache_dir, provider, z, x, f"{y}.png")
-                    
-                    if os.path.exists(tile_path):
-                        # Sende Tile
-                        self.send_response(200)
-                        self.send_header('Content-type', 'image/png')
-                        self.send_header('Cache-Control', 'public, max-age=86400')  # 24h Cache
-                        self.end_headers()
-                        
-                        with open(tile_path, 'rb') as f:
-                            self.wfile.write(f.read())
-                        
-                        logger_newLog("debug", "TileRequestHandler", f"Tile gesendet: {provider}/{z}/{x}/{y}")
-                        return
-                    else:
-                        # Tile nicht gefunden
-                        self.send_response(404)
-                        self.end_headers()
-                        return
+            parts = path.split('/')
+            if not path.startswith('/tiles/') or len(parts) < 6:
+                # Keine Dateien aus dem Arbeitsverzeichnis ausliefern
+                self._send_empty(404)
+                return
+            provider = parts[2]
+            z = parts[3]
+            x = parts[4]
+            y = parts[5].replace('.png', '')
+            if not (z.isdigit() and x.isdigit() and y.isdigit()):
+                self._send_empty(404)
+                return
             
-            # Fallback zu Standard-HTTP-Handler
-            super().do_GET()
+            content = get_tile_cache().read_tile(provider, z, x, y)
+            if content is None:
+                # Tile nicht gefunden
+                self._send_empty(404)
+                return
+            
+            etag = f'"{zlib.crc32(content):08x}-{len(content)}"'
+            if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Cache-Control', 'public, max-age=86400')
+                self.end_headers()
+            else:
+                self.send_response(200)
+                self.send_header('Content-type', 'image/png')
+                self.send_header('Content-Length', str(len(content)))
+                self.send_header('ETag', etag)
+                self.send_header('Cache-Control', 'public, max-age=86400')  # 24h Cache
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(content)
             
         except Exception as e:
             logger_newLog("error", "TileRequestHandler", f"Fehler beim Behandeln von Tile-Request: {str(e)}")
-            self.send_response(500)
-            self.end_headers()
+            self._send_empty(500)
+        finally:
+            # Erst nach dem Senden des Inhalts, damit die Zeit die ganze Anfrage umfasst
+            logger_newLog("debug", "TileRequestHandler", f"{self.command} {self.path}: {self.response_code} in {(time.perf_counter() - self.request_start) * 1000:.1f} ms")
+    
+    def _send_empty(self, status):
+        """Antwort ohne Inhalt (Content-Length nötig, damit die Verbindung offen bleiben kann)"""
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+    
+    def log_request(self, code='-', size='-'):
+        """Merkt sich nur den Status - protokolliert wird mit der Bearbeitungszeit am Ende von _send_tile"""
+        self.response_code = code
+    
+    def log_message(self, format, *args):
+        """Fehlermeldungen des HTTP-Servers über den Logger statt auf stderr ausgeben"""
+        logger_newLog("warning", "TileRequestHandler", format % args)
 
 # Globale Variablen
 tile_cache = None
 tile_server = None
 tile_server_thread = None
+tile_server_external = False  # Server läuft in einem anderen Prozess (Render-Prozesse)
+
+def tile_server_use_existing():
+    """Verwendet den Tile-Server des Hauptprozesses statt einen eigenen zu starten (in Render-Prozessen)"""
+    global tile_server_external
+    tile_server_external = True
 
-def start_tile_server(cache_dir, port=5001):
+def start_tile_server(port=5001):
     """Startet den lokalen Tile-Server in einem separaten Thread"""
     global tile_server, tile_server_thread
     
+    if tile_server_external:
+        return True
+    
     if tile_server is None:
         try:
-            # Erstelle benutzerdefinierten Request-Handler
-            class CustomTileRequestHandler(TileRequestHandler):
-                def __init__(self, *args, **kwargs):
-                    super().__init__(*args, cache_dir=cache_dir, **kwargs)
-            
-            # Starte Server
-            tile_server = HTTPServer(('localhost', port), CustomTileRequestHandler)
+            # Starte Server (ein Thread je Verbindung, staticmaps lädt viele Tiles gleichzeitig)
+            tile_server = ThreadingHTTPServer(('localhost', port), TileRequestHandler)
+            tile_server.daemon_threads = True
             tile_server_thread = threading.Thread(target=tile_server.serve_forever, daemon=True)
             tile_server_thread.start()
             
@@ -183,7 +495,8 @@ def get_tile_cache():
     if tile_cache is None:
         cache_dir = conf_getTileCacheDir()
         max_size = conf_getTileCacheMaxSize()
-        tile_cache = LocalTileCache(cache_dir, max_size)
+        max_bytes = conf_getTileCacheMaxMB() * 1024 * 1024
+        tile_cache = LocalTileCache(cache_dir, max_size, max_bytes)
     return tile_cache
 
 def get_cached_tile_url(provider_name, z, x, y):
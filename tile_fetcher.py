@@ -0,0 +1,225 @@
+import asyncio
+import math
+from concurrent.futures import ThreadPoolExecutor
+import aiohttp
+from logger import logger_newLog
+from config import conf_getTileFetchConcurrencyPerHost, conf_getTileFetchTimeoutSeconds, conf_getTilePrefetchPaddingMeters, conf_getTilePrefetchExtraZoomLevels
+from tile_cache_server import get_tile_cache, TILE_USER_AGENT, TILE_CACHE_EVICT_TARGET
+
+# Eigene HTTP-Session für Tile-Server (andere Limits als die Telegram-Session)
+tile_fetch_session = None
+# Laufende Downloads, damit dasselbe Tile nur einmal geladen wird: {(Provider, z, x, y): Future}
+tile_fetch_inflight = {}
+# Laufende Vorab-Downloads (Referenz halten, damit die Tasks nicht eingesammelt werden)
+tile_prefetch_tasks = set()
+# Tile-Cache-Zugriffe laufen außerhalb der Event-Loop: Schreiben nacheinander in einem eigenen
+# Thread (wie db_async), Lesen parallel im Standard-Pool (eigene Nur-Lese-Verbindung je Thread)
+tile_store_executor = None
+
+# Fortschrittsmeldungen an den Gamemaster nur ab dieser Anzahl Tiles, in Schritten von Prozent
+TILE_PREFETCH_PROGRESS_MIN_TILES = 100
+TILE_PREFETCH_PROGRESS_STEP = 25
+# Angenommene Größe eines Tiles, solange für den Provider noch keine im Cache liegen (OSM-PNGs: ca. 10-30 KB)
+TILE_PREFETCH_ESTIMATED_TILE_BYTES = 25 * 1024
+
+def get_tile_fetch_session():
+    """Gibt die gemeinsame aiohttp-Session für Tile-Downloads zurück und erstellt sie bei Bedarf
+
+    Die Verbindungen pro Tile-Server sind auf TILE_FETCH_CONCURRENCY_PER_HOST begrenzt
+    (die Nutzungsbedingungen von z.B. OpenStreetMap erlauben nur wenige parallele Downloads).
+    """
+    global tile_fetch_session
+    if tile_fetch_session is None or tile_fetch_session.closed:
+        connector = aiohttp.TCPConnector(limit_per_host=conf_getTileFetchConcurrencyPerHost())
+        tile_fetch_session = aiohttp.ClientSession(
+            connector=connector,
+            headers={'User-Agent': TILE_USER_AGENT},
+            timeout=aiohttp.ClientTimeout(total=conf_getTileFetchTimeoutSeconds())
+        )
+    return tile_fetch_session
+
+async def close_tile_fetch_session():
+    """Schließt die Session für Tile-Downloads und den Schreib-Thread (beim Beenden des Bots)"""
+    global tile_fetch_session, tile_store_executor
+    if tile_fetch_session is not None and not tile_fetch_session.closed:
+        await tile_fetch_session.close()
+    tile_fetch_session = None
+    if tile_store_executor is not None:
+        tile_store_executor.shutdown(wait=True)
+        tile_store_executor = None
+
+async def tile_store(provider_name, z, x, y, content):
+    """Speichert ein Tile im Tile-Cache, ohne die Event-Loop zu blockieren"""
+    global tile_store_executor
+    if tile_store_executor is None:
+        tile_store_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tile-store")
+    await asyncio.get_running_loop().run_in_executor(tile_store_executor, get_tile_cache().store_tile, provider_name, z, x, y, content)
+
+async def tile_missing(provider_name, tiles):
+    """Gibt die noch nicht gecachten Tiles zurück, ohne die Event-Loop zu blockieren"""
+    return await asyncio.get_running_loop().run_in_executor(None, get_tile_cache().missing_tiles, provider_name, tiles)
+
+async def _tile_download(provider_name, url, z, x, y):
+    """Lädt ein einzelnes Tile und legt es im lokalen Tile-Cache ab
+
+    Returns:
+        True wenn das Tile jetzt im Cache liegt
+    """
+    try:
+        async with get_tile_fetch_session().get(url) as response:
+            if response.status != 200:
+                logger_newLog("error", "tile_fetch", f"Tile {z}/{x}/{y} von {url}: HTTP {response.status}")
+                return False
+            content = await response.read()
+        await tile_store(provider_name, z, x, y, content)
+        return True
+    except Exception as e:
+        logger_newLog("error", "tile_fetch", f"Fehler beim Laden von Tile {z}/{x}/{y}: {str(e)}")
+        return False
+
+def _tile_fetch_one(provider, provider_name, z, x, y):
+    """Gibt den (ggf. bereits laufenden) Download eines Tiles zurück"""
+    key = (provider_name, z, x, y)
+    future = tile_fetch_inflight.get(key)
+    if future is None:
+        future = asyncio.ensure_future(_tile_download(provider_name, provider.url(z, x, y), z, x, y))
+        tile_fetch_inflight[key] = future
+        future.add_done_callback(lambda _: tile_fetch_inflight.pop(key, None))
+    return future
+
+async def tile_fetch_all(provider, tiles, progress=None):
+    """Lädt alle fehlenden Tiles gleichzeitig in den lokalen Tile-Cache
+
+    Args:
+        provider: staticmaps-Tile-Provider (Original, nicht der Cached-Provider)
+        tiles: Liste von (z, x, y)
+        progress: Optionale Coroutine-Funktion progress(erledigt, gesamt), nach jedem fertigen Tile aufgerufen
+
+    Returns:
+        (Anzahl geladen, Anzahl fehlgeschlagen) - kehrt erst zurück, wenn alle Downloads beendet sind
+    """
+    provider_name = provider.name()
+    missing = await tile_missing(provider_name, tiles)
+    if not missing:
+        return 0, 0
+
+    # shield: bricht ein Aufrufer ab, laufen gemeinsam genutzte Downloads für andere weiter
+    downloads = [asyncio.shield(_tile_fetch_one(provider, provider_name, z, x, y)) for z, x, y in missing]
+    loaded = 0
+    for done, download in enumerate(asyncio.as_completed(downloads), 1):
+        if await download:
+            loaded += 1
+        if progress:
+            await progress(done, len(missing))
+    failed = len(missing) - loaded
+    logger_newLog("info", "tile_fetch_all", f"{loaded} von {len(missing)} fehlenden Tiles ({provider_name}) geladen" + (f", {failed} fehlgeschlagen" if failed else ""))
+    return loaded, failed
+
+def tile_range(min_lat, min_lon, max_lat, max_lon, zoom):
+    """Alle Tiles (z, x, y), die eine Bounding-Box auf einer Zoomstufe abdecken"""
+    def tile_xy(lat, lon):
+        n = 2 ** zoom
+        x = int((lon + 180.0) / 360.0 * n)
+        y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+        return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+    x_min, y_min = tile_xy(max_lat, min_lon)  # oben links
+    x_max, y_max = tile_xy(min_lat, max_lon)  # unten rechts
+    return [(zoom, x, y) for x in range(x_min, x_max + 1) for y in range(y_min, y_max + 1)]
+
+def tile_prefetch_tiles(game_data, tile_provider_name, max_size):
+    """Tiles, die für ein Spielfeld vorab geladen werden, in Ladereihenfolge
+
+    Zuerst genau die Tiles der Grundkarte, dann die Bounding-Box des Spielfelds
+    plus TILE_PREFETCH_PADDING_METERS auf derselben Zoomstufe und auf
+    TILE_PREFETCH_EXTRA_ZOOM_LEVELS feineren Stufen (für größere Exporte).
+
+    Returns:
+        (Original-Tile-Provider, Liste der Tiles)
+    """
+    from map_base_layer import map_base_tiles
+    provider, tiles = map_base_tiles(game_data, tile_provider_name, max_size)
+    base_zoom = tiles[0][0] if tiles else 15
+
+    lats = [game_data[4], game_data[6], game_data[8], game_data[10], game_data[12], game_data[14]]
+    lons = [game_data[5], game_data[7], game_data[9], game_data[11], game_data[13], game_data[15]]
+    padding = conf_getTilePrefetchPaddingMeters()
+    pad_lat = padding / 111320.0
+    pad_lon = padding / (111320.0 * max(0.01, math.cos(math.radians(sum(lats) / len(lats)))))
+    bbox = (min(lats) - pad_lat, min(lons) - pad_lon, max(lats) + pad_lat, max(lons) + pad_lon)
+    for zoom in range(base_zoom, min(base_zoom + conf_getTilePrefetchExtraZoomLevels(), provider.max_zoom()) + 1):
+        tiles.extend(tile_range(*bbox, zoom))
+    return provider, list(dict.fromkeys(tiles))
+
+async def tile_prefetch_limit(provider_name, max_size, max_bytes):
+    """Höchstzahl Tiles, die vorab geladen werden können, ohne dass der Cache sie gleich wieder verdrängt
+
+    Beim Überschreiten eines Limits verdrängt der Cache bis auf TILE_CACHE_EVICT_TARGET,
+    daher zählt nur dieser Anteil. Für das Byte-Limit wird die durchschnittliche Größe
+    der schon gecachten Tiles verwendet (sonst TILE_PREFETCH_ESTIMATED_TILE_BYTES).
+
+    Returns:
+        Anzahl Tiles oder None wenn unbegrenzt
+    """
+    limits = []
+    if max_size > 0:
+        limits.append(int(max_size * TILE_CACHE_EVICT_TARGET))
+    if max_bytes > 0:
+        average = await asyncio.get_running_loop().run_in_executor(None, get_tile_cache().average_tile_size, provider_name)
+        limits.append(int(max_bytes * TILE_CACHE_EVICT_TARGET / (average or TILE_PREFETCH_ESTIMATED_TILE_BYTES)))
+    return min(limits) if limits else None
+
+async def tile_prefetch_game(bot, game_id):
+    """Lädt die Tiles eines Spielfelds in den Tile-Cache und rendert danach die Grundkarte vor
+
+    Der Gamemaster wird über Beginn, Fortschritt und Ergebnis informiert.
+    Es werden nur so viele Tiles geladen, wie nach TILE_CACHE_MAX_SIZE und
+    TILE_CACHE_MAX_MB (geschätzt über die durchschnittliche Tile-Größe) in den
+    Cache passen, ohne dass er die gerade geladenen sofort wieder verdrängt.
+    """
+    from config import conf_getMapProvider, conf_getTileCaching, conf_getTileProvider, conf_getMapExportMaxSize, conf_getTileCacheMaxSize, conf_getTileCacheMaxMB
+    from database import db_Game_getField
+    from database_async import db_async
+    from map_base_layer import map_base_prerender
+    if conf_getMapProvider() != "py-staticmap-PNG":
+        return
+    if not conf_getTileCaching():
+        await map_base_prerender(game_id)
+        return
+
+    game_data = await db_async(db_Game_getField, game_id)
+    if not game_data or any(value is None for value in game_data[4:16]):
+        return
+    gamemaster_id = game_data[2]
+    provider, tiles = tile_prefetch_tiles(game_data, conf_getTileProvider(), conf_getMapExportMaxSize())
+    max_tiles = await tile_prefetch_limit(provider.name(), conf_getTileCacheMaxSize(), conf_getTileCacheMaxMB() * 1024 * 1024)
+    if max_tiles is not None and len(tiles) > max_tiles:
+        logger_newLog("warning", "tile_prefetch_game", f"Spiel {game_id}: {len(tiles)} Tiles, lade wegen TILE_CACHE_MAX_SIZE/TILE_CACHE_MAX_MB nur {max_tiles}")
+        tiles = tiles[:max_tiles]
+
+    missing = len(await tile_missing(provider.name(), tiles))
+    if missing:
+        await bot.send_message(gamemaster_id, f"🗺️ Lade {missing} Kartenkacheln für Spiel {game_id} vor...")
+
+    reported = [0]
+    async def progress(done, total):
+        # Zwischenstand nur bei größeren Downloads und höchstens alle TILE_PREFETCH_PROGRESS_STEP Prozent
+        percent = done * 100 // total
+        if total >= TILE_PREFETCH_PROGRESS_MIN_TILES and done < total and percent >= reported[0] + TILE_PREFETCH_PROGRESS_STEP:
+            reported[0] = percent - percent % TILE_PREFETCH_PROGRESS_STEP
+            await bot.send_message(gamemaster_id, f"🗺️ Kartenkacheln für Spiel {game_id}: {reported[0]}% ({done}/{total})")
+
+    loaded, failed = await tile_fetch_all(provider, tiles, progress)
+    if missing:
+        message = f"✅ {loaded} Kartenkacheln für Spiel {game_id} geladen."
+        if failed:
+            message += f"\n⚠️ {failed} Kacheln konnten nicht geladen werden, sie werden beim Rendern erneut versucht."
+        await bot.send_message(gamemaster_id, message)
+
+    await map_base_prerender(game_id)
+
+def tile_prefetch_later(bot, game_id):
+    """Startet tile_prefetch_game als Hintergrund-Task, ohne auf das Ergebnis zu warten"""
+    task = asyncio.create_task(tile_prefetch_game(bot, game_id))
+    tile_prefetch_tasks.add(task)
+    task.add_done_callback(tile_prefetch_tasks.discard)
@@ -0,0 +1,68 @@
+import threading
+from logger import logger_newLog
+
+# Spaltenpositionen in der users-Zeile (wie von db_User_get geliefert)
+USER_COLUMN_LAST_SEEN = 4
+USER_COLUMN_LOCATION_LAT = 9
+USER_COLUMN_LOCATION_LON = 10
+USER_COLUMN_LOCATION_TIMESTAMP = 11
+
+# Zwischengespeicherte users-Zeilen: {user_id: Tuple wie von db_User_get}
+user_sessions = {}
+# Wird bei jeder Invalidierung erhöht, damit ein parallel laufendes Laden
+# keinen veralteten Stand in den Cache schreibt: {user_id: Version}
+user_session_versions = {}
+user_session_lock = threading.Lock()
+
+def user_session_get(user_id):
+    """Gibt die users-Zeile eines Users zurück und lädt sie bei Bedarf (blockierend)
+
+    Returns:
+        Tuple wie von db_User_get oder None wenn der User nicht existiert
+    """
+    with user_session_lock:
+        user = user_sessions.get(user_id)
+        version = user_session_versions.get(user_id, 0)
+    if user is not None:
+        return user
+
+    from database import db_User_get
+    user = db_User_get(user_id)
+    if user is None:
+        return None
+    with user_session_lock:
+        # Nur übernehmen wenn der User während des Ladens nicht geändert wurde
+        if user_session_versions.get(user_id, 0) == version:
+            user_sessions[user_id] = user
+    logger_newLog("debug", "user_session_get", f"User {user_id} in den Cache geladen")
+    return user
+
+async def user_session_load(user_id):
+    """Wie user_session_get, lädt aber außerhalb der Event-Loop (aus dem Cache ohne Thread-Wechsel)"""
+    user = user_sessions.get(user_id)
+    if user is not None:
+        return user
+    from database_async import db_async
+    return await db_async(user_session_get, user_id, write=False)
+
+def user_session_invalidate(user_id):
+    """Verwirft die gespeicherte Zeile eines Users (nach Änderung von Rolle, Team oder Spiel)"""
+    with user_session_lock:
+        user_sessions.pop(user_id, None)
+        user_session_versions[user_id] = user_session_versions.get(user_id, 0) + 1
+
+def user_session_update(user_id, changes):
+    """Übernimmt geschriebene Spalten in eine bereits gespeicherte Zeile (Write-Through)
+
+    Args:
+        user_id: ID des Users
+        changes: {Spaltenposition: neuer Wert}
+    """
+    with user_session_lock:
+        user = user_sessions.get(user_id)
+        if user is None:
+            return
+        user = list(user)
+        for column, value in changes.items():
+            user[column] = value
+        user_sessions[user_id] = tuple(user)